@@ -0,0 +1,388 @@
+"""
+Asyncio-based sorting engine for FileSorter.
+
+AsyncFileSorter exposes the same sort_current_directory / deep_audit_and_sort API
+as sorter.FileSorter and uses the same FileMapping matching, but overlaps the
+filesystem metadata operations instead of issuing them one after another. This
+matters on network shares where every listdir/makedirs/rename is a round trip.
+
+- All blocking calls run on a bounded thread pool (max_workers).
+- Enumeration feeds moves through a bounded queue (queue_size), so a fast scan
+  cannot run arbitrarily far ahead of the movers.
+- Moves into the same destination directory are limited to
+  per_directory_limit at a time, so one hot folder cannot monopolize the share.
+- An optional throttle.IOThrottle is charged for every listing, makedirs and move.
+- Moves rename relative to cached directory handles (dir_handles.DirHandleCache),
+  shared by all movers, so each move looks up only the two file names.
+- sort_into lists several source folders concurrently, creates every destination
+  directory up front and queues the moves grouped by destination directory.
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from src.dir_handles import DEFAULT_CAPACITY, DirHandleCache
+from src.empty_dirs import EmptyDirPruner
+from src.retry import DEFAULT_MAX_ATTEMPTS, RunReport, backoff_delay, is_transient
+from src.mapping_overrides import OVERRIDE_FILE, OverrideCache
+from src.sorter import DEFAULT_PLAN_MEMORY, FileMapping, MovePlan, SCAN_AUDIT, SCAN_SKIP
+from src.sorter import move_file_at, scan_dir
+
+
+def _list_files(path):
+    """
+    List the regular files (following symlinks) directly inside path, as os.DirEntry.
+    """
+    with os.scandir(path) as it:
+        return [entry for entry in it if entry.is_file()]
+
+
+class _SortRun:
+    """
+    State for a single engine run: executor, move queue, directory handles and
+    per-directory limits.
+    """
+    def __init__(self, engine, executor):
+        self.engine = engine
+        self.loop = asyncio.get_running_loop()
+        self.executor = executor
+        self.handles = DirHandleCache(engine.handle_cache_size)
+        self.moves = asyncio.Queue(maxsize=engine.queue_size)
+        self._dir_limits = {}
+        self._created_dirs = set()
+        self._retries = set()  # delayed retry tasks
+        self.moved = 0
+        self.pruner = None  # EmptyDirPruner told about each move, if pruning
+
+    async def op_call(self, func, *args, **kwargs):
+        """
+        Run a blocking filesystem operation on the executor, charging the throttle.
+        """
+        throttle = self.engine.throttle
+        if throttle is None:
+            return await self.call(func, *args, **kwargs)
+
+        def throttled():
+            throttle.op()
+            return func(*args, **kwargs)
+        return await self.call(throttled)
+
+    async def call(self, func, *args, **kwargs):
+        """
+        Run a blocking function on the bounded executor.
+        """
+        if kwargs:
+            func = functools.partial(func, **kwargs)
+        return await self.loop.run_in_executor(self.executor, func, *args)
+
+    def mark_created(self, directories):
+        """
+        Record directories that already exist, so movers skip their makedirs.
+        """
+        self._created_dirs.update(directories)
+
+    def dir_limit(self, directory):
+        """
+        Return the semaphore limiting concurrent operations on a directory.
+        """
+        limit = self._dir_limits.get(directory)
+        if limit is None:
+            limit = asyncio.Semaphore(self.engine.per_directory_limit)
+            self._dir_limits[directory] = limit
+        return limit
+
+    async def mover(self):
+        """
+        Consume queued moves until a None sentinel is received.
+        """
+        while True:
+            item = await self.moves.get()
+            try:
+                if item is None:
+                    return
+                await self._move(item, 1)
+            finally:
+                self.moves.task_done()
+
+    async def _move(self, item, attempt):
+        """
+        Make one queued move. A transient failure is retried later from a delayed
+        task while the movers go on; other failures are recorded in the report.
+        """
+        src_path, dest_path, target_path = item
+        report = self.engine.report
+        try:
+            async with self.dir_limit(dest_path):
+                if dest_path not in self._created_dirs:
+                    await self.op_call(os.makedirs, dest_path, exist_ok=True)
+                    self._created_dirs.add(dest_path)
+                await self.call(
+                    move_file_at, self.handles, os.path.dirname(src_path), os.path.basename(src_path),
+                    dest_path, os.path.basename(target_path), self.engine.throttle
+                )
+        except OSError as e:
+            if self._should_retry("move", src_path, e, attempt):
+                task = asyncio.create_task(self._retry_later(item, attempt))
+                self._retries.add(task)
+                task.add_done_callback(self._retries.discard)
+            return
+        self.moved += 1
+        if attempt > 1:
+            report.add_recovery()
+        if self.pruner is not None:
+            self.pruner.moved(os.path.dirname(src_path), dest_path)
+
+    async def _retry_later(self, item, attempt):
+        await asyncio.sleep(backoff_delay(attempt))
+        await self._move(item, attempt + 1)
+
+    async def retrying(self, operation, path, func, *args):
+        """
+        Run a blocking listing or classification on the executor. The caller needs
+        the result to go on, so a transient failure is retried here after the
+        backoff delay, while the movers and other scanners carry on. Returns func's
+        result, or None once the failure is recorded in the report.
+        """
+        attempt = 1
+        while True:
+            try:
+                result = await self.op_call(func, *args)
+            except OSError as e:
+                if not self._should_retry(operation, path, e, attempt):
+                    return None
+                await asyncio.sleep(backoff_delay(attempt))
+                attempt += 1
+                continue
+            if attempt > 1:
+                self.engine.report.add_recovery()
+            return result
+
+    def _should_retry(self, operation, path, error, attempt):
+        """
+        Count a retry of a transient failure, or record the failure. Returns True to retry.
+        """
+        if is_transient(error) and attempt < self.engine.max_attempts:
+            self.engine.report.add_retry()
+            return True
+        self.engine.report.add_failure(operation, path, error)
+        return False
+
+    async def settle(self):
+        """
+        Wait until every queued move and every pending retry has finished.
+        """
+        await self.moves.join()
+        while self._retries:
+            done, _ = await asyncio.wait(set(self._retries))
+            for task in done:
+                task.result()
+
+
+class AsyncFileSorter:
+    """
+    Sorter that overlaps filesystem operations using asyncio and a bounded executor.
+    Failed operations are retried or recorded in self.report, as in FileSorter.
+    """
+    def __init__(self, mapping_path, max_workers=16, per_directory_limit=4, queue_size=256,
+                 throttle=None, record_hits=False, handle_cache_size=DEFAULT_CAPACITY, mapping=None,
+                 plan_memory=DEFAULT_PLAN_MEMORY, max_attempts=DEFAULT_MAX_ATTEMPTS, overrides=None):
+        self.mapping = mapping or FileMapping(mapping_path, record_hits=record_hits)
+        self.overrides = overrides or OverrideCache(self.mapping)
+        self.throttle = throttle
+        self.handle_cache_size = handle_cache_size
+        self.max_workers = max_workers
+        self.per_directory_limit = per_directory_limit
+        self.queue_size = queue_size
+        self.plan_memory = plan_memory
+        self.max_attempts = max_attempts
+        self.report = RunReport()
+
+    def sort_current_directory(self, directory):
+        """
+        Sort files in the given directory.
+        """
+        self._run(self._enqueue_directory, directory, directory)
+
+    def deep_audit_and_sort(self, root_dir, prune_empty=False):
+        """
+        Recursively move misplaced files to their correct folders, optionally
+        removing the folders that emptied (see FileSorter.deep_audit_and_sort).
+        Returns the number of folders removed.
+        """
+        pruner = EmptyDirPruner.for_mapping(self.mapping, root_dir, self.throttle) if prune_empty else None
+        self._run(self._enqueue_deep_audit, root_dir, pruner)
+        if pruner is None:
+            return 0
+        pruner.protect_destinations(self.overrides.destinations())
+        return pruner.prune()
+
+    def sort_into(self, source_dirs, dest_root):
+        """
+        Sort the files directly in several folders into one destination root.
+        Returns the number of files moved.
+        """
+        return self._run(self._enqueue_batch, list(source_dirs), dest_root)
+
+    def link_into(self, source_dirs, view_root, deep=False):
+        """
+        Build or refresh a link view (see FileSorter.link_into). Creating links is
+        cheap metadata work, so this runs the same synchronous LinkView.
+        """
+        from src.link_view import LinkView
+        try:
+            return LinkView(self.mapping, view_root, self.throttle, self.report).sync(source_dirs, deep=deep)
+        finally:
+            self.mapping.save_run_state()
+
+    def _run(self, producer, *args):
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                return asyncio.run(self._pipeline(executor, producer, *args))
+        finally:
+            self.mapping.save_run_state()
+
+    async def _pipeline(self, executor, producer, *args):
+        """
+        Run a producer alongside the movers, propagating the first failure.
+        Returns the number of files moved.
+        """
+        run = _SortRun(self, executor)
+        movers = [asyncio.create_task(run.mover()) for _ in range(self.max_workers)]
+        producer_task = asyncio.create_task(producer(run, *args))
+        tasks = {producer_task, *movers}
+        try:
+            # Movers only finish early by failing, so whatever completes first
+            # is either the producer or an error to propagate.
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+            await producer_task
+            await run.settle()
+            for _ in movers:
+                await run.moves.put(None)
+            await asyncio.gather(*movers)
+            return run.moved
+        finally:
+            for task in (*tasks, *run._retries):
+                task.cancel()
+            await asyncio.gather(*tasks, *run._retries, return_exceptions=True)
+            run.handles.close()
+
+    def _override_error(self, path, error):
+        """
+        Record an invalid override file; its folder keeps the inherited rules.
+        """
+        self.report.add_failure("override", path, error)
+
+    async def _destination(self, run, entry, scope=None):
+        """
+        FileMapping.destination_for for a listed file (an os.DirEntry), with any stat
+        or content sniffing done on the executor (and retried there, see
+        _SortRun.retrying). scope is a mapping_overrides.MappingScope to use instead
+        of the mapping.
+        """
+        scope = scope or self.mapping
+        dest_folder = scope.match(entry.name)
+        if scope.needs_stat(dest_folder):
+            return await run.retrying("classify", entry.path, scope.resolve, entry.name, entry.path, dest_folder,
+                                      entry)
+        return scope.resolve(entry.name, entry.path, dest_folder, entry)
+
+    async def _enqueue_directory(self, run, src_dir, dest_dir):
+        entries = await run.retrying("list", src_dir, _list_files, src_dir)
+        for entry in entries or ():
+            dest_folder = await self._destination(run, entry)
+            if dest_folder:
+                dest_path = os.path.join(dest_dir, dest_folder)
+                await run.moves.put((
+                    entry.path,
+                    dest_path,
+                    os.path.join(dest_path, entry.name),
+                ))
+
+    async def _enqueue_batch(self, run, source_dirs, dest_root):
+        listings = await asyncio.gather(
+            *(run.retrying("list", src_dir, _list_files, src_dir) for src_dir in source_dirs)
+        )
+        with MovePlan(dest_root, self.plan_memory) as plan:
+            for entries in listings:
+                for entry in entries or ():
+                    dest_folder = await self._destination(run, entry)
+                    if dest_folder:
+                        plan.add(entry.path, dest_folder, entry.name)
+            directories = plan.directories()
+            made = await asyncio.gather(
+                *(run.op_call(os.makedirs, d, exist_ok=True) for d in directories), return_exceptions=True
+            )
+            # A folder that could not be created is retried, and reported if need be, by its moves.
+            run.mark_created(d for d, error in zip(directories, made) if error is None)
+            # Spilled runs are read back on the executor too.
+            groups = plan.grouped()
+            while True:
+                group = await run.call(next, groups, None)
+                if group is None:
+                    break
+                dest_dir, moves = group
+                resolved = await run.retrying("list", dest_dir, plan.resolve, dest_dir, moves)
+                for src_path, target_path in resolved or ():
+                    await run.moves.put((src_path, dest_dir, target_path))
+
+    async def _enqueue_deep_audit(self, run, root_dir, pruner=None):
+        """
+        Walk root_dir with concurrent directory listings, queueing misplaced files.
+        """
+        run.pruner = pruner
+        scan = self.mapping.scan_filter
+        pending = asyncio.Queue()
+        pending.put_nowait((root_dir, [], self.mapping))
+
+        async def scanner():
+            while True:
+                dirpath, parts, scope = await pending.get()
+                try:
+                    listing = await run.retrying("list", dirpath, scan_dir, dirpath)
+                    if listing is None:
+                        continue  # unreadable, and reported
+                    subdirs, files = listing
+                    if pruner is not None:
+                        pruner.listed(dirpath, len(subdirs) + len(files))
+                    rel_dir = os.path.normpath(os.path.join(*parts)) if parts else "."
+                    if any(entry.name == OVERRIDE_FILE for entry in files):
+                        scope = await run.op_call(self.overrides.scope_for, scope, dirpath, rel_dir, None,
+                                                  self._override_error)
+                    for name in subdirs:
+                        child = parts + [name]
+                        if scan.check(child) != SCAN_SKIP:
+                            pending.put_nowait((os.path.join(dirpath, name), child, scope))
+                    if scan.check(parts) != SCAN_AUDIT:
+                        continue
+                    for entry in files:
+                        await self._enqueue_if_misplaced(run, root_dir, rel_dir, entry, scope)
+                finally:
+                    pending.task_done()
+
+        scanners = [asyncio.create_task(scanner()) for _ in range(max(1, self.max_workers // 2))]
+        join = asyncio.create_task(pending.join())
+        try:
+            done, _ = await asyncio.wait({join, *scanners}, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        finally:
+            for task in (join, *scanners):
+                task.cancel()
+            await asyncio.gather(join, *scanners, return_exceptions=True)
+
+    async def _enqueue_if_misplaced(self, run, root_dir, rel_dir, entry, scope):
+        correct_folder = await self._destination(run, entry, scope)
+        if not correct_folder:
+            return
+        if (self.mapping.scan_filter.fast_path_in_place
+                and self.mapping.normalized_destination(correct_folder) == rel_dir):
+            return
+        correct_path = os.path.join(root_dir, correct_folder)
+        current_path = entry.path
+        target_path = os.path.join(correct_path, entry.name)
+        if os.path.abspath(current_path) != os.path.abspath(target_path):
+            await run.moves.put((current_path, correct_path, target_path))
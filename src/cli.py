@@ -0,0 +1,315 @@
+"""
+Command-line entry point for FileSorter.
+
+Usage:
+    python -m src.cli sort MAPPING FOLDER [FOLDER ...] [--deep-audit [--prune-empty]] [--engine async] [--into DEST]
+                           [--daemon]
+    python -m src.cli link MAPPING VIEW FOLDER [FOLDER ...] [--deep]
+    python -m src.cli daemon [--port PORT] [--max-jobs N]
+    python -m src.cli shard-audit publish|work|status --queue QUEUE ...
+    python -m src.cli run-profile NAME
+    python -m src.cli scheduler
+    python -m src.cli analyze MAPPING [--apply-order]
+
+MAPPING may be a path or the name of a file in the mappings folder. The engine
+defaults to the "engine" value in settings.json, shared with the GUI.
+With --into, the files of all FOLDERs are sorted into one destination root
+instead of each folder's own category tree (--deep-audit then audits DEST).
+With --daemon, the sort runs in the local daemon (see src/daemon.py) and this
+command only submits it and waits for the result.
+Files that cannot be moved do not stop a sort; they are listed at the end and
+the exit status is 1.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from src import daemon
+from src import mapping_analysis
+from src import retry
+from src import scheduler
+from src import shard_audit
+from src import sorter
+from src import throttle
+from src import utils
+
+def cmd_sort(args):
+    if args.daemon:
+        return _sort_in_daemon(args)
+    settings = utils.load_settings()
+    engine = args.engine or settings.get(utils.ENGINE_KEY)
+    io_throttle = throttle.IOThrottle.from_settings(settings)
+    io_throttle.configure(
+        ops_per_second=args.ops_per_second if args.ops_per_second is not None else io_throttle.ops.rate,
+        bytes_per_second=args.bytes_per_second if args.bytes_per_second is not None else io_throttle.bytes.rate,
+        background=args.background or io_throttle.background,
+    )
+    sorter_obj = sorter.create_sorter(
+        utils.resolve_mapping_path(args.mapping), engine=engine, throttle=io_throttle,
+        record_hits=settings.get(utils.RECORD_HITS_KEY, True), plan_memory=utils.plan_memory(settings)
+    )
+    if args.into:
+        folders = []
+        for folder in args.folders:
+            if os.path.isdir(folder):
+                folders.append(folder)
+            else:
+                print(f"Skipping missing folder: {folder}", file=sys.stderr)
+        print(f"Sorting {len(folders)} folder(s) into {args.into}...")
+        moved = sorter_obj.sort_into(folders, args.into)
+        print(f"Moved {moved} file(s).")
+        if args.deep_audit:
+            print(f"Auditing {args.into}...")
+            pruned = sorter_obj.deep_audit_and_sort(args.into, prune_empty=args.prune_empty)
+            if args.prune_empty:
+                print(f"Removed {pruned} empty folder(s).")
+        return _print_report(sorter_obj.report)
+    for folder in args.folders:
+        if not os.path.isdir(folder):
+            print(f"Skipping missing folder: {folder}", file=sys.stderr)
+            continue
+        print(f"Sorting {folder}...")
+        sorter_obj.sort_current_directory(folder)
+        if args.deep_audit:
+            print(f"Auditing {folder}...")
+            pruned = sorter_obj.deep_audit_and_sort(folder, prune_empty=args.prune_empty)
+            if args.prune_empty:
+                print(f"Removed {pruned} empty folder(s).")
+    return _print_report(sorter_obj.report)
+
+
+def _print_report(report):
+    """
+    Print a run's failures and retries, if any. Returns the exit code: 1 if anything failed.
+    """
+    if report.failed or report.retried:
+        print(report.summary(), file=sys.stderr if report.failed else sys.stdout)
+    return 1 if report.failed else 0
+
+
+def cmd_link(args):
+    settings = utils.load_settings()
+    sorter_obj = sorter.create_sorter(
+        utils.resolve_mapping_path(args.mapping), engine=settings.get(utils.ENGINE_KEY),
+        throttle=throttle.IOThrottle.from_settings(settings)
+    )
+    folders = []
+    for folder in args.folders:
+        if os.path.isdir(folder):
+            folders.append(folder)
+        else:
+            print(f"Skipping missing folder: {folder}", file=sys.stderr)
+    print(f"Syncing link view {args.view}...")
+    stats = sorter_obj.link_into(folders, args.view, deep=args.deep)
+    print(f"{stats['linked']} hard link(s) and {stats['symlinked']} symlink(s) added, "
+          f"{stats['kept']} kept, {stats['removed']} removed.")
+    return _print_report(sorter_obj.report)
+
+
+def _sort_in_daemon(args):
+    client = daemon.DaemonClient.connect()
+    if client is None:
+        print("No daemon is running. Start one with: python -m src.cli daemon", file=sys.stderr)
+        return 1
+    job_id = client.submit({
+        "action": "sort",
+        "mapping": os.path.abspath(utils.resolve_mapping_path(args.mapping)),
+        "folders": [os.path.abspath(folder) for folder in args.folders],
+        "deep_audit": args.deep_audit,
+        "prune_empty": args.prune_empty,
+        "destination": os.path.abspath(args.into) if args.into else None,
+        "engine": args.engine,
+    })
+    print(f"Submitted job {job_id}; waiting...")
+    job = client.wait(job_id)
+    duration = job["finished_at"] - job["started_at"]
+    print(f"Job {job['status']} in {duration:.1f}s" + (f" ({job['error']})" if job.get("error") else ""))
+    if job["status"] != "completed":
+        return 1
+    return _print_report(retry.RunReport.from_dict(job.get("result") or {}))
+
+
+def cmd_daemon(args):
+    print("Sort daemon running. Press Ctrl+C to stop.")
+    try:
+        daemon.serve(port=args.port, max_jobs=args.max_jobs)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def cmd_shard_publish(args):
+    queue = shard_audit.WorkQueue(args.queue)
+    run_id, count = shard_audit.publish_audit(
+        queue, utils.resolve_mapping_path(args.mapping), args.root, shard_depth=args.depth
+    )
+    print(f"Published run {run_id} with {count} shard(s) to {args.queue}.")
+    return 0
+
+
+def cmd_shard_work(args):
+    def on_shard(shard, moved, error):
+        where = "/".join(shard["parts"]) or "."
+        if error is not None:
+            print(f"{where}: failed (attempt {shard['attempt']}): {error}", file=sys.stderr)
+        elif shard["report"].failed:
+            print(f"{where}: {moved} file(s) moved, {shard['report'].failed} failed", file=sys.stderr)
+        else:
+            print(f"{where}: {moved} file(s) moved")
+
+    settings = utils.load_settings()
+    worker = shard_audit.ShardWorker(
+        shard_audit.WorkQueue(args.queue), lease_seconds=args.lease,
+        throttle=throttle.IOThrottle.from_settings(settings), on_shard=on_shard
+    )
+    print(f"Worker {worker.owner} claiming shards from {args.queue}...")
+    try:
+        completed = worker.run(follow=args.follow)
+    except KeyboardInterrupt:
+        worker.stop()
+        return 1
+    print(f"Done: {completed} shard(s) completed.")
+    return 0
+
+
+def cmd_shard_status(args):
+    status = shard_audit.WorkQueue(args.queue).status()
+    shards = status["shards"]
+    print(f"Runs: {status['runs']}")
+    print("Shards: " + ", ".join(f"{shards.get(state, 0)} {state}" for state in shard_audit.STATES))
+    print(f"Files moved: {status['moved']}")
+    if status["failed_files"]:
+        print(f"Files that could not be moved: {status['failed_files']}")
+    for rel_dir, state, error in status["errors"]:
+        print(f"  {state} {rel_dir}: {error}")
+    return 0
+
+
+def cmd_run_profile(args):
+    sched = scheduler.SortScheduler(gap_seconds=0)
+    if not sched.trigger(args.name):
+        print(f"Profile '{args.name}' is already queued; running queued jobs.")
+    while True:
+        entry = sched.run_next()
+        if entry is None:
+            return 0
+        print(f"{entry['profile']}: {entry['status']} in {entry['duration']:.1f}s"
+              + (f" ({entry['error']})" if entry.get("error") else ""))
+
+
+def cmd_scheduler(args):
+    def on_event(event, job):
+        if event == "started":
+            print(f"Running profile '{job['profile']}'...")
+        else:
+            print(f"{job['profile']}: {job['status']} in {job['duration']:.1f}s"
+                  + (f" ({job['error']})" if job.get("error") else ""))
+    sched = scheduler.SortScheduler(poll_seconds=args.poll, on_event=on_event)
+    sched.start()
+    print("Scheduler running. Press Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        sched.stop()
+    return 0
+
+
+def cmd_analyze(args):
+    mapping_path = utils.resolve_mapping_path(args.mapping)
+    data = utils.MappingUtils.load_mapping(mapping_path)
+    rules, directives = utils.MappingUtils.split_directives(data)
+    analyzer = mapping_analysis.MappingAnalyzer(rules, sorter.load_hit_counts(mapping_path))
+    print("\n".join(analyzer.report()))
+    if args.apply_order:
+        order = analyzer.suggest_order()
+        if order == analyzer.patterns:
+            print("\nMapping is already in the suggested order.")
+        else:
+            reordered = {pattern: rules[pattern] for pattern in order}
+            utils.MappingUtils.save_mapping(mapping_path, utils.MappingUtils.merge_directives(reordered, directives))
+            print(f"\nRules reordered in {mapping_path}.")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="filesorter", description="Sort files using a FileSorter mapping.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    sort_parser = subparsers.add_parser("sort", help="Sort one or more folders.")
+    sort_parser.add_argument("mapping", help="Mapping file path or name in the mappings folder.")
+    sort_parser.add_argument("folders", nargs="+", help="Folders to sort.")
+    sort_parser.add_argument("--deep-audit", action="store_true", help="Recursively move misplaced files after sorting.")
+    sort_parser.add_argument("--prune-empty", action="store_true",
+                             help="With --deep-audit, remove the folders the audit emptied.")
+    sort_parser.add_argument("--into", metavar="DEST",
+                             help="Sort all folders into one destination root instead of each folder itself.")
+    sort_parser.add_argument("--engine", choices=sorter.ENGINES, help="Sorting engine (default: settings.json).")
+    sort_parser.add_argument("--ops-per-second", type=float, help="Limit file operations per second (0 = unlimited).")
+    sort_parser.add_argument("--bytes-per-second", type=float, help="Limit copied bytes per second (0 = unlimited).")
+    sort_parser.add_argument("--background", action="store_true", help="Run at background CPU and I/O priority.")
+    sort_parser.add_argument("--daemon", action="store_true", help="Run the sort in the running local daemon.")
+    sort_parser.set_defaults(func=cmd_sort)
+
+    run_parser = subparsers.add_parser("run-profile", help="Run a saved profile once.")
+    run_parser.add_argument("name", help="Profile name from settings.json.")
+    run_parser.set_defaults(func=cmd_run_profile)
+
+    sched_parser = subparsers.add_parser("scheduler", help="Run saved profiles on their intervals.")
+    sched_parser.add_argument("--poll", type=float, default=30, help="Seconds between schedule checks.")
+    sched_parser.set_defaults(func=cmd_scheduler)
+
+    link_parser = subparsers.add_parser("link", help="Build or refresh a sorted view made of links, without moving files.")
+    link_parser.add_argument("mapping", help="Mapping file path or name in the mappings folder.")
+    link_parser.add_argument("view", help="View folder to create or refresh (managed by FileSorter).")
+    link_parser.add_argument("folders", nargs="+", help="Folders whose files appear in the view.")
+    link_parser.add_argument("--deep", action="store_true", help="Include files in subfolders.")
+    link_parser.set_defaults(func=cmd_link)
+
+    daemon_parser = subparsers.add_parser("daemon", help="Run the local sort daemon for the GUI and CLI.")
+    daemon_parser.add_argument("--port", type=int, help=f"Localhost port (default: settings.json or {daemon.DEFAULT_PORT}).")
+    daemon_parser.add_argument("--max-jobs", type=int, default=daemon.DEFAULT_MAX_JOBS,
+                               help="Jobs on independent folders to run at once.")
+    daemon_parser.set_defaults(func=cmd_daemon)
+
+    shard_parser = subparsers.add_parser("shard-audit", help="Deep audit spread over several workers.")
+    shard_commands = shard_parser.add_subparsers(dest="shard_command", required=True)
+    publish_parser = shard_commands.add_parser("publish", help="Split a folder into shards and queue them.")
+    publish_parser.add_argument("mapping", help="Mapping file path or name in the mappings folder.")
+    publish_parser.add_argument("root", help="Folder to audit (the same path on every worker).")
+    publish_parser.add_argument("--queue", required=True, help="Work queue file (SQLite), shared by all workers.")
+    publish_parser.add_argument("--depth", type=int, default=shard_audit.DEFAULT_SHARD_DEPTH,
+                                help="Folder depth at which whole subtrees become one shard.")
+    publish_parser.set_defaults(func=cmd_shard_publish)
+    work_parser = shard_commands.add_parser("work", help="Claim and audit shards until none are left.")
+    work_parser.add_argument("--queue", required=True, help="Work queue file (SQLite), shared by all workers.")
+    work_parser.add_argument("--lease", type=float, default=shard_audit.DEFAULT_LEASE_SECONDS,
+                             help="Seconds a claimed shard stays reserved without a heartbeat.")
+    work_parser.add_argument("--follow", action="store_true",
+                             help="Keep waiting while other workers hold shards, to take over expired ones.")
+    work_parser.set_defaults(func=cmd_shard_work)
+    status_parser = shard_commands.add_parser("status", help="Show shard counts, moved files and failures.")
+    status_parser.add_argument("--queue", required=True, help="Work queue file (SQLite).")
+    status_parser.set_defaults(func=cmd_shard_status)
+
+    analyze_parser = subparsers.add_parser("analyze", help="Report unreachable, shadowed and overlapping rules.")
+    analyze_parser.add_argument("mapping", help="Mapping file path or name in the mappings folder.")
+    analyze_parser.add_argument("--apply-order", action="store_true",
+                                help="Rewrite the mapping in the suggested hit-based order.")
+    analyze_parser.set_defaults(func=cmd_analyze)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""
+Content-type (magic byte) rules for FileSorter.
+
+Name patterns cannot place files with a wrong or missing extension. A mapping may
+add content rules under the "$content" directive; they are consulted only for
+files that no name pattern matched:
+
+    "$content": {
+        "rules": [
+            {"type": "pdf", "destination": "PDF Documents"},
+            {"magic": "89504E47", "destination": "Images"},
+            {"magic": "66747970", "offset": 4, "destination": "Videos"}
+        ]
+    }
+
+A rule names a built-in signature ("type", see SIGNATURES) or gives the bytes in
+hex ("magic", at "offset", default 0). The first matching rule wins.
+
+ContentSniffer reads only as many leading bytes as the rules need (at most
+MAX_HEADER_BYTES) with a single read, and remembers the result for each file in
+a cache keyed by (inode, size, mtime) that is kept next to the mapping as
+<mapping>.content. Re-runs therefore do not open unchanged files again. The
+cache is dropped when the content rules change and holds at most
+MAX_CACHE_ENTRIES files, dropping the least recently used first.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+from src.retry import is_transient
+
+CONTENT_KEY = "$content"
+CONTENT_CACHE_SUFFIX = ".content"
+CONTENT_CACHE_FORMAT = 1
+MAX_HEADER_BYTES = 512
+MAX_CACHE_ENTRIES = 200000
+NO_MATCH = -1
+
+# name -> alternative (offset, bytes) signatures
+SIGNATURES = {
+    "pdf": [(0, b"%PDF-")],
+    "png": [(0, b"\x89PNG\r\n\x1a\n")],
+    "jpeg": [(0, b"\xff\xd8\xff")],
+    "gif": [(0, b"GIF87a"), (0, b"GIF89a")],
+    "bmp": [(0, b"BM")],
+    "tiff": [(0, b"II*\x00"), (0, b"MM\x00*")],
+    "webp": [(8, b"WEBP")],
+    "zip": [(0, b"PK\x03\x04"), (0, b"PK\x05\x06")],
+    "gzip": [(0, b"\x1f\x8b")],
+    "7z": [(0, b"7z\xbc\xaf\x27\x1c")],
+    "rar": [(0, b"Rar!\x1a\x07")],
+    "exe": [(0, b"MZ")],
+    "elf": [(0, b"\x7fELF")],
+    "mp3": [(0, b"ID3"), (0, b"\xff\xfb")],
+    "mp4": [(4, b"ftyp")],
+    "wav": [(8, b"WAVE")],
+    "ogg": [(0, b"OggS")],
+    "flac": [(0, b"fLaC")],
+    "sqlite": [(0, b"SQLite format 3\x00")],
+    "ole": [(0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1")],  # legacy .doc/.xls/.ppt/.msg
+    "rtf": [(0, b"{\\rtf")],
+    "psd": [(0, b"8BPS")],
+}
+
+
+def content_cache_path(mapping_path):
+    """
+    Return the path of the content-sniffing cache for a mapping.
+    """
+    return os.path.splitext(mapping_path)[0] + CONTENT_CACHE_SUFFIX
+
+
+def rules_from_directives(directives):
+    """
+    Return the "$content" rules of a mapping's directives ([] if none). Raises
+    ValueError if "$content" is not an object with a "rules" list.
+    """
+    content = directives.get(CONTENT_KEY, {})
+    rules = content.get("rules", []) if isinstance(content, dict) else None
+    if not isinstance(rules, list):
+        raise ValueError(f'"{CONTENT_KEY}" must be an object with a "rules" list, e.g. '
+                         f'{{"rules": [{{"type": "pdf", "destination": "PDF"}}]}}')
+    return rules
+
+
+def parse_content_rules(rules):
+    """
+    Turn "$content" entries into [(signatures, destination)]. Raises ValueError.
+    """
+    parsed = []
+    for rule in rules:
+        if not isinstance(rule, dict) or not rule.get("destination"):
+            raise ValueError(f"Content rule needs a destination: {rule!r}")
+        if "type" in rule:
+            signatures = SIGNATURES.get(str(rule["type"]).lower())
+            if signatures is None:
+                raise ValueError(f"Unknown content type {rule['type']!r}; known: {', '.join(sorted(SIGNATURES))}")
+        elif "magic" in rule:
+            try:
+                magic = bytes.fromhex(str(rule["magic"]))
+            except ValueError:
+                raise ValueError(f"Content rule magic must be hex bytes: {rule['magic']!r}") from None
+            offset = int(rule.get("offset", 0))
+            if not magic or offset < 0 or offset + len(magic) > MAX_HEADER_BYTES:
+                raise ValueError(f"Content rule must match within the first {MAX_HEADER_BYTES} bytes: {rule!r}")
+            signatures = [(offset, magic)]
+        else:
+            raise ValueError(f"Content rule needs a type or magic: {rule!r}")
+        parsed.append((signatures, rule["destination"]))
+    return parsed
+
+
+def read_header(path, size):
+    """
+    Read up to size leading bytes of a file with one read call.
+    """
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        if hasattr(os, "pread"):
+            return os.pread(fd, size, 0)
+        return os.read(fd, size)
+    finally:
+        os.close(fd)
+
+
+class ContentSniffer:
+    """
+    Classifies files by their leading bytes, with a persistent per-file result cache.
+    """
+    def __init__(self, rules, cache_path=None, max_entries=MAX_CACHE_ENTRIES):
+        self.rules = parse_content_rules(rules)
+        self.destinations = [dest for _, dest in self.rules]
+        self.header_bytes = max(
+            (offset + len(magic) for signatures, _ in self.rules for offset, magic in signatures), default=0
+        )
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+        self.reads = 0  # files actually opened, for diagnostics
+        self._rules_key = hashlib.sha256(json.dumps(rules, sort_keys=True).encode("utf-8")).hexdigest()
+        self._lock = threading.Lock()
+        self._cache = self._load()
+        self._dirty = False
+
+    def _load(self):
+        if not self.cache_path:
+            return OrderedDict()
+        # Imported here: sorter imports this module.
+        from src.sorter import _DataUnpickler
+        try:
+            with open(self.cache_path, "rb") as f:
+                payload = _DataUnpickler(f).load()
+            if payload["format"] == CONTENT_CACHE_FORMAT and payload["rules"] == self._rules_key:
+                return OrderedDict(payload["entries"])
+        except (OSError, EOFError, ValueError, KeyError, TypeError, pickle.UnpicklingError):
+            pass
+        return OrderedDict()
+
+    def destination(self, path, st=None):
+        """
+        Return the destination of the first content rule matching the file at path,
+        or None. st may be the file's stat result, if the caller already has it;
+        one without an inode number (os.DirEntry.stat() on Windows) is not used,
+        since files are cached by inode. A file that cannot be read is unmatched, unless the error is transient
+        (see retry.is_transient): that OSError is raised so the caller can retry.
+        """
+        if not self.rules:
+            return None
+        if st is None or not st.st_ino:
+            st = os.stat(path)
+        key = (st.st_ino, st.st_size, st.st_mtime_ns)
+        with self._lock:
+            index = self._cache.get(key)
+            if index is not None:
+                self._cache.move_to_end(key)
+        if index is None:
+            try:
+                header = read_header(path, self.header_bytes)
+            except OSError as e:
+                if is_transient(e):
+                    raise
+                return None
+            index = self._classify(header)
+            with self._lock:
+                self.reads += 1
+                self._cache[key] = index
+                self._dirty = True
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        return None if index == NO_MATCH else self.rules[index][1]
+
+    def _classify(self, header):
+        for index, (signatures, _) in enumerate(self.rules):
+            for offset, magic in signatures:
+                if header[offset:offset + len(magic)] == magic:
+                    return index
+        return NO_MATCH
+
+    def save(self):
+        """
+        Write the cache next to the mapping if it changed (best effort).
+        """
+        if not self.cache_path or not self._dirty:
+            return
+        from src.sorter import write_atomic
+        with self._lock:
+            payload = {"format": CONTENT_CACHE_FORMAT, "rules": self._rules_key, "entries": list(self._cache.items())}
+            self._dirty = False
+        try:
+            write_atomic(self.cache_path, pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL))
+        except OSError:
+            pass
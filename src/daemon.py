@@ -0,0 +1,452 @@
+"""
+Local sort daemon for FileSorter.
+
+`python -m src.cli daemon` starts a long-lived process that runs sort, audit and
+preview jobs for the GUI and the command line (`sort --daemon`). Unlike a fresh
+process per job it keeps every mapping it has used loaded and compiled in memory,
+together with its content-rule cache and per-folder override scopes, reloading
+one only when its file's size or modification time changes, and shares one I/O
+throttle across all jobs so the file server sees a single budget.
+
+Jobs whose roots overlap (the same folder, or one inside the other, including a
+sort-into destination) run one at a time in submission order; jobs on
+independent roots run in parallel, up to max_jobs at once. Previews only read,
+so they never wait for other jobs.
+
+The daemon listens on 127.0.0.1 and writes its port and a random token to
+daemon.json next to this file, readable only by the user who started it. Every
+request must send the token in the X-FileSorter-Token header, so other local
+users cannot drive it. API (JSON bodies and responses):
+
+    POST /jobs                   {"action": "sort" | "audit" | "preview", ...} -> {"id": ...}
+    GET  /jobs                   -> [job, ...] (active jobs, then recent finished ones)
+    GET  /jobs/<id>[?wait=SEC]   -> job, waiting up to SEC seconds for it to finish
+
+Job fields: "mapping" (path or name), "folders" (list), "deep_audit", "prune_empty", "destination"
+and "engine" for sorts and audits; "folder", "deep" and "sample_limit" for previews.
+"""
+
+import json
+import os
+import secrets
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from src import scheduler
+from src import sorter
+from src import throttle
+from src import utils
+from src.mapping_overrides import OverrideCache
+from src.preview import DEFAULT_SAMPLE_LIMIT, MappingPreview
+
+DAEMON_FILE = os.path.join(os.path.dirname(__file__), "daemon.json")
+DAEMON_PORT_KEY = "daemon_port"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_JOBS = 4
+TOKEN_HEADER = "X-FileSorter-Token"
+FINISHED_JOBS_KEPT = 200
+MAX_WAIT_SECONDS = 60
+ACTIONS = ("sort", "audit", "preview")
+
+
+def _root_key(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _overlaps(roots, other_roots):
+    """
+    Return True if any root is equal to, inside, or contains any of other_roots.
+    """
+    for a in roots:
+        for b in other_roots:
+            if a == b or a.startswith(b.rstrip(os.sep) + os.sep) or b.startswith(a.rstrip(os.sep) + os.sep):
+                return True
+    return False
+
+
+class MappingCache:
+    """
+    Compiled mappings kept in memory, keyed by path and revalidated by (size, mtime),
+    with the run state built from them: the FileMapping (and so its content-rule
+    cache) and the OverrideCache of per-folder override scopes.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # path -> ((size, mtime_ns), (data, matcher))
+        self._warm = {}  # path -> ((size, mtime_ns), record_hits, FileMapping, OverrideCache)
+
+    def _version(self, mapping_path):
+        path = os.path.abspath(mapping_path)
+        st = os.stat(path)
+        return path, (st.st_size, st.st_mtime_ns)
+
+    def get(self, mapping_path):
+        """
+        Return (mapping contents, RuleMatcher), loading the mapping only if it changed.
+        """
+        path, version = self._version(mapping_path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+        compiled = sorter.load_compiled_mapping(path)
+        with self._lock:
+            self._entries[path] = (version, compiled)
+        return compiled
+
+    def run_state(self, mapping_path, record_hits):
+        """
+        Return (FileMapping, OverrideCache) for a mapping, shared by every job that
+        uses it until the mapping file changes.
+        """
+        path, version = self._version(mapping_path)
+        with self._lock:
+            entry = self._warm.get(path)
+            if entry is not None and entry[:2] == (version, record_hits):
+                return entry[2:]
+        mapping = sorter.FileMapping(path, record_hits=record_hits, compiled=self.get(path))
+        state = (mapping, OverrideCache(mapping))
+        with self._lock:
+            self._warm[path] = (version, record_hits) + state
+        return state
+
+
+class _Job:
+    def __init__(self, params):
+        self.id = uuid.uuid4().hex
+        self.action = params["action"]
+        self.params = params
+        self.status = "queued"
+        self.error = None
+        self.result = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+        if self.action == "preview":
+            self.roots = []
+        else:
+            roots = list(params["folders"])
+            if params.get("destination"):
+                roots.append(params["destination"])
+            self.roots = [_root_key(root) for root in roots]
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "action": self.action,
+            "params": self.params,
+            "status": self.status,
+            "error": self.error,
+            "result": self.result,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+def _validate(params):
+    """
+    Check a job request, returning a cleaned copy. Raises ValueError.
+    """
+    if not isinstance(params, dict) or params.get("action") not in ACTIONS:
+        raise ValueError(f"action must be one of: {', '.join(ACTIONS)}")
+    if not isinstance(params.get("mapping"), str) or not params["mapping"]:
+        raise ValueError("mapping is required")
+    job = {"action": params["action"], "mapping": params["mapping"]}
+    if params["action"] == "preview":
+        if not isinstance(params.get("folder"), str) or not params["folder"]:
+            raise ValueError("folder is required")
+        job["folder"] = params["folder"]
+        job["deep"] = bool(params.get("deep"))
+        limit = params.get("sample_limit", DEFAULT_SAMPLE_LIMIT)
+        if limit is not None and not isinstance(limit, int):
+            raise ValueError("sample_limit must be an integer or null")
+        job["sample_limit"] = limit
+        return job
+    folders = params.get("folders")
+    if not isinstance(folders, list) or not folders or not all(isinstance(f, str) and f for f in folders):
+        raise ValueError("folders must be a non-empty list of paths")
+    job["folders"] = folders
+    job["deep_audit"] = bool(params.get("deep_audit"))
+    job["prune_empty"] = bool(params.get("prune_empty"))
+    if params.get("destination"):
+        job["destination"] = str(params["destination"])
+    engine = params.get("engine")
+    if engine is not None and engine not in sorter.ENGINES:
+        raise ValueError(f"engine must be one of: {', '.join(sorter.ENGINES)}")
+    job["engine"] = engine
+    return job
+
+
+class SortDaemon:
+    """
+    Job runner with warm mapping caches and per-root serialization.
+    """
+    def __init__(self, max_jobs=DEFAULT_MAX_JOBS, settings_loader=utils.load_settings):
+        self.max_jobs = max(1, max_jobs)
+        self.settings_loader = settings_loader
+        self.mappings = MappingCache()
+        self.throttle = throttle.IOThrottle.from_settings(settings_loader())
+        self._lock = threading.Lock()
+        self._active = []  # queued and running jobs, in submission order
+        self._finished = OrderedDict()  # id -> job, oldest first
+
+    def submit(self, params):
+        """
+        Queue a job request (see the module docstring). Returns the job id.
+        """
+        job = _Job(_validate(params))
+        with self._lock:
+            self._active.append(job)
+            self._dispatch()
+        return job.id
+
+    def job(self, job_id, wait=0):
+        """
+        Return a job as a dict (None if unknown), waiting up to wait seconds for it to finish.
+        """
+        with self._lock:
+            job = self._find(job_id)
+        if job is None:
+            return None
+        if wait:
+            job.done.wait(min(wait, MAX_WAIT_SECONDS))
+        with self._lock:
+            return job.to_dict()
+
+    def jobs(self):
+        with self._lock:
+            return [job.to_dict() for job in self._active + list(reversed(self._finished.values()))]
+
+    def _find(self, job_id):
+        for job in self._active:
+            if job.id == job_id:
+                return job
+        return self._finished.get(job_id)
+
+    def _dispatch(self):
+        # Called with the lock held. A queued job starts when no earlier active
+        # job overlaps its roots, so conflicting jobs keep their submission order.
+        running = sum(1 for job in self._active if job.status == "running")
+        for index, job in enumerate(self._active):
+            if running >= self.max_jobs:
+                return
+            if job.status != "queued":
+                continue
+            if any(_overlaps(job.roots, earlier.roots) for earlier in self._active[:index]):
+                continue
+            job.status = "running"
+            job.started_at = time.time()
+            running += 1
+            threading.Thread(target=self._run, args=(job,), name=f"SortJob-{job.id[:8]}", daemon=True).start()
+
+    def _run(self, job):
+        status, error, result = "completed", None, None
+        try:
+            result = self._execute(job.params)
+        except Exception as e:
+            status, error = "failed", str(e)
+        with self._lock:
+            job.status, job.error, job.result = status, error, result
+            job.finished_at = time.time()
+            self._active.remove(job)
+            self._finished[job.id] = job
+            while len(self._finished) > FINISHED_JOBS_KEPT:
+                self._finished.popitem(last=False)
+            self._dispatch()
+        job.done.set()
+
+    def _execute(self, params):
+        mapping_path = utils.resolve_mapping_path(params["mapping"])
+        if params["action"] == "preview":
+            preview = MappingPreview.from_mapping_file(
+                mapping_path, params["folder"], compiled=self.mappings.get(mapping_path),
+                deep=params["deep"], sample_limit=params["sample_limit"]
+            ).start()
+            preview.wait()
+            snapshot = preview.snapshot()
+            if snapshot["error"]:
+                raise snapshot["error"]
+            del snapshot["error"]
+            snapshot["destinations"] = {dest: list(totals) for dest, totals in snapshot["destinations"].items()}
+            return snapshot
+        settings = self.settings_loader()
+        # Each job gets its own sorter (and so its own run report and directory
+        # handles, which must not outlive the job's folders); the mapping state is shared.
+        mapping, overrides = self.mappings.run_state(mapping_path, settings.get(utils.RECORD_HITS_KEY, True))
+        sorter_obj = sorter.create_sorter(
+            mapping_path, engine=params["engine"] or settings.get(utils.ENGINE_KEY),
+            throttle=self.throttle, mapping=mapping, overrides=overrides,
+            plan_memory=utils.plan_memory(settings),
+        )
+        if params["action"] == "sort":
+            scheduler.sort_folders(sorter_obj, params)
+        else:
+            for folder in params["folders"]:
+                if os.path.isdir(folder):
+                    sorter_obj.deep_audit_and_sort(folder, prune_empty=params["prune_empty"])
+        return sorter_obj.report.to_dict()
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    server_version = "FileSorterDaemon"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _authorized(self):
+        token = self.headers.get(TOKEN_HEADER, "")
+        if secrets.compare_digest(token, self.server.token):
+            return True
+        self._reply(403, {"error": "invalid token"})
+        return False
+
+    def _reply(self, code, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        if parts == ["jobs"]:
+            self._reply(200, self.server.daemon.jobs())
+        elif len(parts) == 2 and parts[0] == "jobs":
+            try:
+                wait = float(parse_qs(url.query).get("wait", ["0"])[0])
+            except ValueError:
+                wait = 0
+            job = self.server.daemon.job(parts[1], wait=wait)
+            if job is None:
+                self._reply(404, {"error": "unknown job"})
+            else:
+                self._reply(200, job)
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        if self.path.rstrip("/") != "/jobs":
+            self._reply(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            job_id = self.server.daemon.submit(json.loads(self.rfile.read(length) or b"null"))
+        except ValueError as e:
+            self._reply(400, {"error": str(e)})
+            return
+        self._reply(202, {"id": job_id})
+
+
+class DaemonServer(ThreadingHTTPServer):
+    """
+    HTTP front end for a SortDaemon on 127.0.0.1.
+    """
+    daemon_threads = True
+
+    def __init__(self, daemon, port=DEFAULT_PORT, info_path=DAEMON_FILE):
+        super().__init__(("127.0.0.1", port), _RequestHandler)
+        self.daemon = daemon
+        self.token = secrets.token_hex(16)
+        self.info_path = info_path
+
+    def publish(self):
+        """
+        Write the port and token for clients, readable by the current user only.
+        """
+        fd = os.open(self.info_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"port": self.server_address[1], "token": self.token, "pid": os.getpid()}, f)
+        os.chmod(self.info_path, 0o600)
+
+    def unpublish(self):
+        try:
+            with open(self.info_path, "r", encoding="utf-8") as f:
+                if json.load(f).get("token") != self.token:
+                    return  # another daemon has taken over
+            os.remove(self.info_path)
+        except (OSError, ValueError):
+            pass
+
+
+class DaemonClient:
+    """
+    Thin client for a running daemon.
+    """
+    def __init__(self, port, token, timeout=10):
+        self.base_url = f"http://127.0.0.1:{port}"
+        self.token = token
+        self.timeout = timeout
+
+    @classmethod
+    def connect(cls, info_path=DAEMON_FILE):
+        """
+        Return a client for the running daemon, or None if none is reachable.
+        """
+        try:
+            with open(info_path, "r", encoding="utf-8") as f:
+                info = json.load(f)
+            client = cls(info["port"], info["token"])
+            client._request("GET", "/jobs")
+            return client
+        except (OSError, ValueError, KeyError, RuntimeError):
+            return None
+
+    def _request(self, method, path, body=None, timeout=None):
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method)
+        request.add_header(TOKEN_HEADER, self.token)
+        if data is not None:
+            request.add_header("Content-Type", "application/json")
+        try:
+            with urllib.request.urlopen(request, timeout=timeout or self.timeout) as response:
+                return json.load(response)
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.load(e).get("error", e.reason)
+            except ValueError:
+                message = e.reason
+            raise RuntimeError(f"Daemon error: {message}") from None
+
+    def submit(self, params):
+        return self._request("POST", "/jobs", params)["id"]
+
+    def job(self, job_id, wait=0):
+        return self._request("GET", f"/jobs/{job_id}?wait={wait}", timeout=self.timeout + wait)
+
+    def wait(self, job_id, poll_seconds=30):
+        """
+        Block until a job finishes and return it.
+        """
+        while True:
+            job = self.job(job_id, wait=poll_seconds)
+            if job["status"] in ("completed", "failed"):
+                return job
+
+
+def serve(port=None, max_jobs=DEFAULT_MAX_JOBS):
+    """
+    Run a daemon in the foreground until interrupted.
+    """
+    if port is None:
+        port = utils.load_settings().get(DAEMON_PORT_KEY, DEFAULT_PORT)
+    server = DaemonServer(SortDaemon(max_jobs=max_jobs), port=port)
+    server.publish()
+    try:
+        server.serve_forever()
+    finally:
+        server.unpublish()
+        server.server_close()
@@ -0,0 +1,148 @@
+"""
+Destination templates for FileSorter.
+
+A destination may contain placeholders that are filled in for each file:
+
+    "*.jpg": "Images/{mtime:%Y}/{mtime:%m}",
+    "*.log": "Logs/{ext}"
+
+{ext}        the file's extension in lower case, without the dot (NO_EXTENSION if none)
+{mtime:FMT}  the file's modification time (local), formatted with strftime;
+             FMT defaults to %Y-%m-%d
+
+Literal braces are written {{ and }}. Only {mtime} needs the file's stat result,
+and FileMapping passes the one it already has (the listing's os.DirEntry, or the
+stat also used by content rules), so a file is never stat'ed twice and files
+whose destination is static are not stat'ed at all.
+
+Expansions are cached per template by the values they depend on (the extension
+and the date, or the second for formats with a time of day), so a million photos
+from one month are formatted once and share one destination string, which keeps
+the sorters' per-destination caches (normalized paths, created folders) hot.
+"""
+
+import glob
+import os
+import string
+import time
+
+NO_EXTENSION = "no extension"
+DEFAULT_TIME_FORMAT = "%Y-%m-%d"
+FIELDS = ("ext", "mtime")
+MAX_CACHED_EXPANSIONS = 65536
+
+# strftime directives that only depend on the date, not the time of day.
+_DATE_DIRECTIVES = set("aAbBCdDeFgGhjmuUVwWxyY%")
+
+_formatter = string.Formatter()
+
+
+def _parse(destination):
+    """
+    Return [(literal, field, spec)] for a destination. Raises ValueError.
+    """
+    parts = []
+    for literal, field, spec, conversion in _formatter.parse(destination):
+        if field is not None:
+            if field not in FIELDS:
+                raise ValueError(f"Unknown placeholder {{{field}}} in destination {destination!r}; "
+                                 f"known: {', '.join(FIELDS)}")
+            if conversion or (field == "ext" and spec):
+                raise ValueError(f"Unsupported placeholder format in destination {destination!r}")
+        parts.append((literal, field, spec))
+    return parts
+
+
+def is_template(destination):
+    """
+    Return True if a destination contains placeholders.
+    """
+    if "{" not in destination and "}" not in destination:
+        return False
+    return any(field is not None for _, field, _ in _parse(destination))
+
+
+def compile_templates(destinations):
+    """
+    Return {destination: DestinationTemplate} for the destinations that are templates.
+    Raises ValueError for a malformed placeholder.
+    """
+    return {dest: DestinationTemplate(dest) for dest in set(destinations) if dest and is_template(dest)}
+
+
+def destination_glob(destination):
+    """
+    Return a relative glob matching every folder a destination can expand to:
+    literal components are escaped, templated ones become "*".
+    """
+    components = []
+    for component in destination.replace("\\", "/").split("/"):
+        if not component or component == ".":
+            continue
+        components.append("*" if is_template(component) else glob.escape(component.replace("{{", "{").replace("}}", "}")))
+    return "/".join(components)
+
+
+def static_prefix(destination):
+    """
+    Return the leading components of a destination that contain no placeholders.
+    """
+    components = []
+    for component in destination.replace("\\", "/").split("/"):
+        if is_template(component):
+            break
+        if component and component != ".":
+            components.append(component.replace("{{", "{").replace("}}", "}"))
+    return os.path.join(*components) if components else ""
+
+
+class DestinationTemplate:
+    """
+    A destination with placeholders, expanded per file with a cache of results.
+    """
+    def __init__(self, destination):
+        self.destination = destination
+        self.parts = _parse(destination)
+        fields = {field for _, field, _ in self.parts if field}
+        self.uses_ext = "ext" in fields
+        self.needs_stat = "mtime" in fields
+        formats = [spec or DEFAULT_TIME_FORMAT for _, field, spec in self.parts if field == "mtime"]
+        date_only = all(_date_only(fmt) for fmt in formats)
+        # Leading struct_time fields an expansion depends on: (year, month, day) or down to the second.
+        self._time_fields = 3 if date_only else 6
+        self._cache = {}
+
+    def expand(self, filename, st=None):
+        """
+        Return the destination for a file; st is its stat result, required if needs_stat.
+        """
+        ext = tm = None
+        if self.uses_ext:
+            ext = os.path.splitext(filename)[1][1:].lower() or NO_EXTENSION
+        if self.needs_stat:
+            if st is None:
+                raise ValueError(f"Destination {self.destination!r} needs the file's stat result")
+            tm = time.localtime(st.st_mtime)
+        key = (ext, tm[:self._time_fields] if tm is not None else None)
+        dest = self._cache.get(key)
+        if dest is None:
+            dest = "".join(
+                literal + ("" if field is None else ext if field == "ext" else time.strftime(spec or DEFAULT_TIME_FORMAT, tm))
+                for literal, field, spec in self.parts
+            )
+            if len(self._cache) >= MAX_CACHED_EXPANSIONS:
+                self._cache.clear()
+            self._cache[key] = dest
+        return dest
+
+
+def _date_only(fmt):
+    index = fmt.find("%")
+    while index != -1 and index + 1 < len(fmt):
+        directive = fmt[index + 1]
+        if directive in "-#":  # platform flags such as %-d
+            directive = fmt[index + 2:index + 3]
+        if directive not in _DATE_DIRECTIVES:
+            return False
+        index = fmt.find("%", index + 2)
+    return True
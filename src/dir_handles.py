@@ -0,0 +1,128 @@
+"""
+Cached directory handles for path-relative file operations.
+
+Moving a file by absolute path makes the OS (and an NFS/SMB client) resolve every
+component of both paths for every file, which adds up on trees ten or more levels
+deep. DirHandleCache opens each source and destination directory once and keeps
+the descriptors in a bounded LRU; renames and destination listings then go
+through os.rename(..., src_dir_fd=, dst_dir_fd=) and os.listdir(fd), so each
+move only looks up the two file names. Source folders are listed by path (one
+lookup per folder), because their os.DirEntry objects outlive the handle.
+
+Where the platform lacks these calls (Windows), SUPPORTED is False and callers use
+plain paths. The cache is thread-safe: a handle evicted while another thread is
+still using it is closed when that thread releases it.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+SUPPORTED = (
+    hasattr(os, "O_DIRECTORY")
+    and os.rename in os.supports_dir_fd
+    and os.listdir in os.supports_fd
+)
+DEFAULT_CAPACITY = 128
+
+
+class _Handle:
+    __slots__ = ("fd", "users", "evicted")
+
+    def __init__(self, fd):
+        self.fd = fd
+        self.users = 0
+        self.evicted = False
+
+
+class DirHandleCache:
+    """
+    Bounded LRU of open directory descriptors, keyed by normalized path.
+    """
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = max(1, capacity)
+        self.opened = 0  # directories opened, for diagnostics
+        self._handles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @contextmanager
+    def open(self, path):
+        """
+        Yield a descriptor for the directory at path, opening it only on a cache miss.
+        """
+        key = os.path.normpath(path)
+        handle = self._acquire(key)
+        try:
+            yield handle.fd
+        finally:
+            self._release(handle)
+
+    def listdir(self, path):
+        """
+        Return the names of all entries in the directory at path.
+        """
+        if not SUPPORTED:
+            return os.listdir(path)
+        with self.open(path) as fd:
+            return os.listdir(fd)
+
+    def list_files(self, path):
+        """
+        Return the os.DirEntry of each regular file (following symlinks) directly
+        inside path. The folder is listed by path rather than through its handle, so
+        the entries' stat() keeps working after the handle is released or evicted.
+        """
+        with os.scandir(path) as it:
+            return [entry for entry in it if entry.is_file()]
+
+    def close(self):
+        """
+        Close every cached descriptor (those still in use close on release).
+        """
+        with self._lock:
+            handles = list(self._handles.values())
+            self._handles.clear()
+            for handle in handles:
+                self._evict(handle)
+
+    def _acquire(self, key):
+        with self._lock:
+            handle = self._handles.get(key)
+            if handle is not None:
+                self._handles.move_to_end(key)
+                handle.users += 1
+                return handle
+        # Open outside the lock: on a network share this is a round trip.
+        fd = os.open(key, os.O_RDONLY | os.O_DIRECTORY)
+        with self._lock:
+            handle = self._handles.get(key)
+            if handle is not None:
+                # Another thread opened it meanwhile.
+                os.close(fd)
+                self._handles.move_to_end(key)
+            else:
+                handle = self._handles[key] = _Handle(fd)
+                self.opened += 1
+                while len(self._handles) > self.capacity:
+                    self._evict(self._handles.popitem(last=False)[1])
+            handle.users += 1
+            return handle
+
+    def _release(self, handle):
+        with self._lock:
+            handle.users -= 1
+            if handle.evicted and handle.users == 0:
+                os.close(handle.fd)
+
+    def _evict(self, handle):
+        # Called with the lock held.
+        handle.evicted = True
+        if handle.users == 0:
+            os.close(handle.fd)
@@ -0,0 +1,127 @@
+"""
+Empty-folder pruning after a deep audit.
+
+A deep audit moves files out of many subfolders, and the emptied folders slow
+down every later walk. EmptyDirPruner removes them without walking the tree
+again: the audit reports each folder's entry count as it lists it and every
+file it moves, and prune() then removes the folders whose count dropped to
+zero, deepest first, so a parent emptied by removing its last subfolder goes
+too.
+
+Only folders emptied during the run are removed; folders that were already
+empty are left alone. Never removed are the audited root, the mapping's
+destination folders and their parents (template destinations match any
+expansion), and the folders of the mapping's template tree. os.rmdir is the
+final check, so a folder that gained an entry in the meantime simply stays.
+"""
+
+import fnmatch
+import glob
+import heapq
+import os
+
+from src.destination_templates import destination_glob
+
+
+class EmptyDirPruner:
+    """
+    Tracks per-folder entry counts during a deep audit and removes emptied folders.
+    """
+    def __init__(self, root_dir, throttle=None):
+        self.root_dir = os.path.normpath(root_dir)
+        self.throttle = throttle
+        self._counts = {}    # folder -> entries left
+        self._emptied = set()
+        self._protected = []  # relative glob components of protected folders
+
+    @classmethod
+    def for_mapping(cls, mapping, root_dir, throttle=None):
+        """
+        Return a pruner for root_dir protecting a FileMapping's destinations and template tree.
+        """
+        # Imported here: sorter imports this module.
+        from src.sorter import template_dir
+        pruner = cls(root_dir, throttle)
+        pruner.protect_destinations(mapping.mapping.values())
+        if mapping.sniffer is not None:
+            pruner.protect_destinations(mapping.sniffer.destinations)
+        pruner.protect_tree(template_dir(mapping.mapping_path))
+        return pruner
+
+    def protect_destinations(self, destinations):
+        """
+        Never remove these destination folders (relative, may be templates) or their parents.
+        """
+        for dest in destinations:
+            if dest:
+                self._protected.append(destination_glob(dest).split("/"))
+
+    def protect_tree(self, template_dir):
+        """
+        Never remove folders whose relative path exists in template_dir.
+        """
+        for dirpath, dirnames, _ in os.walk(template_dir):
+            for name in dirnames:
+                rel_path = os.path.relpath(os.path.join(dirpath, name), template_dir)
+                self._protected.append([glob.escape(part) for part in rel_path.split(os.sep)])
+
+    def listed(self, dirpath, entries):
+        """
+        Record a folder's number of entries (files and subfolders) when it is listed.
+        """
+        self._counts[os.path.normpath(dirpath)] = entries
+
+    def moved(self, src_dir, dest_dir):
+        """
+        Record one file moved from src_dir into dest_dir.
+        """
+        src_dir = os.path.normpath(src_dir)
+        left = self._counts.get(src_dir)
+        if left is not None:
+            self._counts[src_dir] = left - 1
+            if left == 1:
+                self._emptied.add(src_dir)
+        dest_dir = os.path.normpath(dest_dir)
+        if dest_dir in self._counts:
+            self._counts[dest_dir] += 1
+
+    def prune(self):
+        """
+        Remove the folders emptied during the run, deepest first. Returns how many were removed.
+        """
+        heap = [(-path.count(os.sep), path) for path in self._emptied]
+        heapq.heapify(heap)
+        removed = 0
+        while heap:
+            _, path = heapq.heappop(heap)
+            if self._counts.get(path) != 0 or self._is_protected(path):
+                continue
+            if self.throttle is not None:
+                self.throttle.op()
+            try:
+                os.rmdir(path)
+            except OSError:
+                continue
+            removed += 1
+            self._counts.pop(path)
+            parent = os.path.dirname(path)
+            left = self._counts.get(parent)
+            if left is not None:
+                self._counts[parent] = left - 1
+                if left == 1:
+                    heapq.heappush(heap, (-parent.count(os.sep), parent))
+        self._emptied.clear()
+        return removed
+
+    def _is_protected(self, path):
+        rel_path = os.path.relpath(path, self.root_dir)
+        if rel_path == ".":
+            return True
+        parts = os.path.normcase(rel_path).split(os.sep)
+        for pattern in self._protected:
+            # A destination protects itself and every folder above it.
+            if len(parts) <= len(pattern) and all(
+                fnmatch.fnmatch(part, os.path.normcase(pattern[i])) for i, part in enumerate(parts)
+            ):
+                return True
+        return False
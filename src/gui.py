@@ -1,47 +1,98 @@
 import os
-import json
 import tkinter as tk
-from tkinter import ttk, messagebox
-from tkinterdnd2 import DND_FILES, TkinterDnD
+from tkinter import ttk, messagebox, simpledialog
 import threading
+import time
 
 from src import sorter
-from src.mapping_editor.editor import MappingEditor
+from src import retry
+from src import scheduler
+from src import throttle
 from src import utils
 
 # --- Constants ---
-SETTINGS_FILE = os.path.join(os.path.dirname(__file__), "settings.json")
+SETTINGS_FILE = utils.SETTINGS_FILE
 MAPPINGS_DIR = os.path.join(os.path.dirname(__file__), "mappings")
 LAST_MAPPING_KEY = "last_mapping"
+ENGINE_KEY = utils.ENGINE_KEY
+MAX_LISTED_FAILURES = 10  # failures listed in the end-of-run dialog
 
-def load_settings():
-    if os.path.exists(SETTINGS_FILE):
-        try:
-            with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            return {}
-    return {}
-
-def save_settings(settings):
-    try:
-        with open(SETTINGS_FILE, "w", encoding="utf-8") as f:
-            json.dump(settings, f)
-    except Exception:
-        pass
+load_settings = utils.load_settings
 
 class FileSorterGUI:
-    def __init__(self, root):
+    def __init__(self, root, startup_timer=None):
         self.root = root
+        self.startup_timer = startup_timer
+        self._dnd_files = None  # tkinterdnd2.DND_FILES once drag-and-drop is loaded
+        self._startup_finished = False
         self.root.title("File Sorter")
-        self.root.geometry("500x500")
+        self.root.geometry("500x590")
         self.mapping_path = None
         self.deep_audit = tk.BooleanVar(value=False)
+        self.prune_empty = tk.BooleanVar(value=False)
+        self.sort_into = tk.BooleanVar(value=False)
+        self.destination_root = tk.StringVar()
         self.settings = load_settings()
+        # Settings changes are coalesced and written off the UI thread.
+        self.settings_writer = utils.SettingsWriter()
+        self.throttle = throttle.IOThrottle.from_settings(self.settings)
+        self.background_priority = tk.BooleanVar(value=self.throttle.background)
+        self.ops_limit = tk.StringVar(value=str(self.settings.get(throttle.OPS_PER_SECOND_KEY) or 0))
         self.root.minsize(300, 220)
 
         self._build_widgets()
+        self._mark_startup("widgets built")
+
+        self.scheduler = scheduler.SortScheduler(
+            on_event=lambda event, job: self.root.after(0, self._on_scheduler_event, event, job),
+            io_throttle=self.throttle,
+        )
+
+        # Disk access and drag-and-drop setup wait until the window has been painted.
+        self.status_label.config(text="Loading mappings...")
+        self.root.bind("<Map>", self._on_first_map, add="+")
+
+    def _mark_startup(self, phase):
+        if self.startup_timer:
+            self.startup_timer.mark(phase)
+
+    def _on_first_map(self, event):
+        if event.widget is not self.root or self._startup_finished:
+            return
+        self._startup_finished = True
+        self.root.after_idle(self._finish_startup)
+
+    def _finish_startup(self):
+        self._mark_startup("first paint")
         self._populate_mappings()
+        self._populate_profiles()
+        self.status_label.config(text="Ready")
+        self._mark_startup("mappings discovered")
+        self._ensure_drag_and_drop()
+        self._mark_startup("drag-and-drop loaded")
+        self.scheduler.start()
+        if self.startup_timer:
+            self.startup_timer.report()
+
+    def _ensure_drag_and_drop(self):
+        """
+        Load tkinterdnd2 into the running Tk interpreter and register drop targets.
+        Drag-and-drop is simply unavailable if tkinterdnd2 cannot be loaded.
+        """
+        if self._dnd_files is not None:
+            return True
+        try:
+            from tkinterdnd2 import DND_FILES, TkinterDnD
+            # TkinterDnD.Tk() does this in its constructor; the root window here is a
+            # plain tk.Tk so that tkdnd is not loaded before the first paint.
+            TkinterDnD._require(self.root)
+        except (ImportError, AttributeError, RuntimeError, tk.TclError):
+            self._dnd_files = False
+            return False
+        self._dnd_files = DND_FILES
+        self.folder_listbox.drop_target_register(DND_FILES)
+        self.folder_listbox.dnd_bind('<<Drop>>', self._on_drop_folders)
+        return True
 
     def _show_help(self):
         message = (
@@ -50,8 +101,21 @@ class FileSorterGUI:
             "Folders to Sort:\n"
             "- Add one or more folders to the list. Each will be sorted according to the mapping.\n"
             "- You can drag and drop folders from Explorer into the list below to add them quickly.\n\n"
+            "Sort into one folder:\n"
+            "Sends the files of every listed folder into a single destination folder's category tree, "
+            "instead of giving each folder its own. Name clashes get a \" (n)\" suffix. "
+            "With Deep Audit, the destination folder is audited afterwards.\n\n"
             "Deep Audit:\n"
-            "When enabled, after sorting, the tool will recursively scan for misplaced files and move them to the correct folders.\n\n"
+            "When enabled, after sorting, the tool will recursively scan for misplaced files and move them to the correct folders.\n"
+            "Prune empty also removes the folders the audit emptied (never destination or template folders).\n\n"
+            "Background priority / Max ops/s:\n"
+            "Limit the load a sort puts on the file server. Both can be changed while a sort is running.\n\n"
+            "Profiles:\n"
+            "Save the current mapping, folders and options as a named profile. Profiles with an interval "
+            "run automatically in the background, one at a time; Run Now queues one immediately.\n\n"
+            "Preview:\n"
+            "Shows how many files (and bytes) would go to each destination and which files match no rule, "
+            "without moving anything.\n\n"
             "Use the Mapping Editor to create or modify mapping files.\n"
         )
         messagebox.showinfo("Help - File Sorter", message)
@@ -69,6 +133,29 @@ class FileSorterGUI:
         edit_btn.pack(side="left", padx=5)
         utils.ToolTip(edit_btn, "Open the mapping editor to create or modify mapping files.")
 
+        profile_frame = ttk.LabelFrame(self.root, text="Profile")
+        profile_frame.pack(fill="x", padx=10, pady=5)
+
+        self.profile_combo = ttk.Combobox(profile_frame, state="readonly")
+        self.profile_combo.pack(side="left", fill="x", expand=True, padx=5, pady=5)
+        self.profile_combo.bind("<<ComboboxSelected>>", self._on_profile_selected)
+        utils.ToolTip(self.profile_combo, "Select a saved profile to load its mapping, folders and options.")
+
+        save_profile_btn = ttk.Button(profile_frame, text="Save As...", command=self._save_profile)
+        save_profile_btn.pack(side="left", padx=(0, 5))
+        utils.ToolTip(save_profile_btn, "Save the current mapping, folders and options as a profile.")
+
+        run_profile_btn = ttk.Button(profile_frame, text="Run Now", command=self._run_profile_now)
+        run_profile_btn.pack(side="left", padx=(0, 5))
+        utils.ToolTip(run_profile_btn, "Queue the selected profile to run in the background.")
+
+        profile_menu_btn = ttk.Menubutton(profile_frame, text="More")
+        profile_menu = tk.Menu(profile_menu_btn, tearoff=0)
+        profile_menu.add_command(label="Delete Profile", command=self._delete_profile)
+        profile_menu.add_command(label="Run History...", command=self._show_run_history)
+        profile_menu_btn["menu"] = profile_menu
+        profile_menu_btn.pack(side="left", padx=(0, 5))
+
         folder_frame = ttk.LabelFrame(self.root, text="Folders to Sort (Drag folders here or use Add Folder...)")
         folder_frame.pack(fill="both", expand=True, padx=10, pady=5)
 
@@ -77,9 +164,6 @@ class FileSorterGUI:
 
         self.folder_listbox = tk.Listbox(listbox_frame, selectmode=tk.EXTENDED, bg="#ffffff")
         self.folder_listbox.place(relx=0, rely=0, relwidth=1, relheight=1)
-        self.folder_listbox.drop_target_register(DND_FILES)
-        self.folder_listbox.dnd_bind('<<Drop>>', self._on_drop_folders)
-
         self.watermark_label = tk.Label(
             self.folder_listbox, text="FileSorter", font=("Arial", 16, "bold"), fg="#cccccc", bg="#ffffff"
         )
@@ -105,10 +189,48 @@ class FileSorterGUI:
         folder_frame.rowconfigure(0, weight=1)
         folder_frame.columnconfigure(0, weight=1)
 
-        deep_chk = ttk.Checkbutton(self.root, text="Deep Audit", variable=self.deep_audit)
-        deep_chk.pack(padx=10, anchor="w")
+        options_row = ttk.Frame(self.root)
+        options_row.pack(fill="x", padx=10)
+
+        deep_chk = ttk.Checkbutton(options_row, text="Deep Audit", variable=self.deep_audit)
+        deep_chk.pack(side="left")
         utils.ToolTip(deep_chk, "If checked, recursively move misplaced files to their correct folders after sorting.")
 
+        prune_chk = ttk.Checkbutton(options_row, text="Prune empty", variable=self.prune_empty)
+        prune_chk.pack(side="left", padx=(10, 0))
+        utils.ToolTip(prune_chk, "With Deep Audit, remove the folders it emptied. Destination and template folders are kept.")
+
+        background_chk = ttk.Checkbutton(
+            options_row, text="Background priority", variable=self.background_priority,
+            command=self._on_throttle_changed
+        )
+        background_chk.pack(side="left", padx=(10, 0))
+        utils.ToolTip(background_chk, "Run sorting at low CPU and disk priority. Can be changed while sorting.")
+
+        ops_spin = ttk.Spinbox(
+            options_row, from_=0, to=100000, increment=50, width=7, textvariable=self.ops_limit,
+            command=self._on_throttle_changed
+        )
+        ops_spin.pack(side="right")
+        ops_spin.bind("<FocusOut>", self._on_throttle_changed)
+        ops_spin.bind("<Return>", self._on_throttle_changed)
+        ttk.Label(options_row, text="Max ops/s:").pack(side="right", padx=(0, 4))
+        utils.ToolTip(ops_spin, "Limit file operations per second (0 = unlimited). Can be changed while sorting.")
+
+        into_row = ttk.Frame(self.root)
+        into_row.pack(fill="x", padx=10, pady=(5, 0))
+
+        into_chk = ttk.Checkbutton(into_row, text="Sort into one folder:", variable=self.sort_into)
+        into_chk.pack(side="left")
+        utils.ToolTip(into_chk, "Sort the files of every listed folder into one destination folder instead of each folder itself.")
+
+        into_entry = ttk.Entry(into_row, textvariable=self.destination_root)
+        into_entry.pack(side="left", fill="x", expand=True, padx=5)
+
+        into_btn = ttk.Button(into_row, text="Browse...", command=self._choose_destination_root)
+        into_btn.pack(side="left")
+        utils.ToolTip(into_btn, "Choose the destination folder that receives the category folders.")
+
         button_row = ttk.Frame(self.root)
         button_row.pack(fill="x", padx=10, pady=5)
 
@@ -116,6 +238,10 @@ class FileSorterGUI:
         self.sort_btn.pack(side="left")
         utils.ToolTip(self.sort_btn, "Start sorting files according to the selected options.")
 
+        preview_btn = ttk.Button(button_row, text="Preview...", command=self._open_preview)
+        preview_btn.pack(side="left", padx=(5, 0))
+        utils.ToolTip(preview_btn, "See where files would go with the selected mapping, without moving anything.")
+
         help_btn = ttk.Button(button_row, text="Help", command=self._show_help)
         help_btn.pack(side="right")
         utils.ToolTip(help_btn, "Show help and usage instructions.")
@@ -158,7 +284,7 @@ class FileSorterGUI:
         if selected:
             self.mapping_path = os.path.join(MAPPINGS_DIR, selected)
             self.settings[LAST_MAPPING_KEY] = selected
-            save_settings(self.settings)
+            self.settings_writer.save(self.settings)
 
     def _add_folder(self):
         from tkinter import filedialog
@@ -167,13 +293,40 @@ class FileSorterGUI:
             self.folder_listbox.insert(tk.END, folder)
         self._update_watermark()
 
+    def _set_busy(self, message=None):
+        """
+        Show an indeterminate progress indicator with a status message, or clear it.
+        """
+        if message:
+            self.status_label.config(text=message)
+            self.progress_bar.config(mode="indeterminate")
+            self.progress_bar.start(15)
+        else:
+            self.progress_bar.stop()
+            self.progress_bar.config(mode="determinate")
+            self.progress_bar['value'] = 0
+            self.status_label.config(text="Ready")
+
     def _on_drop_folders(self, event):
-        paths = self.root.tk.splitlist(event.data)
-        for folder in paths:
-            folder = folder.strip('"')
-            if os.path.isdir(folder) and folder not in self.folder_listbox.get(0, tk.END):
-                self.folder_listbox.insert(tk.END, folder)
-        self._update_watermark()
+        paths = [folder.strip('"') for folder in self.root.tk.splitlist(event.data)]
+
+        def add_folders(folders):
+            self._set_busy()
+            existing = self.folder_listbox.get(0, tk.END)
+            for folder in folders:
+                if folder not in existing:
+                    self.folder_listbox.insert(tk.END, folder)
+            self._update_watermark()
+
+        def failed(error):
+            self._set_busy()
+            utils.show_error(f"Could not check dropped folders:\n{error}")
+
+        # Checking paths can block for seconds on a slow network share.
+        self._set_busy("Checking dropped folders...")
+        utils.run_in_background(
+            self.root, lambda: [folder for folder in paths if os.path.isdir(folder)], add_folders, failed
+        )
 
     def _remove_selected_folders(self):
         for idx in reversed(self.folder_listbox.curselection()):
@@ -184,11 +337,143 @@ class FileSorterGUI:
         def on_save_callback():
             selected = os.path.basename(self.mapping_path)
             self.settings[LAST_MAPPING_KEY] = selected
-            save_settings(self.settings)
+            self.settings_writer.save(self.settings)
             self._populate_mappings()
             self.mapping_combo.set(selected)
+        self._ensure_drag_and_drop()
+        # Imported on first use: the editor package is not needed to paint the main window.
+        from src.mapping_editor.editor import MappingEditor
         MappingEditor(self.root, on_save_callback=on_save_callback, mapping_path=self.mapping_path)
 
+    def _open_preview(self):
+        if not self.mapping_path:
+            utils.show_error("Please select a mapping file first.")
+            return
+        mapping_path = self.mapping_path
+        # Imported on first use, like the mapping editor.
+        from src.preview import MappingPreview
+        from src.mapping_editor.preview_window import PreviewWindow
+
+        def make_preview(folder, deep, sample_limit):
+            return MappingPreview.from_mapping_file(mapping_path, folder, deep=deep, sample_limit=sample_limit)
+
+        PreviewWindow(
+            self.root, f"Preview - {os.path.basename(mapping_path)}", make_preview,
+            folders=self.folder_listbox.get(0, tk.END), deep=self.deep_audit.get()
+        )
+
+    def _choose_destination_root(self):
+        from tkinter import filedialog
+        folder = filedialog.askdirectory(title="Select Destination Folder", parent=self.root)
+        if folder:
+            self.destination_root.set(folder)
+            self.sort_into.set(True)
+
+    def _on_throttle_changed(self, event=None):
+        try:
+            ops = max(0, int(float(self.ops_limit.get() or 0)))
+        except ValueError:
+            ops = 0
+        background = self.background_priority.get()
+        self.throttle.configure(ops_per_second=ops or None, background=background)
+        self.settings[throttle.OPS_PER_SECOND_KEY] = ops or None
+        self.settings[throttle.BACKGROUND_KEY] = background
+        self.settings_writer.save(self.settings)
+
+    # --- Profiles and scheduled runs ---
+
+    def _populate_profiles(self):
+        names = sorted(scheduler.get_profiles(self.settings))
+        self.profile_combo['values'] = names
+        if self.profile_combo.get() not in names:
+            self.profile_combo.set("")
+
+    def _on_profile_selected(self, event=None):
+        profile = scheduler.get_profiles(self.settings).get(self.profile_combo.get())
+        if not profile:
+            return
+        mapping = profile.get("mapping")
+        if mapping in self.mapping_combo['values']:
+            self.mapping_combo.set(mapping)
+            self._on_mapping_selected()
+        self.folder_listbox.delete(0, tk.END)
+        for folder in profile.get("folders", []):
+            self.folder_listbox.insert(tk.END, folder)
+        self.deep_audit.set(bool(profile.get("deep_audit")))
+        self.prune_empty.set(bool(profile.get("prune_empty")))
+        self.destination_root.set(profile.get("destination", ""))
+        self.sort_into.set(bool(profile.get("destination")))
+        self._update_watermark()
+
+    def _save_profile(self):
+        mapping = self.mapping_combo.get()
+        folders = list(self.folder_listbox.get(0, tk.END))
+        if not mapping or not folders:
+            utils.show_error("Select a mapping and add at least one folder before saving a profile.")
+            return
+        name = simpledialog.askstring("Save Profile", "Profile name:", initialvalue=self.profile_combo.get(), parent=self.root)
+        if not name:
+            return
+        existing = scheduler.get_profiles(self.settings).get(name, {})
+        interval = simpledialog.askinteger(
+            "Save Profile", "Run automatically every N minutes (0 = only when run manually):",
+            initialvalue=existing.get("interval_minutes", 0), minvalue=0, parent=self.root
+        )
+        if interval is None:
+            return
+        self.settings.setdefault(scheduler.PROFILES_KEY, {})[name] = {
+            "mapping": mapping,
+            "folders": folders,
+            "deep_audit": self.deep_audit.get(),
+            "prune_empty": self.prune_empty.get(),
+            "interval_minutes": interval,
+        }
+        if self.sort_into.get() and self.destination_root.get().strip():
+            self.settings[scheduler.PROFILES_KEY][name]["destination"] = self.destination_root.get().strip()
+        self.settings_writer.save(self.settings)
+        self._populate_profiles()
+        self.profile_combo.set(name)
+
+    def _delete_profile(self):
+        name = self.profile_combo.get()
+        profiles = scheduler.get_profiles(self.settings)
+        if name not in profiles:
+            return
+        if messagebox.askyesno("Delete Profile", f"Delete profile '{name}'?", parent=self.root):
+            del profiles[name]
+            self.settings_writer.save(self.settings)
+            self._populate_profiles()
+
+    def _run_profile_now(self):
+        name = self.profile_combo.get()
+        if name not in scheduler.get_profiles(self.settings):
+            utils.show_error("Please select a saved profile to run.")
+            return
+        if self.scheduler.trigger(name):
+            self.status_label.config(text=f"Queued profile '{name}'")
+        else:
+            self.status_label.config(text=f"Profile '{name}' is already queued or running")
+
+    def _on_scheduler_event(self, event, job):
+        if event == "started":
+            self.status_label.config(text=f"Running profile '{job['profile']}'...")
+        else:
+            text = f"Profile '{job['profile']}' {job['status']} in {job['duration']:.1f}s"
+            if job.get("error"):
+                text += f": {job['error']}"
+            self.status_label.config(text=text)
+
+    def _show_run_history(self):
+        history = self.scheduler.queue.history()[-20:]
+        if not history:
+            messagebox.showinfo("Run History", "No profile runs recorded yet.", parent=self.root)
+            return
+        lines = []
+        for entry in reversed(history):
+            started = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["started_at"]))
+            lines.append(f"{started}  {entry['profile']}  {entry['status']}  {entry['duration']:.1f}s")
+        messagebox.showinfo("Run History", "\n".join(lines), parent=self.root)
+
     def _start_sort_thread(self):
         self.sort_btn.config(state="disabled")
         self.status_label.config(text="Starting sort...")
@@ -207,21 +492,44 @@ class FileSorterGUI:
             utils.show_error("Please add at least one folder to sort.")
             self.sort_btn.config(state="normal")
             return
+        destination = self.destination_root.get().strip() if self.sort_into.get() else ""
+        if self.sort_into.get() and not destination:
+            utils.show_error("Please choose a destination folder, or uncheck \"Sort into one folder\".")
+            self.sort_btn.config(state="normal")
+            return
 
         try:
-            sorter_obj = sorter.FileSorter(mapping_path)
+            if self.settings.get(utils.USE_DAEMON_KEY):
+                # Imported on first use; most sessions sort in-process.
+                from src import daemon
+                client = daemon.DaemonClient.connect()
+                if client is not None:
+                    self._sort_in_daemon(client, mapping_path, folders, destination)
+                    return
+            sorter_obj = sorter.create_sorter(
+                mapping_path, engine=self.settings.get(ENGINE_KEY), throttle=self.throttle,
+                record_hits=self.settings.get(utils.RECORD_HITS_KEY, True), plan_memory=utils.plan_memory(self.settings)
+            )
             deep_audit = self.deep_audit.get()
+            prune_empty = self.prune_empty.get()
+            if destination:
+                self._sort_into(sorter_obj, folders, destination, deep_audit, prune_empty)
+                return
             self.progress_bar['maximum'] = len(folders)
             for i, folder in enumerate(folders):
                 if os.path.isdir(folder):
-                    self.status_label.config(text=f"Sorting {os.path.basename(folder)}...")
-                    sorter_obj.sort_current_directory(folder)
-                    if deep_audit:
-                        self.status_label.config(text=f"Auditing {os.path.basename(folder)}...")
-                        sorter_obj.deep_audit_and_sort(folder)
+                    # A folder that cannot be sorted is reported at the end; the rest still are.
+                    try:
+                        self.status_label.config(text=f"Sorting {os.path.basename(folder)}...")
+                        sorter_obj.sort_current_directory(folder)
+                        if deep_audit:
+                            self.status_label.config(text=f"Auditing {os.path.basename(folder)}...")
+                            sorter_obj.deep_audit_and_sort(folder, prune_empty=prune_empty)
+                    except Exception as e:
+                        sorter_obj.report.add_failure("sort", folder, e)
                 self.progress_bar['value'] = i + 1
                 self.root.update_idletasks()
-            messagebox.showinfo("Success", "Files sorted successfully!")
+            self._show_report(sorter_obj.report, "Files sorted successfully!")
         except Exception as e:
             utils.show_error(f"An error occurred during sorting:\n{e}")
         finally:
@@ -229,7 +537,65 @@ class FileSorterGUI:
             self.status_label.config(text="Ready")
             self.progress_bar['value'] = 0
 
-def main():
-    root = TkinterDnD.Tk()
-    FileSorterGUI(root)
-    root.mainloop()
\ No newline at end of file
+    def _sort_in_daemon(self, client, mapping_path, folders, destination):
+        job_id = client.submit({
+            "action": "sort",
+            "mapping": os.path.abspath(mapping_path),
+            "folders": [os.path.abspath(folder) for folder in folders],
+            "deep_audit": self.deep_audit.get(),
+            "prune_empty": self.prune_empty.get(),
+            "destination": os.path.abspath(destination) if destination else None,
+        })
+        self.progress_bar.config(mode="indeterminate")
+        self.progress_bar.start(10)
+        try:
+            while True:
+                job = client.job(job_id, wait=1)
+                if job["status"] == "queued":
+                    self.status_label.config(text="Waiting for the daemon (another job uses these folders)...")
+                elif job["status"] == "running":
+                    self.status_label.config(text="Sorting in the background daemon...")
+                else:
+                    break
+        finally:
+            self.progress_bar.stop()
+            self.progress_bar.config(mode="determinate")
+        if job["status"] == "failed":
+            raise RuntimeError(job["error"])
+        self._show_report(retry.RunReport.from_dict(job.get("result") or {}), "Files sorted successfully!")
+
+    def _sort_into(self, sorter_obj, folders, destination, deep_audit, prune_empty=False):
+        sources = [folder for folder in folders if os.path.isdir(folder)]
+        self.progress_bar['maximum'] = 2 if deep_audit else 1
+        self.status_label.config(text=f"Sorting {len(sources)} folder(s) into {os.path.basename(destination)}...")
+        moved = sorter_obj.sort_into(sources, destination)
+        self.progress_bar['value'] = 1
+        if deep_audit:
+            self.status_label.config(text=f"Auditing {os.path.basename(destination)}...")
+            try:
+                sorter_obj.deep_audit_and_sort(destination, prune_empty=prune_empty)
+            except Exception as e:
+                sorter_obj.report.add_failure("audit", destination, e)
+            self.progress_bar['value'] = 2
+        self._show_report(sorter_obj.report, f"Sorted {moved} file(s) into {destination}.")
+
+    def _show_report(self, report, message):
+        """
+        Show the outcome of a sort: message, or a summary of what could not be sorted.
+        """
+        if report.failed:
+            messagebox.showwarning("Finished with errors", report.summary(limit=MAX_LISTED_FAILURES))
+        elif report.retried:
+            messagebox.showinfo("Success", f"{message}\n\n{report.summary()}")
+        else:
+            messagebox.showinfo("Success", message)
+
+def main(startup_timer=None):
+    if startup_timer:
+        startup_timer.mark("modules imported")
+    root = tk.Tk()
+    if startup_timer:
+        startup_timer.mark("root window created")
+    app = FileSorterGUI(root, startup_timer=startup_timer)
+    root.mainloop()
+    app.settings_writer.flush()
\ No newline at end of file
@@ -0,0 +1,227 @@
+"""
+Link-based organize mode for FileSorter.
+
+Instead of moving files, LinkView builds a separate "view" folder with the
+mapping's category tree made of links to the original files, so the sorted view
+exists without disturbing the original layout and without copying any data:
+
+- each matched file is hard-linked into view/<destination>/<name>; where a hard
+  link is impossible (another device, or a filesystem without them) a symlink to
+  the file is made instead. Names that clash get a " (n)" suffix, assigned in a
+  stable order so re-syncs do not reshuffle them.
+- sync() is incremental: it lists the existing view once and compares each entry
+  with the file it should point to (by device and inode for hard links, by target
+  for symlinks). Correct links are kept, missing ones added, and stale or
+  unexpected entries removed, along with folders left empty. Only metadata
+  operations are used, so refreshing a large view is quick.
+
+The view folder is owned by FileSorter: a marker file (VIEW_MARKER) is written
+to it on first sync, and sync() refuses to touch a non-empty folder without one,
+so it can never prune a folder of real files.
+
+A folder that cannot be listed, or a link that cannot be made or removed, is
+recorded in the run's RunReport (see retry) and the sync goes on with the rest.
+Link views do not count towards the mapping's rule hit statistics.
+"""
+
+import os
+import stat
+
+from src.retry import RunReport
+from src.sorter import SCAN_AUDIT, SCAN_SKIP, _unique_name
+
+VIEW_MARKER = ".filesorter-view"
+
+
+class LinkView:
+    """
+    Synchronizes a link view of source folders against a FileMapping.
+    """
+    def __init__(self, mapping, view_root, throttle=None, report=None):
+        self.mapping = mapping
+        self.view_root = os.path.abspath(view_root)
+        self.throttle = throttle
+        self.report = report if report is not None else RunReport()
+
+    def _op(self):
+        if self.throttle is not None:
+            self.throttle.op()
+
+    def sync(self, source_dirs, deep=False):
+        """
+        Bring the view in line with the files in source_dirs (recursively if deep).
+        Returns {"linked", "symlinked", "kept", "removed"} counts.
+        """
+        self._claim_view()
+        desired = self._desired(source_dirs, deep)
+        existing, view_dirs = self._existing()
+        stats = {"linked": 0, "symlinked": 0, "kept": 0, "removed": 0}
+
+        for rel_path, (entry_path, is_link, identity) in existing.items():
+            wanted = desired.get(rel_path)
+            if wanted is not None and self._matches(wanted, is_link, identity):
+                del desired[rel_path]
+                stats["kept"] += 1
+                continue
+            self._op()
+            try:
+                os.unlink(entry_path)
+            except OSError as e:
+                self.report.add_failure("unlink", entry_path, e)
+                continue
+            stats["removed"] += 1
+
+        created = set()
+        for rel_path, (src_path, _) in sorted(desired.items()):
+            target = os.path.join(self.view_root, rel_path)
+            parent = os.path.dirname(target)
+            try:
+                if parent not in created:
+                    self._op()
+                    os.makedirs(parent, exist_ok=True)
+                    created.add(parent)
+                self._op()
+                hard = self._link(src_path, target)
+            except OSError as e:
+                self.report.add_failure("link", src_path, e)
+                continue
+            stats["linked" if hard else "symlinked"] += 1
+
+        # Deepest first, so a parent emptied by its children's removal goes too.
+        for path in sorted(view_dirs, key=len, reverse=True):
+            try:
+                os.rmdir(path)
+            except OSError:
+                pass
+        return stats
+
+    def _claim_view(self):
+        marker = os.path.join(self.view_root, VIEW_MARKER)
+        if os.path.isdir(self.view_root) and not os.path.exists(marker):
+            if os.listdir(self.view_root):
+                raise ValueError(
+                    f"{self.view_root} is not empty and is not a FileSorter link view; "
+                    "choose an empty or new folder for the view."
+                )
+        os.makedirs(self.view_root, exist_ok=True)
+        if not os.path.exists(marker):
+            with open(marker, "w", encoding="utf-8") as f:
+                f.write("This folder is a FileSorter link view. Entries not produced by the mapping are removed.\n")
+
+    def _desired(self, source_dirs, deep):
+        """
+        Return {view-relative path: (source path, (st_dev, st_ino))} for matched files.
+        """
+        found = []
+        for src_dir in source_dirs:
+            for dirpath, entries in self._source_listings(src_dir, deep):
+                for entry in entries:
+                    try:
+                        dest = self.mapping.resolve(entry.name, entry.path, self.mapping.match(entry.name, count=False),
+                                                    entry)
+                        if not dest:
+                            continue
+                        identity = _identity(entry, follow=True)
+                    except OSError as e:
+                        self.report.add_failure("classify", entry.path, e)
+                        continue
+                    found.append((self.mapping.normalized_destination(dest), entry.path, entry.name, identity))
+        desired = {}
+        taken = {}  # destination -> normcased names
+        for dest, src_path, filename, identity in sorted(found, key=lambda item: (item[0], item[1])):
+            names = taken.setdefault(dest, set())
+            name = _unique_name(filename, names)
+            names.add(os.path.normcase(name))
+            desired[os.path.normpath(os.path.join(dest, name))] = (src_path, identity)
+        return desired
+
+    def _source_listings(self, src_dir, deep):
+        scan = self.mapping.scan_filter
+        view_key = os.path.normcase(self.view_root)
+        pending = [(src_dir, [])]
+        while pending:
+            path, parts = pending.pop()
+            if os.path.normcase(os.path.abspath(path)) == view_key:
+                continue  # never link the view into itself
+            self._op()
+            files = []
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_file():
+                                files.append(entry)
+                            elif deep and entry.is_dir(follow_symlinks=False):
+                                child = parts + [entry.name]
+                                if scan.check(child) != SCAN_SKIP:
+                                    pending.append((entry.path, child))
+                        except OSError:
+                            continue
+            except OSError as e:
+                self.report.add_failure("list", path, e)
+                continue
+            if not deep or scan.check(parts) == SCAN_AUDIT:
+                yield path, files
+
+    def _existing(self):
+        """
+        List the view: ({relative path: (path, is symlink, identity)}, [folders below the root]).
+        """
+        existing, folders = {}, []
+        pending = [self.view_root]
+        while pending:
+            path = pending.pop()
+            self._op()
+            try:
+                with os.scandir(path) as it:
+                    entries = list(it)
+            except OSError as e:
+                # Its links are left as they are; new ones that clash are reported too.
+                self.report.add_failure("list", path, e)
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        folders.append(entry.path)
+                        pending.append(entry.path)
+                        continue
+                    rel_path = os.path.relpath(entry.path, self.view_root)
+                    if rel_path == VIEW_MARKER:
+                        continue
+                    if entry.is_symlink():
+                        existing[rel_path] = (entry.path, True, os.readlink(entry.path))
+                    else:
+                        existing[rel_path] = (entry.path, False, _identity(entry, follow=False))
+                except OSError as e:
+                    self.report.add_failure("list", entry.path, e)
+        return existing, folders
+
+    @staticmethod
+    def _matches(wanted, is_link, identity):
+        src_path, src_identity = wanted
+        if is_link:
+            return identity == os.path.abspath(src_path)
+        return identity == src_identity
+
+    @staticmethod
+    def _link(src_path, target):
+        """
+        Hard-link src_path at target, or symlink it if that is impossible.
+        Returns True for a hard link.
+        """
+        try:
+            os.link(src_path, target)
+            return True
+        except OSError:
+            os.symlink(os.path.abspath(src_path), target)
+            return False
+
+
+def _identity(entry, follow):
+    st = entry.stat(follow_symlinks=follow)
+    if not st.st_ino:
+        # DirEntry.stat() leaves st_ino/st_dev at zero on Windows.
+        st = os.stat(entry.path, follow_symlinks=follow)
+    if not follow and not stat.S_ISREG(st.st_mode):
+        return None
+    return st.st_dev, st.st_ino
@@ -1,6 +1,11 @@
 # Entry point for the File Sorter application.
-from src import gui
+import sys
+
+from src import startup_timing
 
 if __name__ == "__main__":
+    # Optional startup timing report (--debug-startup or FILESORTER_DEBUG_STARTUP=1)
+    timer = startup_timing.enable_if_requested(sys.argv)
+    from src import gui
     # Launch the GUI
-    gui.main()
\ No newline at end of file
+    gui.main(startup_timer=timer)
@@ -0,0 +1,382 @@
+"""
+Mapping analysis for FileSorter.
+
+FileMapping.get_destination returns the first rule (in file order) whose pattern
+matches, so a rule below a broader one can be partly or completely hidden. This
+module inspects a mapping's rules and reports:
+
+- unreachable: patterns that can never match a file name (e.g. they contain a
+  path separator; sorters only match bare names)
+- shadowed: rules whose every possible match is taken by an earlier rule
+- overlapping: pairs of rules with different destinations that can match the
+  same name, so their relative order matters
+- dead: rules with no recorded hits (when hit statistics are available)
+
+It also suggests an order that tests frequently hit rules first. Two rules are
+only reordered when they cannot match the same name or share a destination, so
+every file still goes to the same folder.
+
+Patterns are compared exactly for overlap. Shadowing is detected conservatively:
+a reported rule is always shadowed by a single earlier rule, but a rule covered
+only by the union of several earlier rules is not reported.
+"""
+
+import heapq
+import os
+
+from src.sorter import split_directives
+
+# Token kinds for a tokenized glob.
+STAR = "*"
+ANY = "?"
+CHARSET = "set"
+
+MAX_UNICODE = 0x10FFFF
+
+
+def tokenize(pattern):
+    """
+    Tokenize an fnmatch pattern (after os.path.normcase, like fnmatch.fnmatch).
+
+    Returns a list of STAR tokens and single-character tokens. A single-character
+    token is (ANY,) or (CHARSET, negated, intervals) with intervals a sorted list
+    of inclusive (lo, hi) code point ranges.
+    """
+    pattern = os.path.normcase(pattern)
+    tokens = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        i += 1
+        if c == "*":
+            if not tokens or tokens[-1] != STAR:
+                tokens.append(STAR)
+        elif c == "?":
+            tokens.append((ANY,))
+        elif c == "[":
+            parsed = _parse_class(pattern, i)
+            if parsed is None:
+                tokens.append((CHARSET, False, [(ord("["), ord("["))]))
+            else:
+                token, i = parsed
+                tokens.append(token)
+        else:
+            tokens.append((CHARSET, False, [(ord(c), ord(c))]))
+    return tokens
+
+
+def _parse_class(pattern, i):
+    """
+    Parse a [...] class starting after the "[" at index i, following fnmatch's rules.
+    Returns (token, next index) or None if the bracket is unterminated (a literal "[").
+    """
+    n = len(pattern)
+    j = i
+    if j < n and pattern[j] == "!":
+        j += 1
+    if j < n and pattern[j] == "]":
+        j += 1
+    while j < n and pattern[j] != "]":
+        j += 1
+    if j >= n:
+        return None
+    body = pattern[i:j]
+    negated = body.startswith("!")
+    if negated:
+        body = body[1:]
+    intervals = []
+    k = 0
+    while k < len(body):
+        if k + 2 < len(body) and body[k + 1] == "-":
+            lo, hi = ord(body[k]), ord(body[k + 2])
+            if lo <= hi:
+                intervals.append((lo, hi))
+            k += 3
+        else:
+            intervals.append((ord(body[k]), ord(body[k])))
+            k += 1
+    return (CHARSET, negated, _normalize_intervals(intervals)), j + 1
+
+
+def _normalize_intervals(intervals):
+    merged = []
+    for lo, hi in sorted(intervals):
+        if merged and lo <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return merged
+
+
+def _positive_intervals(token):
+    """
+    Return the code point intervals a single-character token matches.
+    """
+    if token[0] == ANY:
+        return [(0, MAX_UNICODE)]
+    _, negated, intervals = token
+    if not negated:
+        return intervals
+    result, start = [], 0
+    for lo, hi in intervals:
+        if lo > start:
+            result.append((start, lo - 1))
+        start = hi + 1
+    if start <= MAX_UNICODE:
+        result.append((start, MAX_UNICODE))
+    return result
+
+
+def _intersects(a, b):
+    ia, ib = _positive_intervals(a), _positive_intervals(b)
+    x = y = 0
+    while x < len(ia) and y < len(ib):
+        if ia[x][1] < ib[y][0]:
+            x += 1
+        elif ib[y][1] < ia[x][0]:
+            y += 1
+        else:
+            return True
+    return False
+
+
+def _contains(a, b):
+    """
+    True if every character matched by token b is matched by token a.
+    """
+    outer = _positive_intervals(a)
+    for lo, hi in _positive_intervals(b):
+        if not any(olo <= lo and hi <= ohi for olo, ohi in outer):
+            return False
+    return True
+
+
+def overlaps(a_tokens, b_tokens):
+    """
+    True if some name matches both tokenized patterns (exact).
+    """
+    seen = set()
+    stack = [(0, 0)]
+    na, nb = len(a_tokens), len(b_tokens)
+    while stack:
+        i, j = stack.pop()
+        if (i, j) in seen:
+            continue
+        seen.add((i, j))
+        if i == na and j == nb:
+            return True
+        ta = a_tokens[i] if i < na else None
+        tb = b_tokens[j] if j < nb else None
+        # Stars may match the empty string.
+        if ta == STAR:
+            stack.append((i + 1, j))
+        if tb == STAR:
+            stack.append((i, j + 1))
+        if ta is None or tb is None:
+            continue
+        # Consume one character on both sides.
+        next_i = i if ta == STAR else i + 1
+        next_j = j if tb == STAR else j + 1
+        if ta == STAR or tb == STAR or _intersects(ta, tb):
+            if (next_i, next_j) != (i, j):
+                stack.append((next_i, next_j))
+    return False
+
+
+def covers(a_tokens, b_tokens):
+    """
+    True if every name matching b also matches a. Conservative: may return False
+    for some covered pairs, never True for an uncovered one.
+    """
+    na, nb = len(a_tokens), len(b_tokens)
+    seen = set()
+    stack = [(0, 0)]
+    while stack:
+        i, j = stack.pop()
+        if (i, j) in seen:
+            continue
+        seen.add((i, j))
+        if i == na:
+            if j == nb:
+                return True
+            continue
+        ta = a_tokens[i]
+        if ta == STAR:
+            stack.append((i + 1, j))
+            if j < nb:
+                stack.append((i, j + 1))
+        elif j < nb and b_tokens[j] != STAR and _contains(ta, b_tokens[j]):
+            stack.append((i + 1, j + 1))
+    return False
+
+
+def _quick_disjoint(a_tokens, b_tokens):
+    """
+    Cheap pre-check: differing fixed last characters (e.g. "*.pdf" vs "*.jpg")
+    or first characters mean the patterns cannot overlap.
+    """
+    for index in (-1, 0):
+        if a_tokens and b_tokens:
+            ta, tb = a_tokens[index], b_tokens[index]
+            if ta != STAR and tb != STAR and not _intersects(ta, tb):
+                return True
+    return False
+
+
+class MappingAnalyzer:
+    """
+    Analyze an ordered pattern -> destination mapping, optionally with hit counts
+    (pattern -> number of files matched in real runs).
+    """
+    def __init__(self, rules, hits=None):
+        self.rules, _ = split_directives(rules)
+        self.patterns = list(self.rules)
+        self.hits = hits
+        self._tokens = [tokenize(p) for p in self.patterns]
+        self._overlap_cache = {}
+
+    def _overlaps(self, i, j):
+        key = (i, j) if i < j else (j, i)
+        result = self._overlap_cache.get(key)
+        if result is None:
+            a, b = self._tokens[i], self._tokens[j]
+            result = not _quick_disjoint(a, b) and overlaps(a, b)
+            self._overlap_cache[key] = result
+        return result
+
+    def unreachable(self):
+        """
+        Return [(pattern, reason)] for patterns that can never match a file name.
+        """
+        result = []
+        separators = {"/", os.sep} | ({os.altsep} if os.altsep else set())
+        for pattern in self.patterns:
+            if not pattern:
+                result.append((pattern, "empty pattern"))
+            elif any(sep in pattern for sep in separators):
+                result.append((pattern, "contains a path separator; only file names are matched"))
+        return result
+
+    def shadowed(self):
+        """
+        Return [(pattern, earlier_pattern)] for rules fully hidden by an earlier rule.
+        """
+        unreachable = {p for p, _ in self.unreachable()}
+        result = []
+        for j, pattern in enumerate(self.patterns):
+            if pattern in unreachable:
+                continue
+            for i in range(j):
+                if self.patterns[i] in unreachable:
+                    continue
+                if covers(self._tokens[i], self._tokens[j]):
+                    result.append((pattern, self.patterns[i]))
+                    break
+        return result
+
+    def overlapping(self):
+        """
+        Return [(earlier_pattern, later_pattern)] for order-dependent rule pairs
+        (different destinations, common matches, neither shadows the other).
+        """
+        shadowed = {p for p, _ in self.shadowed()}
+        result = []
+        for j, later in enumerate(self.patterns):
+            if later in shadowed:
+                continue
+            for i in range(j):
+                earlier = self.patterns[i]
+                if self.rules[earlier] == self.rules[later] or earlier in shadowed:
+                    continue
+                if self._overlaps(i, j):
+                    result.append((earlier, later))
+        return result
+
+    def dead(self):
+        """
+        Return patterns with no recorded hits, or [] if no statistics are available.
+        """
+        if not self.hits:
+            return []
+        return [p for p in self.patterns if not self.hits.get(p)]
+
+    def suggest_order(self):
+        """
+        Return patterns reordered so frequently hit rules come first, without
+        changing the destination of any file name.
+        """
+        hits = self.hits or {}
+        n = len(self.patterns)
+        index = {p: i for i, p in enumerate(self.patterns)}
+        inert = {index[p] for p, _ in self.unreachable()}
+        shadowed_by = {index[p]: index[by] for p, by in self.shadowed()}
+        # Edge i -> j (i must stay before j) when they can match the same name
+        # but send it to different folders. Unreachable rules need no edges, and a
+        # shadowed rule only has to stay behind the rule that hides it.
+        successors = [[] for _ in range(n)]
+        indegree = [0] * n
+        for j, i in shadowed_by.items():
+            successors[i].append(j)
+            indegree[j] += 1
+        inert.update(shadowed_by)
+        for j in range(n):
+            if j in inert:
+                continue
+            for i in range(j):
+                if i in inert:
+                    continue
+                if self.rules[self.patterns[i]] != self.rules[self.patterns[j]] and self._overlaps(i, j):
+                    successors[i].append(j)
+                    indegree[j] += 1
+        ready = [(-hits.get(self.patterns[i], 0), i) for i in range(n) if indegree[i] == 0]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            _, i = heapq.heappop(ready)
+            order.append(self.patterns[i])
+            for j in successors[i]:
+                indegree[j] -= 1
+                if indegree[j] == 0:
+                    heapq.heappush(ready, (-hits.get(self.patterns[j], 0), j))
+        return order
+
+    def expected_tests(self, order=None):
+        """
+        Average number of patterns tested per matched file for an order, from hit counts.
+        Returns None without statistics.
+        """
+        if not self.hits:
+            return None
+        order = order or self.patterns
+        total = sum(self.hits.get(p, 0) for p in order)
+        if not total:
+            return None
+        return sum((index + 1) * self.hits.get(p, 0) for index, p in enumerate(order)) / total
+
+    def report(self):
+        """
+        Return a human-readable analysis as a list of lines.
+        """
+        lines = [f"Rules: {len(self.patterns)}"]
+        unreachable = self.unreachable()
+        lines.append(f"\nUnreachable patterns: {len(unreachable)}")
+        lines += [f"  {p!r}: {reason}" for p, reason in unreachable]
+        shadowed = self.shadowed()
+        lines.append(f"\nShadowed rules (never fire): {len(shadowed)}")
+        lines += [f"  {p!r} is hidden by earlier {by!r}" for p, by in shadowed]
+        overlapping = self.overlapping()
+        lines.append(f"\nOrder-dependent overlaps: {len(overlapping)}")
+        lines += [f"  {a!r} -> {self.rules[a]!r} wins over {b!r} -> {self.rules[b]!r}" for a, b in overlapping]
+        if self.hits:
+            dead = self.dead()
+            lines.append(f"\nRules with no recorded hits: {len(dead)}")
+            lines += [f"  {p!r}" for p in dead]
+            order = self.suggest_order()
+            before, after = self.expected_tests(), self.expected_tests(order)
+            if order != self.patterns and before is not None:
+                lines.append(
+                    f"\nSuggested order tests {after:.1f} patterns per file on average (currently {before:.1f})."
+                )
+        else:
+            lines.append("\nNo hit statistics recorded yet; run a sort to collect them.")
+        return lines
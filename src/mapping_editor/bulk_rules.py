@@ -0,0 +1,82 @@
+"""
+Bulk rule helpers for the Mapping Editor.
+
+- read_rules_csv / write_rules_csv: pattern,destination CSV files (an optional
+  "pattern,destination" header row is skipped on import)
+- parse_rule_lines: pasted text, one pattern per line, optionally followed by a
+  tab or comma and its destination
+- merge_rules: apply a batch of (pattern, destination) pairs to a mapping in one
+  step; existing patterns keep their position, new ones are appended in order
+
+Directive keys ("$...") and rows with an empty pattern or destination are skipped.
+"""
+
+import csv
+
+from src.sorter import DIRECTIVE_PREFIX
+
+HEADER = ("pattern", "destination")
+
+
+def _clean(pairs):
+    rules = []
+    for pattern, dest in pairs:
+        pattern, dest = pattern.strip(), dest.strip()
+        if pattern and dest and not pattern.startswith(DIRECTIVE_PREFIX):
+            rules.append((pattern, dest))
+    return rules
+
+
+def read_rules_csv(path):
+    """
+    Read (pattern, destination) pairs from a CSV file.
+    """
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        rows = [row for row in csv.reader(f) if len(row) >= 2]
+    if rows and tuple(cell.strip().lower() for cell in rows[0][:2]) == HEADER:
+        rows = rows[1:]
+    return _clean((row[0], row[1]) for row in rows)
+
+
+def write_rules_csv(path, mappings):
+    """
+    Write pattern -> destination rules to a CSV file, in rule order.
+    """
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(mappings.items())
+
+
+def parse_rule_lines(text, default_dest=None):
+    """
+    Parse pasted lines into (pattern, destination) pairs. A line is either a bare
+    pattern (sent to default_dest) or "pattern<TAB>destination" / "pattern,destination".
+    """
+    pairs = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        for separator in ("\t", ","):
+            if separator in line:
+                pattern, dest = line.split(separator, 1)
+                break
+        else:
+            pattern, dest = line, default_dest or ""
+        pairs.append((pattern, dest))
+    return _clean(pairs)
+
+
+def merge_rules(mappings, rules):
+    """
+    Return (new mappings, added count, updated count) after applying rules.
+    """
+    merged = dict(mappings)
+    added = updated = 0
+    for pattern, dest in rules:
+        if pattern not in merged:
+            added += 1
+        elif merged[pattern] != dest:
+            updated += 1
+        merged[pattern] = dest
+    return merged, added, updated
@@ -0,0 +1,120 @@
+"""
+DestinationIndex for the Mapping Editor.
+
+A reverse index from destination folder to the patterns that send files there,
+kept as a trie of path components ("Docs/2024" is Docs -> 2024). It answers
+"which rules point into this folder or below it?" by visiting only that subtree,
+which the editor uses to rewrite destinations when a template folder is renamed
+and to warn before deleting a folder that rules still reference.
+
+Destinations are compared component-wise after os.path.normpath, with either
+separator, so "Docs" never matches "Docs2" and "Docs/a" equals "Docs\\a".
+"""
+
+import os
+
+
+def split_destination(dest):
+    """
+    Return the path components of a destination ([] for "." or the root).
+    """
+    norm = os.path.normpath(dest or ".").replace("\\", "/")
+    return [part for part in norm.split("/") if part and part != "."]
+
+
+class _Node:
+    __slots__ = ("children", "patterns")
+
+    def __init__(self):
+        self.children = {}
+        self.patterns = set()
+
+
+class DestinationIndex:
+    """
+    Path trie of destination -> patterns, updated incrementally.
+    """
+    def __init__(self):
+        self._root = _Node()
+        self._dest_of = {}  # pattern -> destination as indexed
+
+    def update(self, mappings):
+        """
+        Bring the index in line with mappings (pattern -> destination),
+        touching only rules that were added, removed or changed.
+        """
+        for pattern in [p for p in self._dest_of if p not in mappings]:
+            self._discard(pattern)
+        for pattern, dest in mappings.items():
+            old = self._dest_of.get(pattern)
+            if old == dest:
+                continue
+            if old is not None:
+                self._discard(pattern)
+            self._add(pattern, dest)
+
+    def _add(self, pattern, dest):
+        node = self._root
+        for part in split_destination(dest):
+            node = node.children.setdefault(part, _Node())
+        node.patterns.add(pattern)
+        self._dest_of[pattern] = dest
+
+    def _discard(self, pattern):
+        dest = self._dest_of.pop(pattern)
+        path = [self._root]
+        parts = split_destination(dest)
+        for part in parts:
+            path.append(path[-1].children[part])
+        path[-1].patterns.discard(pattern)
+        # Prune nodes left without patterns or children.
+        for depth in range(len(parts), 0, -1):
+            node = path[depth]
+            if node.patterns or node.children:
+                break
+            del path[depth - 1].children[parts[depth - 1]]
+
+    def _find(self, parts):
+        node = self._root
+        for part in parts:
+            node = node.children.get(part)
+            if node is None:
+                return None
+        return node
+
+    def _walk(self, node, suffix):
+        stack = [(node, suffix)]
+        while stack:
+            node, suffix = stack.pop()
+            for pattern in node.patterns:
+                yield pattern, suffix
+            for name, child in node.children.items():
+                stack.append((child, suffix + [name]))
+
+    def patterns_under(self, rel_path):
+        """
+        Return the patterns whose destination is rel_path or a folder below it.
+        """
+        node = self._find(split_destination(rel_path))
+        if node is None:
+            return []
+        return [pattern for pattern, _ in self._walk(node, [])]
+
+    def rename(self, old_rel_path, new_rel_path):
+        """
+        Re-point every rule under old_rel_path to the same place under new_rel_path.
+        Returns {pattern: new destination} for the affected rules only.
+        """
+        old_parts = split_destination(old_rel_path)
+        node = self._find(old_parts)
+        if node is None or not old_parts:
+            return {}
+        new_parts = split_destination(new_rel_path)
+        affected = list(self._walk(node, []))
+        changes = {}
+        for pattern, suffix in affected:
+            self._discard(pattern)
+            new_dest = os.path.join(*(new_parts + suffix)) if new_parts + suffix else "."
+            self._add(pattern, new_dest)
+            changes[pattern] = new_dest
+        return changes
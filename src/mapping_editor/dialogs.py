@@ -4,6 +4,11 @@ dialogs.py
 Dialog classes for FileSorter:
 - NewMappingDialog: Create a new mapping, optionally importing from an existing mapping file.
 - PatternDestDialog: Edit or add a pattern/destination mapping, with user-friendly layout and help.
+- AnalysisReportDialog: Show a mapping analysis report and offer the suggested rule order.
+- PastePatternsDialog: Paste many patterns (optionally with destinations) to add as rules in one step.
+- ChooseDestinationDialog: Pick a destination folder for a group of rules.
+- StructureCopyDialog: Choose a depth limit and name filters for copying a dropped folder structure.
+- StructureCopyProgress: Non-modal progress window with a Cancel button for a running structure copy.
 
 Author: Your Name
 """
@@ -179,6 +184,244 @@ class PatternDestDialog(simpledialog.Dialog):
         self.pattern = self.pattern_entry.get().strip()
         self.dest = self.dest_combo.get().strip()
 
+class AnalysisReportDialog(simpledialog.Dialog):
+    """
+    Dialog showing a mapping analysis report.
+    Offers to apply the suggested rule order when one is available.
+    """
+    def __init__(self, parent, title, report_lines, can_reorder=False):
+        self.report_lines = report_lines
+        self.can_reorder = can_reorder
+        self.apply_order = False
+        super().__init__(parent, title)
+
+    def body(self, master):
+        """
+        Build the dialog UI.
+        """
+        frame = ttk.Frame(master, padding=(8, 8, 8, 0))
+        frame.pack(fill="both", expand=True)
+        text = tk.Text(frame, width=90, height=24, wrap="none", font=("Consolas", 9))
+        scrollbar = ttk.Scrollbar(frame, orient="vertical", command=text.yview)
+        text.configure(yscrollcommand=scrollbar.set)
+        text.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+        text.insert("1.0", "\n".join(self.report_lines))
+        text.config(state="disabled")
+        self.resizable(True, True)
+        return text
+
+    def buttonbox(self):
+        """
+        Replace the default OK/Cancel buttons.
+        """
+        box = ttk.Frame(self)
+        if self.can_reorder:
+            ttk.Button(box, text="Apply Suggested Order", command=self.ok).pack(side="left", padx=5, pady=5)
+        ttk.Button(box, text="Close", command=self.cancel).pack(side="left", padx=5, pady=5)
+        self.bind("<Escape>", self.cancel)
+        box.pack()
+
+    def apply(self):
+        """
+        Save the dialog results.
+        """
+        self.apply_order = True
+
+class PastePatternsDialog(simpledialog.Dialog):
+    """
+    Dialog for pasting many patterns at once, one per line. Lines may carry their
+    own destination after a tab or comma; the others use the chosen destination.
+    """
+    def __init__(self, parent, title, destinations):
+        self.destinations = destinations
+        self.text = None
+        self.dest = None
+        super().__init__(parent, title)
+
+    def body(self, master):
+        """
+        Build the dialog UI.
+        """
+        frame = ttk.Frame(master, padding=(16, 16, 16, 8))
+        frame.pack(fill="both", expand=True)
+        ttk.Label(frame, text="Patterns (one per line, optionally followed by a tab or comma and a destination):").pack(anchor="w")
+        text_frame = ttk.Frame(frame)
+        text_frame.pack(fill="both", expand=True, pady=(4, 8))
+        self.text_box = tk.Text(text_frame, width=60, height=14, wrap="none")
+        scrollbar = ttk.Scrollbar(text_frame, orient="vertical", command=self.text_box.yview)
+        self.text_box.configure(yscrollcommand=scrollbar.set)
+        self.text_box.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+        dest_row = ttk.Frame(frame)
+        dest_row.pack(fill="x")
+        ttk.Label(dest_row, text="Destination for bare patterns:").pack(side="left")
+        self.dest_combo = ttk.Combobox(dest_row, values=self.destinations, state="readonly")
+        self.dest_combo.pack(side="left", fill="x", expand=True, padx=(5, 0))
+        if self.destinations:
+            self.dest_combo.set(self.destinations[0])
+        self.resizable(True, True)
+        return self.text_box
+
+    def validate(self):
+        """
+        Validate user input before closing the dialog.
+        """
+        if not self.text_box.get("1.0", "end").strip():
+            messagebox.showerror("Error", "Please paste at least one pattern.", parent=self)
+            return False
+        return True
+
+    def apply(self):
+        """
+        Save the dialog results.
+        """
+        self.text = self.text_box.get("1.0", "end")
+        self.dest = self.dest_combo.get().strip()
+
+class ChooseDestinationDialog(simpledialog.Dialog):
+    """
+    Dialog for choosing one destination folder, e.g. to reassign several rules.
+    """
+    def __init__(self, parent, title, prompt, destinations):
+        self.prompt = prompt
+        self.destinations = destinations
+        self.dest = None
+        super().__init__(parent, title)
+
+    def body(self, master):
+        """
+        Build the dialog UI.
+        """
+        frame = ttk.Frame(master, padding=(16, 16, 16, 8))
+        frame.pack(fill="both", expand=True)
+        ttk.Label(frame, text=self.prompt, wraplength=420, justify="left").pack(anchor="w", pady=(0, 8))
+        self.dest_combo = ttk.Combobox(frame, values=self.destinations, width=50)
+        self.dest_combo.pack(fill="x")
+        if self.destinations:
+            self.dest_combo.set(self.destinations[0])
+        return self.dest_combo
+
+    def validate(self):
+        """
+        Validate user input before closing the dialog.
+        """
+        if not self.dest_combo.get().strip():
+            messagebox.showerror("Error", "Please select a destination.", parent=self)
+            return False
+        return True
+
+    def apply(self):
+        """
+        Save the dialog results.
+        """
+        self.dest = self.dest_combo.get().strip()
+
+class StructureCopyDialog(simpledialog.Dialog):
+    """
+    Dialog for the options of a folder structure copy: depth limit and
+    include/exclude folder name patterns (separated by ";").
+    """
+    def __init__(self, parent, title, folder_names):
+        self.folder_names = folder_names
+        self.confirmed = False
+        self.max_depth = None
+        self.include = []
+        self.exclude = []
+        super().__init__(parent, title)
+
+    def body(self, master):
+        """
+        Build the dialog UI.
+        """
+        frame = ttk.Frame(master, padding=(16, 16, 16, 8))
+        frame.grid(row=0, column=0, sticky="nsew")
+        frame.grid_columnconfigure(1, weight=1)
+
+        ttk.Label(frame, text="Copy folder structure of: " + ", ".join(self.folder_names)).grid(
+            row=0, column=0, columnspan=2, sticky="w", pady=(0, 8)
+        )
+        ttk.Label(frame, text="Depth limit (0 = unlimited):").grid(row=1, column=0, sticky="w", pady=(0, 8))
+        self.depth_var = tk.IntVar(value=0)
+        self.depth_spin = ttk.Spinbox(frame, from_=0, to=999, width=6, textvariable=self.depth_var)
+        self.depth_spin.grid(row=1, column=1, sticky="w", pady=(0, 8))
+
+        ttk.Label(frame, text="Only top-level folders named:").grid(row=2, column=0, sticky="w", pady=(0, 8))
+        self.include_entry = ttk.Entry(frame, width=40)
+        self.include_entry.grid(row=2, column=1, sticky="ew", pady=(0, 8))
+
+        ttk.Label(frame, text="Skip folders named:").grid(row=3, column=0, sticky="w", pady=(0, 8))
+        self.exclude_entry = ttk.Entry(frame, width=40)
+        self.exclude_entry.grid(row=3, column=1, sticky="ew", pady=(0, 8))
+        self.exclude_entry.insert(0, ".git; __pycache__; node_modules")
+
+        info = ("Tip: Separate patterns with ; and use * as a wildcard. Top-level folders are copied with everything "
+                "below them; skipped folders are left out with everything below them, at any depth.")
+        ttk.Label(frame, text=info, foreground="#666", font=("Segoe UI", 9), wraplength=420, justify="left").grid(
+            row=4, column=0, columnspan=2, sticky="w", pady=(4, 0)
+        )
+        return self.depth_spin
+
+    @staticmethod
+    def _split_patterns(text):
+        return [p.strip() for p in text.split(";") if p.strip()]
+
+    def validate(self):
+        """
+        Validate user input before closing the dialog.
+        """
+        try:
+            depth = int(self.depth_spin.get())
+        except ValueError:
+            depth = -1
+        if depth < 0:
+            messagebox.showerror("Error", "Depth limit must be a whole number (0 for unlimited).", parent=self)
+            return False
+        return True
+
+    def apply(self):
+        """
+        Save the dialog results.
+        """
+        depth = int(self.depth_spin.get())
+        self.confirmed = True
+        self.max_depth = depth or None
+        self.include = self._split_patterns(self.include_entry.get())
+        self.exclude = self._split_patterns(self.exclude_entry.get())
+
+class StructureCopyProgress(tk.Toplevel):
+    """
+    Small non-modal window showing structure copy progress, with a Cancel button.
+    The owner polls the copy and calls update_progress(); on_cancel is called once.
+    """
+    def __init__(self, parent, title, on_cancel):
+        super().__init__(parent)
+        self.title(title)
+        self.transient(parent)
+        self.resizable(False, False)
+        self.on_cancel = on_cancel
+        frame = ttk.Frame(self, padding=12)
+        frame.pack(fill="both", expand=True)
+        self.label = ttk.Label(frame, text="Scanning folders...", width=45)
+        self.label.pack(anchor="w")
+        self.progress = ttk.Progressbar(frame, mode="determinate", length=300)
+        self.progress.pack(fill="x", pady=8)
+        self.cancel_button = ttk.Button(frame, text="Cancel", command=self.cancel)
+        self.cancel_button.pack(anchor="e")
+        self.protocol("WM_DELETE_WINDOW", self.cancel)
+
+    def update_progress(self, created, discovered):
+        total = max(discovered, created, 1)
+        self.progress.configure(maximum=total, value=created)
+        self.label.configure(text=f"Created {created} of {discovered} folders found so far...")
+
+    def cancel(self):
+        if self.on_cancel:
+            self.on_cancel()
+            self.on_cancel = None
+        self.cancel_button.configure(state="disabled")
+        self.label.configure(text="Cancelling...")
+
 # Simple tooltip helper for user-friendliness
 class ToolTip:
     def __init__(self, widget, text):
@@ -1,15 +1,27 @@
 import os
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
+from tkinter import ttk, messagebox, simpledialog, filedialog
 
-from .dialogs import NewMappingDialog, PatternDestDialog
+from .dialogs import (
+    NewMappingDialog, PatternDestDialog, AnalysisReportDialog, PastePatternsDialog, ChooseDestinationDialog
+)
+from . import bulk_rules
 from .template_tree import TemplateTree
 from .mapping_table import MappingTable
+from .rule_index import RuleIndex
+from .destination_index import DestinationIndex
+from .preview_window import PreviewWindow
 from src.utils import ToolTip
 from src import utils
+from src import sorter
+from src.destination_templates import static_prefix
+from src.mapping_analysis import MappingAnalyzer
+from src.preview import MappingPreview
 
 MAPPINGS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../mappings"))
 
+UNDO_LIMIT = 50  # Rule edits that can be undone
+
 class MappingEditor(tk.Toplevel):
     """
     Main window for editing file sorting mappings, using MappingTable and TemplateTree.
@@ -21,9 +33,14 @@ class MappingEditor(tk.Toplevel):
         self.geometry("1000x600")
         self.on_save_callback = on_save_callback
         self.mappings = {}
+        self.directives = {}  # "$"-prefixed mapping options, preserved on save
+        self.rule_index = RuleIndex()  # Backs the filter box; updated incrementally on refresh
+        self.destination_index = DestinationIndex()  # Folder -> patterns, for renames and deletes
         self.mapping_path = mapping_path
         self.template_dir = None
         self.is_dirty = False  # Track unsaved changes
+        self._edit_count = 0  # Bumped on every edit; a background save only clears "dirty" if unchanged
+        self._undo_stack = []  # (description, rules before the edit), newest last
 
         self._dragged_pattern = None
         self._dragging = False
@@ -77,8 +94,24 @@ class MappingEditor(tk.Toplevel):
         mapping_label = ttk.Label(left_frame, text="Pattern → Destination", font=("Segoe UI", 10, "bold"))
         mapping_label.pack(anchor="w", padx=5, pady=(0, 2))
 
-        self.mapping_table = MappingTable(left_frame, on_pattern_drag=self._on_pattern_drag_event)
-        self.mapping_table.pack(fill="both", expand=True, padx=0, pady=0)
+        filter_frame = ttk.Frame(left_frame)
+        filter_frame.pack(fill="x", padx=5, pady=(0, 4))
+        ttk.Label(filter_frame, text="Filter:").pack(side="left")
+        self.rule_filter_var = tk.StringVar()
+        filter_entry = ttk.Entry(filter_frame, textvariable=self.rule_filter_var)
+        filter_entry.pack(side="left", fill="x", expand=True, padx=(5, 5))
+        ToolTip(filter_entry, "Show only rules whose pattern or destination contains all of these words.")
+        self.rule_count_label = ttk.Label(filter_frame, text="", foreground="#666")
+        self.rule_count_label.pack(side="left")
+        self.rule_filter_var.trace_add("write", lambda *args: self._apply_rule_filter())
+
+        table_frame = ttk.Frame(left_frame)
+        table_frame.pack(fill="both", expand=True, padx=0, pady=0)
+        self.mapping_table = MappingTable(table_frame, on_pattern_drag=self._on_pattern_drag_event)
+        table_scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.mapping_table.yview)
+        table_scrollbar.pack(side="right", fill="y")
+        self.mapping_table.pack(side="left", fill="both", expand=True)
+        self.mapping_table.set_scrollbar(table_scrollbar)
         ToolTip(self.mapping_table, "Patterns and their destination folders.")
 
         # Enable drag-and-drop ONLY for setting destination (not for reordering)
@@ -102,16 +135,41 @@ class MappingEditor(tk.Toplevel):
 
         remove_btn = ttk.Button(button_frame, text="Remove", command=self._remove_rule)
         remove_btn.pack(side="left", fill="x", expand=True, padx=(0, 5))
-        ToolTip(remove_btn, "Remove the selected mapping.")
+        ToolTip(remove_btn, "Remove the selected mappings (Ctrl/Shift-click or Ctrl+A to select several).")
 
         move_up_btn = ttk.Button(button_frame, text="Move Up", command=self._move_up)
         move_up_btn.pack(side="left", fill="x", expand=True, padx=(0, 5))
         ToolTip(move_up_btn, "Move the selected mapping up.")
 
         move_down_btn = ttk.Button(button_frame, text="Move Down", command=self._move_down)
-        move_down_btn.pack(side="left", fill="x", expand=True)
+        move_down_btn.pack(side="left", fill="x", expand=True, padx=(0, 5))
         ToolTip(move_down_btn, "Move the selected mapping down.")
 
+        analyze_btn = ttk.Button(button_frame, text="Analyze", command=self._analyze_mappings)
+        analyze_btn.pack(side="left", fill="x", expand=True, padx=(0, 5))
+        ToolTip(analyze_btn, "Find unreachable, shadowed and overlapping patterns, and suggest a faster rule order.")
+
+        preview_btn = ttk.Button(button_frame, text="Preview", command=self._open_preview)
+        preview_btn.pack(side="left", fill="x", expand=True, padx=(0, 5))
+        ToolTip(preview_btn, "See where the files in a folder would go with these rules, without moving anything.")
+
+        bulk_btn = ttk.Menubutton(button_frame, text="Bulk")
+        bulk_menu = tk.Menu(bulk_btn, tearoff=0)
+        bulk_menu.add_command(label="Import from CSV...", command=self._import_rules_csv)
+        bulk_menu.add_command(label="Export to CSV...", command=self._export_rules_csv)
+        bulk_menu.add_command(label="Paste Patterns...", command=self._paste_patterns)
+        bulk_menu.add_separator()
+        bulk_menu.add_command(label="Reassign Shown Rules...", command=self._reassign_shown_rules)
+        bulk_menu.add_command(label="Select All Shown", command=self.mapping_table.select_all)
+        bulk_menu.add_command(label="Delete Selected", command=self._remove_rule)
+        bulk_menu.add_separator()
+        bulk_menu.add_command(label="Undo", command=self._undo, accelerator="Ctrl+Z")
+        bulk_btn["menu"] = bulk_menu
+        bulk_btn.pack(side="left", fill="x", expand=True)
+        ToolTip(bulk_btn, "Import, paste, reassign or delete many rules at once. Each is one undo step.")
+        self.bind("<Control-z>", lambda e: self._undo())
+        self.mapping_table.bind("<Delete>", lambda e: self._remove_rule())
+
         # --- Right: Template directory treeview and controls ---
         right_frame = ttk.Frame(paned)
         paned.add(right_frame, weight=2)
@@ -168,6 +226,8 @@ class MappingEditor(tk.Toplevel):
 
     def _set_dirty(self, dirty=True):
         """Mark the editor state as dirty (unsaved) and update title."""
+        if dirty:
+            self._edit_count += 1
         if dirty and not self.is_dirty:
             self.title(self.title() + " *")
         elif not dirty and self.is_dirty:
@@ -184,7 +244,7 @@ class MappingEditor(tk.Toplevel):
             parent=self
         )
         if response is True:  # Yes
-            self._save()
+            self._save(wait=True)
             return not self.is_dirty # Proceed if save was successful
         elif response is False:  # No
             return True # Proceed without saving
@@ -277,7 +337,9 @@ class MappingEditor(tk.Toplevel):
     def _on_mapping_table_right_click(self, event):
         item = self.mapping_table.identify_row(event.y)
         if item:
-            self.mapping_table.selection_set(item)
+            if item not in self.mapping_table.selection():
+                self.mapping_table.selection_set(item)
+            self.mapping_table.focus(item)
             self.mapping_table_menu.entryconfig("Edit Pattern", state="normal")
             self.mapping_table_menu.entryconfig("Remove Pattern", state="normal")
         else:
@@ -333,32 +395,17 @@ class MappingEditor(tk.Toplevel):
             messagebox.showerror("Rename Failed", f"Could not rename folder:\n{e}", parent=self)
             return
 
-        # Update all mappings whose destination includes the old folder path
-        updated_mappings = {}
-        for pattern, dest in self.mappings.items():
-            # If dest is "." or empty, skip
-            if not dest or dest == ".":
-                updated_mappings[pattern] = dest
-                continue
-            # Normalize paths for comparison
-            norm_dest = os.path.normpath(dest)
-            norm_old = os.path.normpath(old_rel_path)
-            if norm_dest == norm_old or norm_dest.startswith(norm_old + os.sep):
-                # Replace only the first occurrence
-                new_dest = os.path.normpath(
-                    norm_dest.replace(norm_old, new_rel_path, 1)
-                )
-                updated_mappings[pattern] = new_dest
-            else:
-                updated_mappings[pattern] = dest
-        self.mappings = updated_mappings
+        # Re-point only the rules whose destination is the renamed folder or below it.
+        for pattern, dest in self.destination_index.rename(old_rel_path, new_rel_path).items():
+            self.mappings[pattern] = dest
+        # Earlier rule edits refer to the old folder name, so they can no longer be undone.
+        self._undo_stack.clear()
         self._refresh_mapping_table()
         self._populate_template_tree()
         self._set_dirty()
 
     def _get_template_dir(self, mapping_path):
-        base, _ = os.path.splitext(mapping_path)
-        return base + "_template"
+        return sorter.template_dir(mapping_path)
 
     def _new_mapping_file(self):
         if not self._check_unsaved_changes():
@@ -394,6 +441,7 @@ class MappingEditor(tk.Toplevel):
         self.mapping_file_var.set(os.path.basename(mapping_path))
         self.template_dir = template_dir
         self.mappings = {}
+        self.directives = {}
         self._refresh_mapping_table()
         self._populate_template_tree()
         if import_selected and import_path:
@@ -402,17 +450,37 @@ class MappingEditor(tk.Toplevel):
 
     def _load_mappings(self):
         if self.mapping_path and utils.MappingUtils.is_valid_mapping_file(self.mapping_path):
-            self.mappings = utils.MappingUtils.load_mapping(self.mapping_path)
+            self.mappings, self.directives = utils.MappingUtils.split_directives(
+                utils.MappingUtils.load_mapping(self.mapping_path)
+            )
             self._refresh_mapping_table()
         else:
             self.mappings = {}
-            self.mapping_table.delete(*self.mapping_table.get_children())
+            self.directives = {}
+            self._refresh_mapping_table()
+        self._undo_stack.clear()
         self._set_dirty(False)
 
     def _refresh_mapping_table(self):
-        self.mapping_table.refresh(self.mappings)
+        self.rule_index.update(self.mappings)
+        self.destination_index.update(self.mappings)
+        self._apply_rule_filter()
+
+    def _apply_rule_filter(self):
+        """Show only the rules matching the filter box, in rule order."""
+        matches = self.rule_index.search(self.rule_filter_var.get())
+        if matches is None:
+            self.mapping_table.refresh(self.mappings)
+            self.rule_count_label.config(text=f"{len(self.mappings)} rules")
+        else:
+            self.mapping_table.refresh(self.mappings, [p for p in self.mappings if p in matches])
+            self.rule_count_label.config(text=f"{len(matches)} of {len(self.mappings)}")
 
     def _get_all_destinations(self):
+        # Reuse the template tree's background scan when it is current.
+        known = self.template_tree.known_folders(self.template_dir) if self.template_dir else None
+        if known is not None:
+            return ["."] + known
         destinations = []
         if self.template_dir and os.path.exists(self.template_dir):
             for root, dirs, _ in os.walk(self.template_dir):
@@ -431,7 +499,33 @@ class MappingEditor(tk.Toplevel):
         self.template_tree.add_folder()
 
     def _delete_folder_from_template(self):
-        self.template_tree.delete_folder()
+        self.template_tree.delete_folder(before_delete=self._confirm_folder_delete)
+
+    def _confirm_folder_delete(self, rel_path):
+        """
+        Warn when rules still send files to a folder about to be deleted, and
+        optionally remove those rules. Returns False to cancel the delete.
+        """
+        patterns = sorted(self.destination_index.patterns_under(rel_path))
+        if not patterns:
+            return True
+        listing = "\n".join(patterns[:10])
+        if len(patterns) > 10:
+            listing += f"\n... and {len(patterns) - 10} more"
+        answer = messagebox.askyesnocancel(
+            "Folder In Use",
+            f"{len(patterns)} rules send files to '{rel_path}' or its subfolders:\n\n{listing}\n\n"
+            "Remove these rules too? (No keeps them; sorting will recreate the folder.)",
+            parent=self
+        )
+        if answer is None:
+            return False
+        if answer:
+            removed = set(patterns)
+            self._apply_rules("Remove rules for deleted folder", {
+                k: v for k, v in self.mappings.items() if k not in removed
+            })
+        return True
 
     def _on_folder_selected(self, rel_path):
         pass
@@ -441,7 +535,8 @@ class MappingEditor(tk.Toplevel):
             messagebox.showerror("No Template Directory", "No template directory set.", parent=self)
             return
         created = 0
-        for dest in set(self.mappings.values()):
+        # Template destinations ("Images/{mtime:%Y}") only get their fixed leading folders.
+        for dest in {static_prefix(d) for d in self.mappings.values() if d}:
             if not dest or dest == ".":
                 continue
             folder_path = os.path.join(self.template_dir, dest)
@@ -488,9 +583,9 @@ class MappingEditor(tk.Toplevel):
                 rel_path = "."
             if self._dragged_pattern in self.mappings:
                 if self.mappings[self._dragged_pattern] != rel_path:
-                    self.mappings[self._dragged_pattern] = rel_path
-                    self._refresh_mapping_table()
-                    self._set_dirty()
+                    updated = dict(self.mappings)
+                    updated[self._dragged_pattern] = rel_path
+                    self._apply_rules("Assign destination", updated)
         self._dragged_pattern = None
         self._dragging = False
         self._drag_context = None
@@ -535,20 +630,20 @@ class MappingEditor(tk.Toplevel):
         if pattern in self.mappings:
             messagebox.showwarning("Duplicate Pattern", "This pattern already exists.")
             return
-        self.mappings[pattern] = dest
-        self._refresh_mapping_table()
-        self._set_dirty()
+        updated = dict(self.mappings)
+        updated[pattern] = dest
+        self._apply_rules("Add pattern", updated)
+        self.mapping_table.select_pattern(pattern)
 
     def _edit_rule(self):
         if not self.template_dir or not os.path.exists(self.template_dir):
             messagebox.showerror("No Template Directory", "Please select a mapping file first.", parent=self)
             return
-        selected = self.mapping_table.selection()
-        if not selected:
+        pattern = self.mapping_table.selected_pattern()
+        if pattern is None:
             messagebox.showwarning("No Selection", "Please select a mapping to edit.")
             return
-        item = selected[0]
-        pattern, dest = self.mapping_table.item(item, "values")
+        dest = self.mappings[pattern]
         destinations = self._get_all_destinations()
         dialog = PatternDestDialog(self, "Edit Pattern Mapping", self.template_dir, destinations, initial_pattern=pattern, initial_dest=dest)
         new_pattern, new_dest = dialog.pattern, dialog.dest
@@ -557,59 +652,172 @@ class MappingEditor(tk.Toplevel):
         if new_pattern != pattern and new_pattern in self.mappings:
             messagebox.showwarning("Duplicate Pattern", "This pattern already exists.")
             return
-        del self.mappings[pattern]
-        self.mappings[new_pattern] = new_dest
-        self._refresh_mapping_table()
-        self._set_dirty()
+        # Keep the rule's position: order decides which pattern wins.
+        self._apply_rules("Edit pattern", {
+            (new_pattern if k == pattern else k): (new_dest if k == pattern else v)
+            for k, v in self.mappings.items()
+        })
+        self.mapping_table.select_pattern(new_pattern)
 
     def _remove_rule(self):
-        selected = self.mapping_table.selection()
+        selected = set(self.mapping_table.selected_patterns())
         if not selected:
             messagebox.showwarning("No Selection", "Please select a mapping to remove.")
             return
-        item = selected[0]
-        pattern, _ = self.mapping_table.item(item, "values")
-        del self.mappings[pattern]
-        self._refresh_mapping_table()
-        self._set_dirty()
+        if len(selected) > 1 and not messagebox.askyesno(
+            "Remove Patterns", f"Remove {len(selected)} selected patterns?", parent=self
+        ):
+            return
+        self._apply_rules("Remove patterns", {k: v for k, v in self.mappings.items() if k not in selected})
 
     def _move_up(self):
-        selected = self.mapping_table.selection()
-        if not selected or self.mapping_table.index(selected[0]) == 0:
+        self._move_rule(-1)
+
+    def _move_down(self):
+        self._move_rule(1)
+
+    def _move_rule(self, offset):
+        """Move the selected rule one place up or down in the full rule order."""
+        pattern = self.mapping_table.selected_pattern()
+        if pattern is None:
             return
-        item = selected[0]
-        index = self.mapping_table.index(item)
         keys = list(self.mappings.keys())
-        keys.insert(index - 1, keys.pop(index))
-        new_mappings = {k: self.mappings[k] for k in keys}
-        self.mappings = new_mappings
+        index = keys.index(pattern)
+        if not 0 <= index + offset < len(keys):
+            return
+        keys.insert(index + offset, keys.pop(index))
+        self._apply_rules("Move pattern", {k: self.mappings[k] for k in keys})
+        self.mapping_table.select_pattern(pattern)
+
+    def _analyze_mappings(self):
+        if not self.mappings:
+            messagebox.showinfo("Analyze Mapping", "There are no patterns to analyze.", parent=self)
+            return
+        hits = sorter.load_hit_counts(self.mapping_path) if self.mapping_path else {}
+        analyzer = MappingAnalyzer(self.mappings, hits)
+        order = analyzer.suggest_order()
+        can_reorder = bool(hits) and order != analyzer.patterns
+        dialog = AnalysisReportDialog(self, "Mapping Analysis", analyzer.report(), can_reorder=can_reorder)
+        if dialog.apply_order:
+            self._apply_rules("Apply suggested order", {pattern: self.mappings[pattern] for pattern in order})
+
+    def _open_preview(self):
+        """Preview the rules as currently edited (saved or not) against a folder."""
+        rules, directives = dict(self.mappings), dict(self.directives)
+
+        def make_preview(folder, deep, sample_limit):
+            return MappingPreview(rules, folder, directives=directives, deep=deep, sample_limit=sample_limit)
+
+        name = os.path.basename(self.mapping_path) if self.mapping_path else "unsaved mapping"
+        PreviewWindow(self, f"Preview - {name}", make_preview)
+
+    # --- Bulk edits and undo ---
+
+    def _apply_rules(self, description, mappings):
+        """
+        Replace all rules in one step: a single undo entry and a single table refresh.
+        """
+        self._undo_stack.append((description, self.mappings))
+        del self._undo_stack[:-UNDO_LIMIT]
+        self.mappings = mappings
         self._refresh_mapping_table()
-        self.mapping_table.selection_set(self.mapping_table.get_children()[index - 1])
         self._set_dirty()
 
-    def _move_down(self):
-        selected = self.mapping_table.selection()
-        if not selected or self.mapping_table.index(selected[0]) == len(self.mappings) - 1:
+    def _undo(self):
+        if not self._undo_stack:
             return
-        item = selected[0]
-        index = self.mapping_table.index(item)
-        keys = list(self.mappings.keys())
-        keys.insert(index + 1, keys.pop(index))
-        new_mappings = {k: self.mappings[k] for k in keys}
-        self.mappings = new_mappings
+        _, self.mappings = self._undo_stack.pop()
         self._refresh_mapping_table()
-        self.mapping_table.selection_set(self.mapping_table.get_children()[index + 1])
         self._set_dirty()
 
-    def _save(self):
+    def _merge_rules(self, description, rules):
+        if not rules:
+            messagebox.showinfo(description, "No rules found.", parent=self)
+            return
+        merged, added, updated = bulk_rules.merge_rules(self.mappings, rules)
+        if added or updated:
+            self._apply_rules(description, merged)
+        messagebox.showinfo(description, f"{added} rules added, {updated} updated.", parent=self)
+
+    def _import_rules_csv(self):
+        path = filedialog.askopenfilename(
+            title="Import Rules from CSV", filetypes=[("CSV Files", "*.csv"), ("All Files", "*.*")], parent=self
+        )
+        if not path:
+            return
+        try:
+            rules = bulk_rules.read_rules_csv(path)
+        except (OSError, UnicodeDecodeError) as e:
+            messagebox.showerror("Import Failed", f"Could not read CSV file:\n{e}", parent=self)
+            return
+        self._merge_rules("Import Rules", rules)
+
+    def _export_rules_csv(self):
+        path = filedialog.asksaveasfilename(
+            title="Export Rules to CSV", defaultextension=".csv", filetypes=[("CSV Files", "*.csv")], parent=self
+        )
+        if not path:
+            return
+        try:
+            bulk_rules.write_rules_csv(path, self.mappings)
+        except OSError as e:
+            messagebox.showerror("Export Failed", f"Could not write CSV file:\n{e}", parent=self)
+
+    def _paste_patterns(self):
+        dialog = PastePatternsDialog(self, "Paste Patterns", self._get_all_destinations())
+        if dialog.text is None:
+            return
+        self._merge_rules("Paste Patterns", bulk_rules.parse_rule_lines(dialog.text, dialog.dest))
+
+    def _reassign_shown_rules(self):
+        """Send every rule matching the filter (or the selection, if several are selected) to one destination."""
+        patterns = self.mapping_table.selected_patterns()
+        if len(patterns) < 2:
+            patterns = [p for p, _ in self.mapping_table.shown_rows()]
+        if not patterns:
+            messagebox.showinfo("Reassign Rules", "No rules are shown.", parent=self)
+            return
+        dialog = ChooseDestinationDialog(
+            self, "Reassign Rules", f"New destination for {len(patterns)} rules:", self._get_all_destinations()
+        )
+        if not dialog.dest:
+            return
+        targets = set(patterns)
+        self._apply_rules(
+            "Reassign rules", {k: (dialog.dest if k in targets else v) for k, v in self.mappings.items()}
+        )
+
+    def _save(self, wait=False):
+        """
+        Save the mapping (atomically, with its compiled sidecar). The write runs in
+        the background unless wait is True, so large mappings do not block the editor.
+        """
         if not self.mapping_path:
             messagebox.showerror("No Mapping File", "No mapping file selected to save.")
             return
-        utils.MappingUtils.save_mapping(self.mapping_path, self.mappings)
-        self._set_dirty(False)
-        if self.on_save_callback:
-            self.on_save_callback()
-        messagebox.showinfo("Saved", "Mapping saved successfully.", parent=self)
+        path = self.mapping_path
+        data = utils.MappingUtils.merge_directives(self.mappings, self.directives)
+        edit_count = self._edit_count
+
+        def saved(_=None):
+            if self._edit_count == edit_count:
+                self._set_dirty(False)
+            if self.on_save_callback:
+                self.on_save_callback()
+            messagebox.showinfo("Saved", "Mapping saved successfully.", parent=self)
+
+        def failed(error):
+            messagebox.showerror("Error", f"Could not save mapping:\n{error}", parent=self)
+
+        if wait:
+            try:
+                utils.MappingUtils.save_mapping(path, data)
+            except OSError as e:
+                failed(e)
+                return
+            saved()
+            return
+        utils.run_in_background(self, lambda: utils.MappingUtils.save_mapping(path, data), saved, failed)
 
 # For testing layout only
 if __name__ == "__main__":
@@ -1,14 +1,23 @@
 import tkinter as tk
 from tkinter import ttk
 
+DEFAULT_ROW_HEIGHT = 20
+
 class MappingTable(ttk.Treeview):
     """
     Custom Treeview for displaying and managing pattern → destination mappings.
     Handles drag start for drag-and-drop assignment.
+
+    The table is virtualized: only the rows that fit in the widget are inserted,
+    and scrolling (scrollbar, mouse wheel, arrow/page keys) re-renders that
+    window, so tens of thousands of rules display instantly. Use
+    selected_pattern() / selected_patterns() / select_pattern() rather than
+    item ids, which only exist while a row is visible. Ctrl/Shift-click extend
+    the selection; selected rows stay selected while scrolled out of view.
     """
     def __init__(self, master, on_pattern_drag=None, **kwargs):
         columns = ("Pattern", "Destination")
-        super().__init__(master, columns=columns, show="headings", selectmode="browse", **kwargs)
+        super().__init__(master, columns=columns, show="headings", selectmode="extended", **kwargs)
         self.heading("Pattern", text="Pattern")
         self.heading("Destination", text="Destination")
         self.column("Pattern", width=250, anchor="w")
@@ -18,12 +27,34 @@ class MappingTable(ttk.Treeview):
         self._dragged_pattern = None
         self._dragging = False
 
+        self._rows = []          # (pattern, destination) rows currently shown (after filtering)
+        self._row_of = {}        # pattern -> index in self._rows
+        self._top = 0            # index of the first rendered row
+        self._page = 1           # number of rows that fit
+        self._row_height = DEFAULT_ROW_HEIGHT
+        self._selection = set()  # selected patterns, kept while their rows are scrolled out of view
+        self._primary = None     # the most recently clicked or selected pattern
+        self._scrollbar = None
+
         self.bind("<ButtonPress-1>", self._on_drag_start)
         self.bind("<B1-Motion>", self._on_drag_motion)
         # No <ButtonRelease-1> binding here (handled globally in editor.py)
+        self.bind("<<TreeviewSelect>>", self._on_select, add="+")
+        self.bind("<Configure>", self._on_configure, add="+")
+        self.bind("<MouseWheel>", self._on_mouse_wheel)
+        self.bind("<Button-4>", lambda e: self._scroll_rows(-3))
+        self.bind("<Button-5>", lambda e: self._scroll_rows(3))
+        for key, delta in (("<Up>", -1), ("<Down>", 1), ("<Prior>", "-page"), ("<Next>", "page")):
+            self.bind(key, lambda e, d=delta: self._move_selection(d))
+        self.bind("<Home>", lambda e: self._select_row(0))
+        self.bind("<End>", lambda e: self._select_row(len(self._rows) - 1))
+        self.bind("<Control-a>", lambda e: self.select_all())
 
     def _on_drag_start(self, event):
         item = self.identify_row(event.y)
+        if event.state & 0x0005:
+            # Shift/Control click: leave it to the Treeview's selection bindings.
+            item = None
         if item:
             self._dragged_pattern = self.item(item, "values")[0]
             self.selection_set(item)
@@ -38,7 +69,152 @@ class MappingTable(ttk.Treeview):
         if self._dragging and self.on_pattern_drag:
             self.on_pattern_drag("motion", self._dragged_pattern)
 
-    def refresh(self, mappings):
+    def set_scrollbar(self, scrollbar):
+        """
+        Connect a vertical scrollbar (created with command=table.yview).
+        """
+        self._scrollbar = scrollbar
+        self._update_scrollbar()
+
+    def refresh(self, mappings, patterns=None):
+        """
+        Show mappings, limited to patterns (an iterable in display order) if given.
+        """
+        if patterns is None:
+            self._rows = list(mappings.items())
+        else:
+            self._rows = [(p, mappings[p]) for p in patterns]
+        self._row_of = {pattern: index for index, (pattern, _) in enumerate(self._rows)}
+        self._top = max(0, min(self._top, len(self._rows) - self._page))
+        self._render()
+
+    def row_count(self):
+        return len(self._rows)
+
+    def shown_rows(self):
+        """
+        Return the (pattern, destination) rows currently shown, after filtering.
+        """
+        return list(self._rows)
+
+    def selected_pattern(self):
+        """
+        Return the primary selected pattern if it is still shown, else None.
+        """
+        if self._primary in self._selection and self._primary in self._row_of:
+            return self._primary
+        selected = self.selected_patterns()
+        return selected[0] if selected else None
+
+    def selected_patterns(self):
+        """
+        Return all selected patterns that are shown, in display order.
+        """
+        if not self._selection:
+            return []
+        return [pattern for pattern, _ in self._rows if pattern in self._selection]
+
+    def select_all(self):
+        """
+        Select every shown row (all rules matching the current filter).
+        """
+        self._selection = set(self._row_of)
+        self._render()
+        return "break"
+
+    def select_pattern(self, pattern):
+        """
+        Select a pattern's row, scrolling it into view.
+        """
+        index = self._row_of.get(pattern)
+        if index is not None:
+            self._select_row(index)
+
+    def yview(self, *args):
+        """
+        Scrollbar protocol, applied to the virtual rows.
+        """
+        if not args:
+            total = max(len(self._rows), 1)
+            return self._top / total, min(self._top + self._page, total) / total
+        if args[0] == "moveto":
+            self._scroll_to(int(float(args[1]) * len(self._rows)))
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            self._scroll_rows(amount * self._page if args[2] == "pages" else amount)
+        return None
+
+    def _scroll_rows(self, delta):
+        self._scroll_to(self._top + delta)
+        return "break"
+
+    def _scroll_to(self, top):
+        top = max(0, min(top, len(self._rows) - self._page))
+        if top != self._top:
+            self._top = top
+            self._render()
+
+    def _on_mouse_wheel(self, event):
+        return self._scroll_rows(-3 if event.delta > 0 else 3)
+
+    def _on_configure(self, event):
+        page = max(1, (event.height - self._header_height()) // self._row_height)
+        if page != self._page:
+            self._page = page
+            self._top = max(0, min(self._top, len(self._rows) - self._page))
+            self._render()
+
+    def _header_height(self):
+        children = self.get_children()
+        box = self.bbox(children[0]) if children else None
+        return box[1] if box else DEFAULT_ROW_HEIGHT + 5
+
+    def _render(self):
         self.delete(*self.get_children())
-        for pattern, dest in mappings.items():
-            self.insert("", "end", values=(pattern, dest))
\ No newline at end of file
+        end = min(len(self._rows), self._top + self._page)
+        for index in range(self._top, end):
+            self.insert("", "end", iid=f"row{index}", values=self._rows[index])
+        visible = [f"row{index}" for index in range(self._top, end) if self._rows[index][0] in self._selection]
+        if visible:
+            self.selection_set(visible)
+        index = self._row_of.get(self._primary)
+        if index is not None and self._top <= index < end:
+            self.focus(f"row{index}")
+        if end > self._top:
+            box = self.bbox(f"row{self._top}")
+            if box and box[3] > 0:
+                self._row_height = box[3]
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        if self._scrollbar is not None:
+            self._scrollbar.set(*self.yview())
+
+    def _on_select(self, event=None):
+        # Only visible rows can change; rows scrolled out of view keep their state.
+        rendered = {self.item(item, "values")[0] for item in self.get_children()}
+        selected = {self.item(item, "values")[0] for item in self.selection()}
+        self._selection = (self._selection - rendered) | selected
+        focus = self.focus()
+        if focus and self.exists(focus):
+            self._primary = self.item(focus, "values")[0]
+
+    def _select_row(self, index):
+        if not self._rows:
+            return "break"
+        index = max(0, min(index, len(self._rows) - 1))
+        self._primary = self._rows[index][0]
+        self._selection = {self._primary}
+        if index < self._top:
+            self._top = index
+        elif index >= self._top + self._page:
+            self._top = index - self._page + 1
+        self._render()
+        self.see(f"row{index}")
+        return "break"
+
+    def _move_selection(self, delta):
+        if delta in ("page", "-page"):
+            delta = self._page if delta == "page" else -self._page
+        index = self._row_of.get(self._primary)
+        return self._select_row(self._top if index is None else index + delta)
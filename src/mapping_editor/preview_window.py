@@ -0,0 +1,183 @@
+"""
+PreviewWindow for FileSorter.
+
+A non-modal window that previews where the files in a folder would go, using
+src.preview.MappingPreview. Opened from the Mapping Editor (previewing the rules
+being edited, saved or not) and from the main window (previewing the selected
+mapping file). The scan runs in the background; the window polls its running
+totals and updates per-destination counts, sizes and unmatched files as they grow.
+"""
+
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+
+from src import utils
+from src.preview import DEFAULT_SAMPLE_LIMIT, UNMATCHED_SAMPLES, format_size
+
+POLL_MS = 200
+
+
+class PreviewWindow(tk.Toplevel):
+    """
+    Preview window. make_preview(folder, deep, sample_limit) must return an
+    unstarted MappingPreview; it is called on a worker thread.
+    """
+    def __init__(self, master, title, make_preview, folders=(), deep=False):
+        super().__init__(master)
+        self.title(title)
+        self.geometry("640x520")
+        self.make_preview = make_preview
+        self.preview = None
+        self._starting = False
+        self._rows = {}  # destination -> tree item id
+        self._samples_shown = 0
+        self._build_widgets(list(folders), deep)
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+
+    def _build_widgets(self, folders, deep):
+        top = ttk.Frame(self, padding=(10, 10, 10, 0))
+        top.pack(fill="x")
+        ttk.Label(top, text="Folder:").pack(side="left")
+        self.folder_var = tk.StringVar(value=folders[0] if folders else "")
+        folder_combo = ttk.Combobox(top, textvariable=self.folder_var, values=folders)
+        folder_combo.pack(side="left", fill="x", expand=True, padx=5)
+        ttk.Button(top, text="Browse...", command=self._browse).pack(side="left")
+
+        options = ttk.Frame(self, padding=(10, 5, 10, 0))
+        options.pack(fill="x")
+        self.deep_var = tk.BooleanVar(value=deep)
+        ttk.Checkbutton(options, text="Include subfolders (deep audit)", variable=self.deep_var).pack(side="left")
+        self.sample_var = tk.BooleanVar(value=True)
+        sample_chk = ttk.Checkbutton(
+            options, text=f"Sample only (first {DEFAULT_SAMPLE_LIMIT:,} files)", variable=self.sample_var
+        )
+        sample_chk.pack(side="left", padx=(10, 0))
+        utils.ToolTip(sample_chk, "Stop after a sample for a quick estimate on very large folders.")
+        self.run_btn = ttk.Button(options, text="Preview", command=self._toggle)
+        self.run_btn.pack(side="right")
+
+        self.status_label = ttk.Label(self, text="Choose a folder and click Preview. Nothing is moved.", padding=(10, 5))
+        self.status_label.pack(fill="x")
+
+        table_frame = ttk.Frame(self, padding=(10, 0))
+        table_frame.pack(fill="both", expand=True)
+        self.tree = ttk.Treeview(table_frame, columns=("Files", "Size"), show="tree headings", height=10)
+        self.tree.heading("#0", text="Destination")
+        self.tree.heading("Files", text="Files")
+        self.tree.heading("Size", text="Size")
+        self.tree.column("#0", width=330)
+        self.tree.column("Files", width=90, anchor="e")
+        self.tree.column("Size", width=100, anchor="e")
+        tree_scroll = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=tree_scroll.set)
+        self.tree.pack(side="left", fill="both", expand=True)
+        tree_scroll.pack(side="right", fill="y")
+
+        ttk.Label(self, text=f"Unmatched files (first {UNMATCHED_SAMPLES}):", padding=(10, 8, 10, 2)).pack(anchor="w")
+        list_frame = ttk.Frame(self, padding=(10, 0, 10, 10))
+        list_frame.pack(fill="both", expand=True)
+        self.unmatched_list = tk.Listbox(list_frame, height=6)
+        list_scroll = ttk.Scrollbar(list_frame, orient="vertical", command=self.unmatched_list.yview)
+        self.unmatched_list.configure(yscrollcommand=list_scroll.set)
+        self.unmatched_list.pack(side="left", fill="both", expand=True)
+        list_scroll.pack(side="right", fill="y")
+
+    def _browse(self):
+        folder = filedialog.askdirectory(mustexist=True, title="Select Folder to Preview", parent=self)
+        if folder:
+            self.folder_var.set(folder)
+
+    def _toggle(self):
+        if self._starting:
+            return
+        if self.preview is not None:
+            self.preview.cancel()
+            return
+        folder = self.folder_var.get().strip()
+        if not folder:
+            messagebox.showwarning("No Folder", "Please choose a folder to preview.", parent=self)
+            return
+        deep = self.deep_var.get()
+        limit = DEFAULT_SAMPLE_LIMIT if self.sample_var.get() else None
+        self.tree.delete(*self.tree.get_children())
+        self._rows = {}
+        self.unmatched_list.delete(0, tk.END)
+        self._samples_shown = 0
+        self.run_btn.config(text="Stop")
+        self.status_label.config(text="Loading mapping...")
+        self._starting = True
+
+        def started(preview):
+            self._starting = False
+            self.preview = preview.start()
+            self._poll()
+
+        def failed(error):
+            self._starting = False
+            self.run_btn.config(text="Preview")
+            self.status_label.config(text="")
+            messagebox.showerror("Preview Failed", f"Could not start the preview:\n{error}", parent=self)
+
+        utils.run_in_background(self, lambda: self.make_preview(folder, deep, limit), started, failed)
+
+    def _poll(self):
+        if self.preview is None:
+            return
+        snapshot = self.preview.snapshot()
+        self._show(snapshot)
+        if snapshot["done"]:
+            self.preview = None
+            self.run_btn.config(text="Preview")
+            if snapshot["error"]:
+                messagebox.showerror("Preview Failed", f"Could not read folder:\n{snapshot['error']}", parent=self)
+            return
+        self.after(POLL_MS, self._poll)
+
+    def _show(self, snapshot):
+        destinations = snapshot["destinations"]
+        for dest, (count, size) in destinations.items():
+            values = (f"{count:,}", format_size(size))
+            item = self._rows.get(dest)
+            if item is None:
+                self._rows[dest] = self.tree.insert("", "end", text=dest, values=values)
+            else:
+                self.tree.item(item, values=values)
+        for position, dest in enumerate(sorted(destinations, key=lambda d: -destinations[d][0])):
+            self.tree.move(self._rows[dest], "", position)
+
+        samples = snapshot["unmatched_samples"]
+        for name in samples[self._samples_shown:]:
+            self.unmatched_list.insert(tk.END, name)
+        self._samples_shown = len(samples)
+
+        # A stopped sample covers only the files scanned so far.
+        sampled = snapshot["truncated"]
+        self.tree.heading("Files", text="Files (sample)" if sampled else "Files")
+        self.tree.heading("Size", text="Size (sample)" if sampled else "Size")
+
+        moved = sum(count for count, _ in destinations.values())
+        total_bytes = sum(size for _, size in destinations.values())
+        parts = [
+            f"{snapshot['scanned']:,} files scanned",
+            f"{moved:,} would move ({format_size(total_bytes)})",
+            f"{snapshot['unmatched']:,} unmatched ({format_size(snapshot['unmatched_bytes'])})",
+        ]
+        if snapshot["in_place"]:
+            parts.append(f"{snapshot['in_place']:,} already in place")
+        if snapshot["override_errors"]:
+            parts.append(f"{len(snapshot['override_errors']):,} invalid override file(s) ignored")
+        if not snapshot["done"]:
+            state = "Scanning..."
+        elif snapshot["cancelled"]:
+            state = "Stopped."
+        elif sampled:
+            state = "Sampled estimate (the folder has more files than these):"
+        else:
+            state = "Complete."
+        self.status_label.config(text=f"{state} " + ", ".join(parts))
+
+    def _on_close(self):
+        if self.preview is not None:
+            self.preview.cancel()
+            self.preview = None
+        self.destroy()
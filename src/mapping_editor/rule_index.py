@@ -0,0 +1,85 @@
+"""
+RuleIndex for the Mapping Editor's filter box.
+
+Finds the rules whose pattern or destination contains every term of a query
+(case-insensitive substring match). Each rule's text is indexed by trigram; a
+query term of three or more characters only checks rules that contain all of its
+trigrams, shorter terms check every rule.
+
+The index is updated incrementally: update() compares the new mappings with the
+indexed ones and re-indexes only rules that were added, removed or changed, so
+it is cheap to call after every edit. A query that extends the previous one is
+answered by narrowing the previous result.
+"""
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class RuleIndex:
+    """
+    Incremental trigram index over pattern -> destination rules.
+    """
+    def __init__(self):
+        self._texts = {}     # pattern -> lowercased "pattern\ndestination"
+        self._postings = {}  # trigram -> set of patterns
+        self._last_query = None
+        self._last_result = None
+
+    def __len__(self):
+        return len(self._texts)
+
+    def update(self, mappings):
+        """
+        Bring the index in line with mappings (pattern -> destination).
+        """
+        changed = False
+        for pattern in [p for p in self._texts if p not in mappings]:
+            self._remove(pattern)
+            changed = True
+        for pattern, dest in mappings.items():
+            text = f"{pattern}\n{dest}".lower()
+            old = self._texts.get(pattern)
+            if old == text:
+                continue
+            if old is not None:
+                self._remove(pattern)
+            self._texts[pattern] = text
+            for gram in _trigrams(text):
+                self._postings.setdefault(gram, set()).add(pattern)
+            changed = True
+        if changed:
+            self._last_query = self._last_result = None
+
+    def _remove(self, pattern):
+        text = self._texts.pop(pattern)
+        for gram in _trigrams(text):
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(pattern)
+                if not postings:
+                    del self._postings[gram]
+
+    def search(self, query):
+        """
+        Return the set of patterns matching every whitespace-separated term of query,
+        or None if the query is empty (no filter).
+        """
+        terms = query.lower().split()
+        if not terms:
+            return None
+        key = " ".join(terms)
+        if self._last_query is not None and key.startswith(self._last_query):
+            # Typing more only narrows the previous result.
+            candidates = self._last_result
+        else:
+            candidates = None
+        for term in sorted(terms, key=len, reverse=True):
+            if len(term) >= 3 and candidates is None:
+                grams = sorted((self._postings.get(g, set()) for g in _trigrams(term)), key=len)
+                candidates = set(grams[0]).intersection(*grams[1:])
+            pool = self._texts.keys() if candidates is None else candidates
+            candidates = {p for p in pool if term in self._texts[p]}
+        self._last_query, self._last_result = key, candidates
+        return candidates
@@ -8,6 +8,11 @@ and managing the template directory structure. It supports:
 - Drag-and-drop of folders from the OS (using tkinterdnd2), copying only the folder structure (no files)
 - Refreshing the tree view
 
+Directory listing and structure copies run on a background thread; results are
+applied on the Tk main thread and the tree shows a busy cursor meanwhile. Dropped
+folders are cloned with StructureCopy (parallel listing, batched creation), with
+a depth limit, name filters, a progress window and cancellation.
+
 Dependencies:
 - tkinterdnd2 (optional, for drag-and-drop support): pip install tkinterdnd2
 
@@ -18,11 +23,17 @@ import shutil
 import tkinter as tk
 from tkinter import ttk, simpledialog, messagebox
 
+from src import utils
+from src.structure_copy import StructureCopy
+from .dialogs import StructureCopyDialog, StructureCopyProgress
+
 try:
     from tkinterdnd2 import DND_FILES, TkinterDnD
 except ImportError:
     DND_FILES = None  # Drag-and-drop will be disabled if not installed
 
+MAX_LISTED_SKIPPED = 10  # unreadable folders listed after a structure copy
+
 class TemplateTree(ttk.Treeview):
     """
     A tree widget for displaying and managing a template directory structure.
@@ -47,18 +58,72 @@ class TemplateTree(ttk.Treeview):
         super().__init__(master, **kwargs)
         self.template_dir = template_dir
         self.on_folder_selected = on_folder_selected
+        self._generation = 0  # Incremented per refresh; stale scan results are dropped
+        self._busy = 0
+        self._loaded_dir = None
+        self.folders = []  # Relative folder paths from the last completed scan
 
         self._populate_tree()
         self.bind("<<TreeviewSelect>>", self._on_select)
 
         # Enable drag-and-drop if tkinterdnd2 is available
         if DND_FILES:
-            self.drop_target_register(DND_FILES)
-            self.dnd_bind('<<Drop>>', self._on_drop)
+            try:
+                self.drop_target_register(DND_FILES)
+                self.dnd_bind('<<Drop>>', self._on_drop)
+            except tk.TclError:
+                pass  # tkdnd is not loaded in this Tk interpreter
+
+    def _set_busy(self, busy):
+        """
+        Show or clear the busy indicator (nested calls are counted).
+        """
+        self._busy += 1 if busy else -1
+        self.configure(cursor="watch" if self._busy > 0 else "")
+        if self.template_dir:
+            name = os.path.basename(self.template_dir)
+            self.heading("#0", text=f"{name} (loading...)" if self._busy > 0 else name)
+
+    def known_folders(self, template_dir):
+        """
+        Return the relative folder paths from the last scan of template_dir,
+        or None if that directory has not been scanned yet.
+        """
+        if self._loaded_dir == template_dir and not self._busy:
+            return list(self.folders)
+        return None
+
+    @staticmethod
+    def _scan_folders(template_dir):
+        """
+        List every folder under template_dir. Runs on a worker thread.
+
+        Returns (rel_path, name, parent_rel_path) tuples in sorted, depth-first order;
+        parent_rel_path is None for top-level folders.
+        """
+        folders = []
+
+        def walk(path, parent_rel):
+            try:
+                with os.scandir(path) as it:
+                    entries = sorted((e for e in it if e.is_dir()), key=lambda e: e.name)
+            except OSError:
+                return
+            for entry in entries:
+                rel_path = os.path.relpath(entry.path, template_dir)
+                folders.append((rel_path, entry.name, parent_rel))
+                walk(entry.path, rel_path)
 
-    def _populate_tree(self):
+        if os.path.exists(template_dir):
+            walk(template_dir, None)
+        return folders
+
+    def _populate_tree(self, on_done=None):
         """
-        Populate the tree view with the current template directory structure.
+        Refresh the tree view from the template directory in the background.
+
+        Args:
+            on_done (callable): Optional callback, called on the main thread once the tree is updated.
         """
         # Save expanded state
         expanded = set()
@@ -70,21 +135,40 @@ class TemplateTree(ttk.Treeview):
         for item in self.get_children():
             save_expanded(item)
 
-        self.delete(*self.get_children())
-        if not self.template_dir or not os.path.exists(self.template_dir):
+        self._generation += 1
+        generation = self._generation
+        template_dir = self.template_dir
+        if not template_dir:
+            self.delete(*self.get_children())
+            self.folders = []
+            self._loaded_dir = None
+            if on_done:
+                on_done()
             return
 
-        def insert_nodes(parent, path):
-            for name in sorted(os.listdir(path)):
-                full_path = os.path.join(path, name)
-                if os.path.isdir(full_path):
-                    rel_path = os.path.relpath(full_path, self.template_dir)
-                    node = self.insert(parent, "end", text=name, values=(rel_path,))
-                    insert_nodes(node, full_path)
-                    if rel_path in expanded:
-                        self.item(node, open=True)
-        insert_nodes("", self.template_dir)
-        self.heading("#0", text=os.path.basename(self.template_dir))
+        def apply(folders):
+            self._set_busy(False)
+            if generation != self._generation:
+                return
+            self.delete(*self.get_children())
+            nodes = {None: ""}
+            for rel_path, name, parent_rel in folders:
+                node = self.insert(nodes[parent_rel], "end", text=name, values=(rel_path,))
+                nodes[rel_path] = node
+                if rel_path in expanded:
+                    self.item(node, open=True)
+            self.folders = [rel_path for rel_path, _, _ in folders]
+            self._loaded_dir = template_dir
+            self.heading("#0", text=os.path.basename(template_dir))
+            if on_done:
+                on_done()
+
+        def failed(error):
+            self._set_busy(False)
+            messagebox.showerror("Error", f"Could not read template directory:\n{error}", parent=self)
+
+        self._set_busy(True)
+        utils.run_in_background(self, lambda: self._scan_folders(template_dir), apply, failed)
 
     def _on_select(self, event):
         """
@@ -108,18 +192,29 @@ class TemplateTree(ttk.Treeview):
             rel_path = self.item(parent_node, "values")[0]
             parent_dir = os.path.join(self.template_dir, rel_path)
         folder_name = simpledialog.askstring("New Folder", "Enter folder name:", parent=self)
-        if folder_name:
-            new_folder_path = os.path.join(parent_dir, folder_name)
-            try:
-                os.makedirs(new_folder_path, exist_ok=True)
-                self._populate_tree()
-                self._select_folder_by_path(os.path.relpath(new_folder_path, self.template_dir))
-            except Exception as e:
-                messagebox.showerror("Error", f"Could not create folder:\n{e}", parent=self)
+        if not folder_name:
+            return
+        new_folder_path = os.path.join(parent_dir, folder_name)
+        rel_path = os.path.relpath(new_folder_path, self.template_dir)
+
+        def failed(error):
+            self._set_busy(False)
+            messagebox.showerror("Error", f"Could not create folder:\n{error}", parent=self)
 
-    def delete_folder(self):
+        def created(_):
+            self._set_busy(False)
+            self._populate_tree(on_done=lambda: self._select_folder_by_path(rel_path))
+
+        self._set_busy(True)
+        utils.run_in_background(self, lambda: os.makedirs(new_folder_path, exist_ok=True), created, failed)
+
+    def delete_folder(self, before_delete=None):
         """
         Delete the selected folder and all its contents after user confirmation.
+
+        Args:
+            before_delete (callable): Optional check, called with the folder's relative path
+                after confirmation; returning False cancels the delete.
         """
         selected = self.selection()
         if not selected:
@@ -128,17 +223,37 @@ class TemplateTree(ttk.Treeview):
         node = selected[0]
         rel_path = self.item(node, "values")[0]
         abs_path = os.path.join(self.template_dir, rel_path)
-        if not os.path.isdir(abs_path):
-            messagebox.showerror("Error", "Selected path is not a folder.", parent=self)
-            return
-        if os.listdir(abs_path):
-            if not messagebox.askyesno("Confirm Delete", "Folder is not empty. Delete anyway?", parent=self):
-                return
-        try:
-            shutil.rmtree(abs_path)
+
+        def inspect():
+            # Runs on a worker thread; must not touch Tk.
+            if not os.path.isdir(abs_path):
+                return None
+            with os.scandir(abs_path) as entries:
+                return next(entries, None) is not None
+
+        def failed(error):
+            self._set_busy(False)
+            messagebox.showerror("Error", f"Could not delete folder:\n{error}", parent=self)
+
+        def deleted(_):
+            self._set_busy(False)
             self._populate_tree()
-        except Exception as e:
-            messagebox.showerror("Error", f"Could not delete folder:\n{e}", parent=self)
+
+        def inspected(non_empty):
+            self._set_busy(False)
+            if non_empty is None:
+                messagebox.showerror("Error", "Selected path is not a folder.", parent=self)
+                return
+            if non_empty:
+                if not messagebox.askyesno("Confirm Delete", "Folder is not empty. Delete anyway?", parent=self):
+                    return
+            if before_delete and not before_delete(rel_path):
+                return
+            self._set_busy(True)
+            utils.run_in_background(self, lambda: shutil.rmtree(abs_path), deleted, failed)
+
+        self._set_busy(True)
+        utils.run_in_background(self, inspect, inspected, failed)
 
     def _select_folder_by_path(self, rel_path):
         """
@@ -161,27 +276,75 @@ class TemplateTree(ttk.Treeview):
     def _on_drop(self, event):
         """
         Handle drag-and-drop of folders from the OS.
-        Only the folder structure (no files) is copied into the template directory.
+        Only the folder structure (no files) is copied into the template directory,
+        after asking for a depth limit and name filters.
         """
         paths = self.tk.splitlist(event.data)
-        for path in paths:
-            if os.path.isdir(path):
-                self._copy_folder_structure_only(path, self.template_dir)
-        self._populate_tree()
-        messagebox.showinfo("Folders Added", "Folder structure added to template directory.")
+        if not paths or not self.template_dir:
+            return
+        options = StructureCopyDialog(
+            self, "Copy Folder Structure", [os.path.basename(os.path.normpath(p)) for p in paths]
+        )
+        if not options.confirmed:
+            return
+        copies = [
+            StructureCopy(path, self.template_dir, max_depth=options.max_depth,
+                          include=options.include, exclude=options.exclude)
+            for path in paths
+        ]
+        running = [True]
 
-    def _copy_folder_structure_only(self, src, dst):
-        """
-        Copy only the folder structure (no files) from src to dst/template_dir.
+        def cancel():
+            for copy in copies:
+                copy.cancel()
 
-        Args:
-            src: Source folder path.
-            dst: Destination template directory.
-        """
-        for root, dirs, files in os.walk(src):
-            rel_path = os.path.relpath(root, src)
-            if rel_path == ".":
-                target_dir = os.path.join(dst, os.path.basename(src))
-            else:
-                target_dir = os.path.join(dst, os.path.basename(src), rel_path)
-            os.makedirs(target_dir, exist_ok=True)
\ No newline at end of file
+        progress = StructureCopyProgress(self, "Copying Folder Structure", cancel)
+
+        def poll():
+            if not running[0]:
+                return
+            progress.update_progress(sum(c.created for c in copies), sum(c.discovered for c in copies))
+            self.after(100, poll)
+
+        def copy_all():
+            # Runs on a worker thread; must not touch Tk.
+            copied = 0
+            for copy in copies:
+                if copy.cancelled:
+                    break
+                if os.path.isdir(copy.src):
+                    copy.run()
+                    copied += 1
+            return copied
+
+        def finish():
+            running[0] = False
+            progress.destroy()
+            self._set_busy(False)
+            self._populate_tree()
+
+        def copied(count):
+            finish()
+            created = sum(c.created for c in copies)
+            skipped = [item for c in copies for item in c.skipped]
+            note = ""
+            if skipped:
+                lines = [f"- {path}: {error}" for path, error in skipped[:MAX_LISTED_SKIPPED]]
+                if len(skipped) > MAX_LISTED_SKIPPED:
+                    lines.append(f"... and {len(skipped) - MAX_LISTED_SKIPPED} more.")
+                note = f"\n\n{len(skipped)} folder(s) could not be read and were skipped:\n" + "\n".join(lines)
+            if any(c.cancelled for c in copies):
+                messagebox.showinfo("Copy Cancelled", f"Stopped after creating {created} folders.{note}", parent=self)
+            elif skipped:
+                messagebox.showwarning("Folders Added", f"Folder structure added to template directory.{note}",
+                                       parent=self)
+            elif count:
+                messagebox.showinfo("Folders Added", "Folder structure added to template directory.")
+
+        def failed(error):
+            finish()
+            messagebox.showerror("Error", f"Could not copy folder structure:\n{error}", parent=self)
+
+        self._set_busy(True)
+        poll()
+        utils.run_in_background(self, copy_all, copied, failed)
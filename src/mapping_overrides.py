@@ -0,0 +1,183 @@
+"""
+Per-folder mapping overrides for FileSorter deep audits.
+
+A folder below the audited root may contain an override file (OVERRIDE_FILE,
+".filesorter.json") with its own rules for that folder and everything below it:
+
+    {
+        "*.pdf": "Specs",
+        "*.psd": "Design/{mtime:%Y}"
+    }
+
+Override rules are tried before the inherited ones, and a pattern defined again
+replaces the inherited rule. "$inherit": false drops the inherited rules
+altogether. Destinations in an override file are relative to the folder that
+holds it, so a sub-project keeps its files inside itself. Content rules, "$scan"
+options and hit counting stay those of the main mapping. Override files are never
+moved themselves. An invalid override file is reported (see on_error below) and
+its folder keeps the rules it inherits.
+
+Each override produces one MappingScope with a merged RuleMatcher, built from
+its parent scope when the walk reaches the folder; every folder below without
+an override of its own shares that scope. OverrideCache keeps the scopes while
+the override files are unchanged, so repeated audits with one cache (the daemon
+keeps one per mapping, a shard worker one per run) do not rebuild them. It holds
+at most MAX_CACHED_SCOPES scopes, dropping the least recently used.
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from src.destination_templates import compile_templates, is_template
+from src.rule_matcher import RuleMatcher
+
+OVERRIDE_FILE = ".filesorter.json"
+INHERIT_KEY = "$inherit"
+MAX_CACHED_SCOPES = 4096
+
+
+def _rebase(rel_dir, dest):
+    """
+    Make a destination from an override in rel_dir relative to the audited root.
+    """
+    if rel_dir in ("", "."):
+        return dest
+    if is_template(dest):
+        # Braces in the folder name are literal text in the template.
+        return os.path.join(rel_dir.replace("{", "{{").replace("}", "}}"), dest)
+    return os.path.join(rel_dir, dest)
+
+
+class MappingScope:
+    """
+    The rules in effect in a folder with an override, and in the folders below it.
+    Offers FileMapping's match / needs_stat / resolve / destination_for.
+    """
+    def __init__(self, file_mapping, rules, templates, inherited):
+        self.file_mapping = file_mapping
+        self.rules = rules  # pattern -> destination relative to the audited root
+        self.matcher = RuleMatcher(rules)
+        self.templates = templates
+        self.inherited = inherited  # patterns from the main mapping, counted in its hits
+
+    @classmethod
+    def merged(cls, parent, rel_dir, data):
+        """
+        Build the scope for an override in rel_dir (relative to the root) below parent,
+        which is a MappingScope or the root: the FileMapping itself, or anything with
+        its rules as .mapping and its templates as .templates (see preview). Raises ValueError.
+        """
+        from src.sorter import split_directives
+        if not isinstance(data, dict):
+            raise ValueError("an override file must contain a JSON object")
+        rules, directives = split_directives(data)
+        own = {}
+        for pattern, dest in rules.items():
+            if not isinstance(dest, str):
+                raise ValueError(f"destination of {pattern!r} must be a string")
+            own[pattern] = _rebase(rel_dir, dest)
+        templates = dict(parent.templates)
+        templates.update(compile_templates(dest for pattern, dest in own.items() if is_template(rules[pattern])))
+        if isinstance(parent, MappingScope):
+            file_mapping, parent_rules, parent_inherited = parent.file_mapping, parent.rules, parent.inherited
+        else:
+            file_mapping, parent_rules = parent, parent.mapping
+            parent_inherited = parent_rules
+        merged = dict(own)
+        inherited = set()
+        if directives.get(INHERIT_KEY, True):
+            for pattern, dest in parent_rules.items():
+                if pattern not in merged:
+                    merged[pattern] = dest
+                    if pattern in parent_inherited:
+                        inherited.add(pattern)
+        return cls(file_mapping, merged, templates, inherited)
+
+    def match(self, filename, count=True):
+        if filename == OVERRIDE_FILE:
+            return None
+        index = self.matcher.match(filename)
+        if index is None:
+            return None
+        pattern = self.matcher.patterns[index]
+        if count and self.file_mapping.hits is not None and pattern in self.inherited:
+            self.file_mapping.hits[pattern] += 1
+        return self.rules[pattern]
+
+    def needs_stat(self, dest):
+        return self.file_mapping.needs_stat(dest, self.templates)
+
+    def resolve(self, filename, path, dest, entry=None):
+        return self.file_mapping.resolve(filename, path, dest, entry, self.templates)
+
+    def destination_for(self, filename, path, entry=None):
+        return self.resolve(filename, path, self.match(filename), entry)
+
+
+class OverrideCache:
+    """
+    Scopes built from override files, reused while the files are unchanged.
+    """
+    def __init__(self, mapping, max_scopes=MAX_CACHED_SCOPES):
+        self.mapping = mapping
+        self.max_scopes = max_scopes
+        self._scopes = OrderedDict()  # (parent scope, override path) -> ((mtime_ns, size), scope), LRU order
+        self._lock = threading.Lock()
+
+    def scope_for(self, parent, dirpath, rel_dir, filenames=None, on_error=None):
+        """
+        Return the scope for a folder whose parent folder's scope is parent: a merged
+        scope if it holds an override file, else parent itself. filenames is the
+        folder's listing, if the caller has it (saves a stat for folders without one).
+        An invalid override file raises ValueError, or, if on_error is given, is passed
+        to on_error(override path, error) and the folder keeps parent.
+        """
+        if filenames is not None and OVERRIDE_FILE not in filenames:
+            return parent
+        path = os.path.join(dirpath, OVERRIDE_FILE)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return parent
+        key = (parent, path)
+        signature = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._scopes.get(key)
+            if cached is not None and cached[0] == signature:
+                self._scopes.move_to_end(key)
+                return cached[1]
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                scope = MappingScope.merged(parent, rel_dir, json.load(f))
+        except (OSError, ValueError) as e:
+            if on_error is None:
+                raise ValueError(f"Invalid mapping override {path}: {e}") from None
+            on_error(path, e)
+            return parent
+        with self._lock:
+            self._scopes[key] = (signature, scope)
+            self._scopes.move_to_end(key)
+            while len(self._scopes) > self.max_scopes:
+                self._scopes.popitem(last=False)
+        return scope
+
+    def destinations(self):
+        """
+        Return the destinations of every override rule loaded so far.
+        """
+        with self._lock:
+            scopes = [scope for _, scope in self._scopes.values()]
+        return {dest for scope in scopes for dest in scope.rules.values()}
+
+    def scope_at(self, root_dir, parts, on_error=None):
+        """
+        Return the scope inherited by the folder at the relative path components parts,
+        from the override files in root_dir and the folders between them.
+        """
+        scope = self.mapping
+        for depth in range(len(parts)):
+            rel_dir = os.path.join(*parts[:depth]) if depth else "."
+            scope = self.scope_for(scope, os.path.join(root_dir, *parts[:depth]), rel_dir, on_error=on_error)
+        return scope
@@ -0,0 +1,244 @@
+"""
+Mapping preview (simulator) for FileSorter.
+
+MappingPreview shows where the files in a folder would go without moving anything.
+It walks the folder on a background thread with os.scandir, classifies every file
+name with the same RuleMatcher that FileMapping.get_destination uses, and keeps
+running totals (per-destination file counts and bytes, unmatched files), so a
+caller can poll snapshot() while the scan is still in progress.
+
+- deep=False previews sort_current_directory (files directly in the folder);
+  deep=True previews deep_audit_and_sort, honouring the mapping's "$scan" options
+  and per-folder override files (see mapping_overrides). Invalid override files
+  are listed in the snapshot and their folders keep the inherited rules, as in
+  the audit.
+- files already in their destination folder are counted as in place, not as
+  moves, whatever "fast_path_in_place" says (the sorters do not move them either).
+- files no pattern matches are checked against the mapping's "$content" rules,
+  which read the first bytes of the file (cached, see content_rules).
+- template destinations ("Images/{mtime:%Y}") are expanded per file, from the
+  same directory entry stat that gives its size.
+- sample_limit stops after that many files, which keeps huge folders responsive;
+  the totals are then an estimate from the files scanned ("truncated" in the
+  snapshot). None scans everything. Sizes come from the directory entries, so no file is opened.
+"""
+
+import os
+import threading
+from collections import Counter
+
+from src.content_rules import ContentSniffer, content_cache_path, rules_from_directives
+from src.destination_templates import compile_templates
+from src.mapping_overrides import OVERRIDE_FILE, OverrideCache
+from src.rule_matcher import RuleMatcher
+from src.sorter import SCAN_AUDIT, SCAN_KEY, SCAN_SKIP, ScanFilter, load_compiled_mapping, split_directives
+
+DEFAULT_SAMPLE_LIMIT = 10000
+UNMATCHED_SAMPLES = 200  # unmatched file paths kept for display
+CHUNK_SIZE = 2000  # files classified between updates of the shared totals
+
+
+class MappingPreview:
+    """
+    Background dry run of a mapping over one folder.
+
+    The preview is the root scope for mapping_overrides.MappingScope: like a
+    FileMapping it has its rules as .mapping and its templates as .templates.
+    """
+    def __init__(self, rules, folder, directives=None, matcher=None, deep=False, sample_limit=DEFAULT_SAMPLE_LIMIT,
+                 sniffer=None):
+        directives = directives or {}
+        self.rules = self.mapping = rules
+        self.folder = folder
+        self.deep = deep
+        self.sample_limit = sample_limit
+        self.matcher = matcher or RuleMatcher(rules)
+        if sniffer is None:
+            content_rules = rules_from_directives(directives)
+            sniffer = ContentSniffer(content_rules) if content_rules else None
+        self.sniffer = sniffer
+        destinations = list(rules.values()) + (sniffer.destinations if sniffer else [])
+        self.templates = compile_templates(destinations)
+        self.scan_filter = ScanFilter.from_options(directives.get(SCAN_KEY, {}), destinations)
+        self.overrides = OverrideCache(self)
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._thread = None
+        self._counts = Counter()
+        self._bytes = Counter()
+        self._scanned = 0
+        self._in_place = 0
+        self._unmatched = 0
+        self._unmatched_bytes = 0
+        self._unmatched_samples = []
+        self._done = False
+        self._truncated = False
+        self._error = None
+        self._override_errors = []
+
+    @classmethod
+    def from_mapping_file(cls, mapping_path, folder, compiled=None, **options):
+        """
+        Preview a saved mapping, reusing its compiled sidecar (or compiled, an
+        already loaded (mapping contents, RuleMatcher) pair).
+        """
+        data, matcher = compiled or load_compiled_mapping(mapping_path)
+        rules, directives = split_directives(data)
+        content_rules = rules_from_directives(directives)
+        sniffer = ContentSniffer(content_rules, content_cache_path(mapping_path)) if content_rules else None
+        return cls(rules, folder, directives=directives, matcher=matcher, sniffer=sniffer, **options)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def snapshot(self):
+        """
+        Return the totals so far:
+            {"scanned", "in_place", "unmatched", "unmatched_bytes", "unmatched_samples",
+             "destinations": {dest: (files, bytes)}, "done", "truncated", "cancelled", "error",
+             "override_errors": [(override file path, error message)]}
+        """
+        with self._lock:
+            return {
+                "scanned": self._scanned,
+                "in_place": self._in_place,
+                "unmatched": self._unmatched,
+                "unmatched_bytes": self._unmatched_bytes,
+                "unmatched_samples": list(self._unmatched_samples),
+                "destinations": {dest: (count, self._bytes[dest]) for dest, count in self._counts.items()},
+                "done": self._done,
+                "truncated": self._truncated,
+                "cancelled": self._cancel.is_set(),
+                "error": self._error,
+                "override_errors": list(self._override_errors),
+            }
+
+    def _run(self):
+        try:
+            for rel_dir, entries, scope in self._listings():
+                self._classify(rel_dir, entries, scope)
+                if self._cancel.is_set() or self._truncated:
+                    break
+        except OSError as e:
+            self._error = e
+        finally:
+            if self.sniffer is not None:
+                self.sniffer.save()
+            with self._lock:
+                self._done = True
+
+    def _override_error(self, path, error):
+        with self._lock:
+            self._override_errors.append((path, str(error)))
+
+    def _listings(self):
+        """
+        Yield (normalized relative dir, file entries, scope) in chunks of at most
+        CHUNK_SIZE, as directories are read, so totals grow while a huge folder is
+        still listing. scope is the preview itself or a MappingScope.
+        """
+        pending = [(self.folder, [], self)]
+        while pending and not self._cancel.is_set():
+            path, parts, scope = pending.pop()
+            audit = not self.deep or self.scan_filter.check(parts) == SCAN_AUDIT
+            rel_dir = os.path.normpath(os.path.join(*parts)) if parts else "."
+            if self.deep:
+                # Needed before the listing, whose files are classified as they are read.
+                scope = self.overrides.scope_for(scope, path, rel_dir, on_error=self._override_error)
+            try:
+                with os.scandir(path) as it:
+                    files = []
+                    for entry in it:
+                        try:
+                            if entry.is_file():
+                                if audit:
+                                    files.append(entry)
+                            elif self.deep and entry.is_dir(follow_symlinks=False):
+                                child = parts + [entry.name]
+                                if self.scan_filter.check(child) != SCAN_SKIP:
+                                    pending.append((entry.path, child, scope))
+                        except OSError:
+                            continue
+                        if len(files) >= CHUNK_SIZE:
+                            yield rel_dir, files, scope
+                            files = []
+                            if self._cancel.is_set() or self._truncated:
+                                return
+                    if files:
+                        yield rel_dir, files, scope
+            except OSError:
+                if not parts:
+                    raise
+
+    def _classify(self, rel_dir, entries, scope):
+        # Aggregate a chunk locally, then merge under the lock once.
+        counts, sizes = Counter(), Counter()
+        seen = in_place = unmatched = unmatched_bytes = 0
+        samples = []
+        budget = None if self.sample_limit is None else self.sample_limit - self._scanned
+        for entry in entries:
+            if entry.name == OVERRIDE_FILE:
+                continue
+            if budget is not None and seen >= budget:
+                self._truncated = True
+                break
+            seen += 1
+            try:
+                st = entry.stat()
+            except OSError:
+                st = None
+            size = st.st_size if st is not None else 0
+            index = scope.matcher.match(entry.name)
+            dest = None
+            if index is not None:
+                dest = scope.rules[scope.matcher.patterns[index]]
+            elif self.sniffer is not None:
+                try:
+                    dest = self.sniffer.destination(entry.path, st)
+                except OSError:
+                    dest = None
+            template = scope.templates.get(dest)
+            if template is not None:
+                dest = template.expand(entry.name, st) if st is not None or not template.needs_stat else None
+            if dest is None:
+                unmatched += 1
+                unmatched_bytes += size
+                if len(samples) < UNMATCHED_SAMPLES:
+                    samples.append(entry.name if rel_dir == "." else os.path.join(rel_dir, entry.name))
+                continue
+            if os.path.normpath(dest) == rel_dir:
+                in_place += 1
+                continue
+            counts[dest] += 1
+            sizes[dest] += size
+        with self._lock:
+            self._counts.update(counts)
+            self._bytes.update(sizes)
+            self._in_place += in_place
+            self._unmatched += unmatched
+            self._unmatched_bytes += unmatched_bytes
+            self._scanned += seen
+            room = UNMATCHED_SAMPLES - len(self._unmatched_samples)
+            if room > 0:
+                self._unmatched_samples.extend(samples[:room])
+        if budget is not None and seen >= budget:
+            self._truncated = True
+
+
+def format_size(size):
+    """
+    Format a byte count for display (e.g. "1.5 MB").
+    """
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if size < 1024 or unit == "TB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
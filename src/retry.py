@@ -0,0 +1,212 @@
+"""
+Transient-error retries and failure reports for FileSorter runs.
+
+On a flaky network share a single busy file or timeout used to abort a whole
+run. Instead, each file operation is now classified when it fails:
+
+- transient errors (busy or locked files, timeouts, dropped connections; see
+  is_transient) are put on a delayed queue and retried with exponential backoff
+  (base_delay, doubling up to max_delay, with jitter), up to max_attempts in all.
+  The run carries on with other files meanwhile, and due retries run between
+  them; the rest are waited for at the end.
+- anything else, or a transient error that keeps failing, is recorded in the
+  run's RunReport, and the run continues.
+
+Listing a folder, classifying a file (stat, content sniff) and moving it are
+each such an operation. RetryQueue is the synchronous queue used by FileSorter,
+which keeps one for lookups (listings, classification) and one for moves.
+AsyncFileSorter retries moves from delayed tasks and lookups in place, where
+the run needs their result to go on, with the same classification, backoff
+and report.
+"""
+
+import errno
+import heapq
+import itertools
+import random
+import threading
+import time
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BASE_DELAY = 0.5  # seconds before the first retry
+DEFAULT_MAX_DELAY = 30.0
+MAX_REPORTED_FAILURES = 1000  # failures kept in detail; all are counted
+
+TRANSIENT_ERRNOS = {
+    code for code in (
+        errno.EBUSY, errno.EAGAIN, errno.EINTR, errno.ETIMEDOUT, errno.EIO,
+        errno.ECONNRESET, errno.ECONNABORTED, errno.ECONNREFUSED, errno.ENETRESET,
+        errno.ENETDOWN, errno.ENETUNREACH, errno.EHOSTUNREACH, getattr(errno, "ESTALE", None),
+    ) if code is not None
+}
+
+# Windows: sharing/lock violations and the usual SMB network errors.
+TRANSIENT_WINERRORS = {32, 33, 53, 59, 64, 121, 1231}
+
+
+def is_transient(exc):
+    """
+    Return True if a failed file operation is worth retrying later.
+    """
+    if isinstance(exc, (TimeoutError, InterruptedError, BlockingIOError, ConnectionError)):
+        return True
+    if getattr(exc, "winerror", None) in TRANSIENT_WINERRORS:
+        return True
+    return isinstance(exc, OSError) and exc.errno in TRANSIENT_ERRNOS
+
+
+def backoff_delay(attempt, base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY):
+    """
+    Return the delay before retrying after the given failed attempt (1-based).
+    """
+    delay = min(max_delay, base_delay * 2 ** (attempt - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class RunReport:
+    """
+    What went wrong in a run: permanent failures and retry counts. Thread-safe.
+
+    A report accumulates over a sorter's runs, so an operation that fails again
+    on the same path (a file neither a sort nor a later deep audit could move)
+    is one failure, with the latest error.
+    """
+    def __init__(self):
+        self.failures = []  # (operation, path, error message), at most MAX_REPORTED_FAILURES
+        self.failed = 0      # distinct (operation, path) failures
+        self.retried = 0     # retries scheduled
+        self.recovered = 0   # operations that succeeded on a retry
+        self._reported = {}  # (operation, path) -> index in failures, None if not kept in detail
+        self._lock = threading.Lock()
+
+    def add_failure(self, operation, path, error):
+        key = (operation, path)
+        with self._lock:
+            if key in self._reported:
+                index = self._reported[key]
+                if index is not None:
+                    self.failures[index] = (operation, path, str(error))
+                return
+            self.failed += 1
+            if len(self.failures) < MAX_REPORTED_FAILURES:
+                self._reported[key] = len(self.failures)
+                self.failures.append((operation, path, str(error)))
+            else:
+                self._reported[key] = None
+
+    def add_retry(self):
+        with self._lock:
+            self.retried += 1
+
+    def add_recovery(self):
+        with self._lock:
+            self.recovered += 1
+
+    def summary(self, limit=10):
+        """
+        Return a short human-readable summary, listing up to limit failures.
+        """
+        lines = []
+        if self.failed:
+            lines.append(f"{self.failed} operation(s) failed:")
+            lines.extend(f"- {operation} {path}: {error}" for operation, path, error in self.failures[:limit])
+            if self.failed > limit:
+                lines.append(f"... and {self.failed - limit} more.")
+        else:
+            lines.append("No failures.")
+        if self.retried:
+            lines.append(f"Transient errors caused {self.retried} retry attempt(s); "
+                         f"{self.recovered} operation(s) then succeeded.")
+        return "\n".join(lines)
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Rebuild a report from to_dict() output, e.g. a daemon job's result.
+        """
+        report = cls()
+        report.failed = data.get("failed", 0)
+        report.retried = data.get("retried", 0)
+        report.recovered = data.get("recovered", 0)
+        report.failures = [tuple(failure) for failure in data.get("failures", [])]
+        report._reported = {(operation, path): index for index, (operation, path, _) in enumerate(report.failures)}
+        return report
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "failed": self.failed,
+                "retried": self.retried,
+                "recovered": self.recovered,
+                "failures": [list(failure) for failure in self.failures],
+            }
+
+
+class RetryQueue:
+    """
+    Runs file operations, retrying transient failures later with exponential backoff.
+    """
+    def __init__(self, report, max_attempts=DEFAULT_MAX_ATTEMPTS, base_delay=DEFAULT_BASE_DELAY,
+                 max_delay=DEFAULT_MAX_DELAY):
+        self.report = report
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.completed = 0  # operations that succeeded, first time or on a retry
+        self._pending = []  # heap of (due time, sequence, attempt, operation, path, func, args)
+        self._sequence = itertools.count()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def call(self, operation, path, func, *args):
+        """
+        Run func(*args), first running any retries that are due. A failure is queued
+        for a retry or recorded in the report. Returns True if func succeeded now.
+        """
+        if self._pending:
+            self.run_due()
+        return self._attempt(1, operation, path, func, args)
+
+    def reattempt(self, operation, path, error, func, *args):
+        """
+        Handle a first attempt at func(*args) that failed with error where the
+        queue did not run it: queue a retry or record the failure.
+        """
+        self._failed(1, operation, path, error, func, args)
+
+    def run_due(self):
+        """
+        Run the queued retries whose delay has passed.
+        """
+        now = time.monotonic()
+        while self._pending and self._pending[0][0] <= now:
+            _, _, attempt, operation, path, func, args = heapq.heappop(self._pending)
+            self._attempt(attempt, operation, path, func, args)
+
+    def drain(self):
+        """
+        Wait for and run every remaining retry.
+        """
+        while self._pending:
+            time.sleep(max(0.0, self._pending[0][0] - time.monotonic()))
+            self.run_due()
+
+    def _attempt(self, attempt, operation, path, func, args):
+        try:
+            func(*args)
+        except OSError as e:
+            self._failed(attempt, operation, path, e, func, args)
+            return False
+        self.completed += 1
+        if attempt > 1:
+            self.report.add_recovery()
+        return True
+
+    def _failed(self, attempt, operation, path, error, func, args):
+        if is_transient(error) and attempt < self.max_attempts:
+            self.report.add_retry()
+            due = time.monotonic() + backoff_delay(attempt, self.base_delay, self.max_delay)
+            heapq.heappush(self._pending, (due, next(self._sequence), attempt + 1, operation, path, func, args))
+        else:
+            self.report.add_failure(operation, path, error)
@@ -0,0 +1,118 @@
+"""
+Compiled first-match matcher for mapping rules.
+
+FileMapping.get_destination returns the first rule (in file order) whose fnmatch
+pattern matches a file name. Testing every pattern in turn is slow for large
+generated mappings, so RuleMatcher splits the patterns into:
+
+- a literal table: patterns without wildcards, looked up by exact name
+- an extension index: "*<suffix>" patterns whose suffix starts with "." and has
+  no wildcards (e.g. "*.pdf", "*.tar.gz"), looked up per "." in the name
+- everything else, combined into one regular expression of fnmatch.translate()
+  alternatives in rule order, so the first alternative that matches is the
+  earliest such rule
+
+Each part yields its earliest matching rule and the smallest index wins, so the
+result is the same as testing the patterns one by one. Names and patterns are
+os.path.normcase()d like fnmatch.fnmatch does.
+
+The tables are plain data (tables() / from_tables()) so they can be cached in a
+sidecar file next to the mapping; the regular expression is compiled on first use.
+"""
+
+import fnmatch
+import os
+import re
+
+WILDCARDS = "*?["
+
+
+def _extension_suffix(pattern):
+    """
+    Return the literal suffix of a "*.<ext>" pattern, or None.
+    """
+    if pattern.startswith("*") and pattern[1:2] == "." and not any(c in pattern[1:] for c in WILDCARDS):
+        return pattern[1:]
+    return None
+
+
+class RuleMatcher:
+    """
+    Find the index of the first pattern matching a file name.
+    """
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self.literals = {}
+        self.extensions = {}
+        self.generic = []
+        for index, pattern in enumerate(self.patterns):
+            norm = os.path.normcase(pattern)
+            suffix = _extension_suffix(norm)
+            if suffix is not None:
+                self.extensions.setdefault(suffix, index)
+            elif not any(c in norm for c in WILDCARDS):
+                self.literals.setdefault(norm, index)
+            else:
+                self.generic.append(index)
+        self.regex_source = self._regex_source()
+        self._regex = None
+
+    def _regex_source(self):
+        return "|".join(
+            f"(?P<r{index}>{fnmatch.translate(os.path.normcase(self.patterns[index]))})"
+            for index in self.generic
+        )
+
+    def _compile(self):
+        try:
+            return re.compile(self.regex_source)
+        except re.error:
+            # A cached source from another Python version's fnmatch: rebuild it.
+            self.regex_source = self._regex_source()
+            return re.compile(self.regex_source)
+
+    @classmethod
+    def from_tables(cls, tables):
+        """
+        Rebuild a matcher from tables() without reclassifying the patterns.
+        """
+        matcher = cls.__new__(cls)
+        matcher.patterns = tables["patterns"]
+        matcher.literals = tables["literals"]
+        matcher.extensions = tables["extensions"]
+        matcher.generic = tables["generic"]
+        matcher.regex_source = tables["regex_source"]
+        matcher._regex = None
+        return matcher
+
+    def tables(self):
+        return {
+            "patterns": self.patterns,
+            "literals": self.literals,
+            "extensions": self.extensions,
+            "generic": self.generic,
+            "regex_source": self.regex_source,
+        }
+
+    def match(self, filename):
+        """
+        Return the index of the first pattern matching filename, or None.
+        """
+        name = os.path.normcase(filename)
+        best = self.literals.get(name)
+        if self.extensions:
+            dot = name.find(".")
+            while dot != -1:
+                index = self.extensions.get(name[dot:])
+                if index is not None and (best is None or index < best):
+                    best = index
+                dot = name.find(".", dot + 1)
+        if self.generic and (best is None or self.generic[0] < best):
+            if self._regex is None:
+                self._regex = self._compile()
+            found = self._regex.match(name)
+            if found:
+                index = int(found.lastgroup[1:])
+                if best is None or index < best:
+                    best = index
+        return best
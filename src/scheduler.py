@@ -0,0 +1,361 @@
+"""
+Sort profiles and a lightweight local scheduler for FileSorter.
+
+A profile is a named set of sort options stored in settings.json:
+
+    "profiles": {
+        "Inbox cleanup": {
+            "mapping": "example.json",
+            "folders": ["D:/Inbox"],
+            "deep_audit": true,
+            "interval_minutes": 60
+        }
+    }
+
+A profile with a "destination" sorts all of its folders into that one root
+(see FileSorter.sort_into); "deep_audit" then audits the destination.
+"prune_empty" makes the deep audit remove the folders it emptied.
+
+SortScheduler queues profiles that are due (or triggered by hand) in a persistent
+JobQueue (jobs.json) and runs them one at a time on a background thread, waiting
+gap_seconds between runs so scheduled cleanups do not pile up on the file server.
+A trigger for a profile that is already queued or running is coalesced into it.
+Run history, including durations, is kept in the same file.
+
+Several processes may share the queue (the GUI's scheduler, `cli scheduler`,
+`cli run-profile`): each operation re-reads and rewrites jobs.json under an
+exclusive lock on jobs.json.lock, so only one job runs at a time across all of
+them. The running job records its owner's process id; it is put back on the
+queue only once that process is gone.
+"""
+
+import ctypes
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from src import sorter
+from src import throttle
+from src import utils
+
+PROFILES_KEY = "profiles"
+SCHEDULER_GAP_KEY = "scheduler_gap_seconds"
+JOBS_FILE = os.path.join(os.path.dirname(__file__), "jobs.json")
+HISTORY_LIMIT = 200
+
+
+def get_profiles(settings):
+    """
+    Return the profiles stored in settings (name -> profile dict).
+    """
+    return settings.get(PROFILES_KEY, {})
+
+
+def run_profile(profile, engine=None, io_throttle=None, record_hits=False, plan_memory=sorter.DEFAULT_PLAN_MEMORY):
+    """
+    Sort every folder in a profile with its mapping and options. Files that cannot be
+    sorted do not stop the run; they raise RuntimeError with a summary afterwards.
+    """
+    mapping_path = utils.resolve_mapping_path(profile["mapping"])
+    sorter_obj = sorter.create_sorter(
+        mapping_path, engine=profile.get("engine", engine), throttle=io_throttle,
+        record_hits=record_hits, plan_memory=plan_memory
+    )
+    sort_folders(sorter_obj, profile)
+    if sorter_obj.report.failed:
+        raise RuntimeError(sorter_obj.report.summary(limit=5))
+
+
+def sort_folders(sorter_obj, profile):
+    """
+    Sort a profile's folders (or sort them into its destination) with a ready sorter.
+    """
+    destination = profile.get("destination")
+    if destination:
+        folders = [folder for folder in profile.get("folders", []) if os.path.isdir(folder)]
+        sorter_obj.sort_into(folders, destination)
+        if profile.get("deep_audit"):
+            sorter_obj.deep_audit_and_sort(destination, prune_empty=bool(profile.get("prune_empty")))
+        return
+    for folder in profile.get("folders", []):
+        if os.path.isdir(folder):
+            sorter_obj.sort_current_directory(folder)
+            if profile.get("deep_audit"):
+                sorter_obj.deep_audit_and_sort(folder, prune_empty=bool(profile.get("prune_empty")))
+
+
+@contextmanager
+def _file_lock(path):
+    """
+    Hold an exclusive lock on the file at path (created if missing) across processes.
+    """
+    with open(path, "a+b") as f:
+        if sys.platform == "win32":
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)  # gives up after about 10s
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _process_alive(pid):
+    """
+    Return True if a process with this id is running on this machine.
+    """
+    if pid == os.getpid():
+        return True
+    if sys.platform == "win32":
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        try:
+            code = ctypes.c_ulong()
+            if not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)):
+                return True
+            return code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # exists, owned by another user
+    return True
+
+
+class JobQueue:
+    """
+    Persistent, coalescing FIFO of profile runs with run history, shared by every
+    process using the same file (see the module docstring).
+    """
+    def __init__(self, path=JOBS_FILE):
+        self.path = path
+        self.lock_path = path + ".lock"
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self):
+        """
+        Yield the current state, and save it afterwards, under the thread and file locks.
+        """
+        with self._lock, _file_lock(self.lock_path):
+            state = self._load()
+            yield state
+            self._save(state)
+
+    def _read(self):
+        with self._lock, _file_lock(self.lock_path):
+            return self._load()
+
+    def _load(self):
+        state = {"queue": [], "running": None, "history": [], "last_finished": {}}
+        if os.path.exists(self.path):
+            try:
+                state.update(utils.MappingUtils.load_json_file(self.path))
+            except Exception:
+                pass
+        return state
+
+    def _save(self, state):
+        try:
+            utils.MappingUtils.save_json_file(self.path, state)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _requeue_orphan(state):
+        """
+        Put a running job whose owner process is gone back at the front of the queue.
+        """
+        running = state["running"]
+        if running and not _process_alive(running.get("owner_pid", -1)):
+            job = {key: value for key, value in running.items() if key not in ("owner_pid", "started_at")}
+            state["queue"].insert(0, job)
+            state["running"] = None
+
+    def enqueue(self, profile_name, trigger="manual"):
+        """
+        Queue a run of profile_name. Returns False if one is already queued or running.
+        """
+        with self._locked() as state:
+            self._requeue_orphan(state)
+            running = state["running"]
+            if running and running["profile"] == profile_name:
+                return False
+            if any(job["profile"] == profile_name for job in state["queue"]):
+                return False
+            state["queue"].append({
+                "id": uuid.uuid4().hex,
+                "profile": profile_name,
+                "trigger": trigger,
+                "enqueued_at": time.time(),
+            })
+            return True
+
+    def claim(self):
+        """
+        Pop the next job and mark it running (owned by this process), or return None
+        if the queue is empty or another process's job is running.
+        """
+        with self._locked() as state:
+            self._requeue_orphan(state)
+            if state["running"] or not state["queue"]:
+                return None
+            job = state["queue"].pop(0)
+            job["started_at"] = time.time()
+            job["owner_pid"] = os.getpid()
+            state["running"] = job
+            return dict(job)
+
+    def finish(self, job, status, error=None):
+        """
+        Record the outcome of a job claimed by this process and clear it.
+        """
+        with self._locked() as state:
+            finished_at = time.time()
+            entry = dict(job)
+            entry.update({
+                "finished_at": finished_at,
+                "duration": round(finished_at - job["started_at"], 3),
+                "status": status,
+                "error": error,
+            })
+            history = state["history"]
+            history.append(entry)
+            del history[:-HISTORY_LIMIT]
+            state["last_finished"][job["profile"]] = finished_at
+            running = state["running"]
+            if running and running["id"] == job["id"]:
+                state["running"] = None
+            return entry
+
+    def last_finished(self, profile_name):
+        return self._read()["last_finished"].get(profile_name)
+
+    def history(self):
+        return self._read()["history"]
+
+
+class SortScheduler:
+    """
+    Background thread that queues due profiles and runs queued jobs serially.
+
+    on_event, if given, is called from the scheduler thread as
+    on_event("started" | "finished", job_or_history_entry).
+    io_throttle, if given, is the IOThrottle every run uses, so live changes to it
+    (e.g. from the GUI) apply to scheduled runs; otherwise each run gets one from
+    the settings.
+    """
+    def __init__(self, queue=None, settings_loader=utils.load_settings, runner=run_profile,
+                 poll_seconds=30, gap_seconds=None, on_event=None, io_throttle=None):
+        self.queue = queue or JobQueue()
+        self.io_throttle = io_throttle
+        self.settings_loader = settings_loader
+        self.runner = runner
+        self.poll_seconds = poll_seconds
+        self.gap_seconds = gap_seconds
+        self.on_event = on_event
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="SortScheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def trigger(self, profile_name, trigger="manual"):
+        """
+        Queue a profile run now. Returns False if it was coalesced into a pending run.
+        """
+        queued = self.queue.enqueue(profile_name, trigger)
+        self._wake.set()
+        return queued
+
+    def enqueue_due(self, now=None):
+        """
+        Queue every profile whose interval has elapsed since its last finished run.
+        """
+        now = now or time.time()
+        for name, profile in get_profiles(self.settings_loader()).items():
+            interval = profile.get("interval_minutes")
+            if not interval:
+                continue
+            last = self.queue.last_finished(name)
+            if last is None or now - last >= interval * 60:
+                self.queue.enqueue(name, "schedule")
+
+    def run_next(self):
+        """
+        Run the next queued job, if any. Returns its history entry or None.
+        """
+        job = self.queue.claim()
+        if job is None:
+            return None
+        self._emit("started", job)
+        settings = self.settings_loader()
+        profile = get_profiles(settings).get(job["profile"])
+        if profile is None:
+            entry = self.queue.finish(job, "skipped", "Profile no longer exists.")
+        else:
+            try:
+                self.runner(
+                    profile,
+                    engine=settings.get(utils.ENGINE_KEY),
+                    io_throttle=self.io_throttle or throttle.IOThrottle.from_settings(settings),
+                    record_hits=settings.get(utils.RECORD_HITS_KEY, True),
+                    plan_memory=utils.plan_memory(settings),
+                )
+                entry = self.queue.finish(job, "ok")
+            except Exception as e:
+                entry = self.queue.finish(job, "failed", str(e))
+        self._emit("finished", entry)
+        return entry
+
+    def _gap(self):
+        if self.gap_seconds is not None:
+            return self.gap_seconds
+        return self.settings_loader().get(SCHEDULER_GAP_KEY, 30)
+
+    def _emit(self, event, job):
+        if self.on_event:
+            self.on_event(event, job)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            self.enqueue_due()
+            ran = self.run_next()
+            # After a run, always wait out the gap; otherwise sleep until polled or triggered.
+            if ran is not None:
+                self._stop.wait(self._gap())
+            else:
+                self._wake.wait(self.poll_seconds)
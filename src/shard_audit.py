@@ -0,0 +1,350 @@
+"""
+Sharded deep audit for FileSorter, spread over several worker processes or hosts.
+
+A coordinator splits a root folder into directory shards and publishes them, with
+the mapping's contents, to a work queue kept in one SQLite file (on the share for
+multi-host runs, or anywhere local for a single machine or a test). Workers claim
+shards under a time-limited lease, audit them with FileSorter.audit_shard and
+report how many files they moved:
+
+- folders above shard_depth are shards of their own files only; each folder at
+  shard_depth is one shard with its whole subtree. The mapping's "$scan" options
+  are honoured when splitting, so excluded folders are never published.
+- a worker renews its lease while it works. A shard whose lease runs out (the
+  worker crashed or lost the share) goes back to the queue; auditing is
+  idempotent, so a shard that is audited twice just finds nothing to move.
+- a shard that fails max_attempts times is marked failed with its last error.
+- files a shard could not move (see retry.RunReport) are counted on its row, with
+  a summary: the shard is marked partial, or failed if nothing could be moved.
+
+The root path must be the same on every worker (e.g. a UNC path). The mapping is
+stored in the queue, so workers do not need the mapping file.
+
+    python -m src.cli shard-audit publish MAPPING ROOT --queue Q [--depth 2]
+    python -m src.cli shard-audit work --queue Q [--lease 300] [--follow]
+    python -m src.cli shard-audit status --queue Q
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from src import sorter
+from src.retry import RunReport
+from src.rule_matcher import RuleMatcher
+
+DEFAULT_SHARD_DEPTH = 2
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 3
+FOLLOW_POLL_SECONDS = 10
+BUSY_TIMEOUT_SECONDS = 60
+MAX_SUMMARY_FAILURES = 20  # failed files listed in a shard's error summary
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+PARTIAL = "partial"  # finished, but some files could not be moved
+FAILED = "failed"
+STATES = (PENDING, LEASED, DONE, PARTIAL, FAILED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY,
+    root TEXT NOT NULL,
+    mapping_path TEXT NOT NULL,
+    mapping TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS shards (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL REFERENCES runs(id),
+    rel_dir TEXT NOT NULL,
+    recursive INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    owner TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    moved INTEGER,
+    failed_files INTEGER,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS shards_state ON shards(state, lease_until);
+"""
+
+# Columns added since the first schema, for queues created by older versions.
+_ADDED_COLUMNS = {"failed_files": "INTEGER"}
+
+
+def plan_shards(root_dir, scan_filter, shard_depth=DEFAULT_SHARD_DEPTH):
+    """
+    Split root_dir into shards: a list of (relative path components, recursive).
+    """
+    shards = []
+    pending = [[]]
+    while pending:
+        parts = pending.pop()
+        if len(parts) >= shard_depth:
+            shards.append((parts, True))
+            continue
+        shards.append((parts, False))
+        try:
+            with os.scandir(os.path.join(root_dir, *parts)) as it:
+                names = [entry.name for entry in it if entry.is_dir(follow_symlinks=False)]
+        except OSError:
+            continue
+        for name in sorted(names, reverse=True):
+            child = parts + [name]
+            if scan_filter.check(child) != sorter.SCAN_SKIP:
+                pending.append(child)
+    return shards
+
+
+class WorkQueue:
+    """
+    Shard queue in a SQLite file. Each call uses its own short transaction, so
+    any number of processes (on any host that can lock the file) can share it.
+    """
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as db:
+            db.executescript(_SCHEMA)
+            columns = {row["name"] for row in db.execute("PRAGMA table_info(shards)")}
+            for name, kind in _ADDED_COLUMNS.items():
+                if name not in columns:
+                    db.execute(f"ALTER TABLE shards ADD COLUMN {name} {kind}")
+
+    def _connect(self):
+        # isolation_level=None: transactions are started explicitly below.
+        db = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return _Connection(db)
+
+    def publish(self, root_dir, mapping_path, data, shards):
+        """
+        Add a run and its shards. Returns the run id.
+        """
+        run_id = uuid.uuid4().hex
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute(
+                "INSERT INTO runs (id, root, mapping_path, mapping, created_at) VALUES (?, ?, ?, ?, ?)",
+                (run_id, root_dir, mapping_path, json.dumps(data), time.time()),
+            )
+            db.executemany(
+                "INSERT INTO shards (run_id, rel_dir, recursive, state) VALUES (?, ?, ?, ?)",
+                [(run_id, "/".join(parts), int(recursive), PENDING) for parts, recursive in shards],
+            )
+            db.execute("COMMIT")
+        return run_id
+
+    def claim(self, owner, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """
+        Lease the next pending shard (or one whose lease expired) to owner.
+        Returns a shard dict, or None when nothing is claimable.
+        """
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            # Expired leases that used up their attempts are given up on.
+            db.execute(
+                "UPDATE shards SET state = ?, error = COALESCE(error, 'lease expired') "
+                "WHERE state = ? AND lease_until < ? AND attempts >= ?",
+                (FAILED, LEASED, now, max_attempts),
+            )
+            row = db.execute(
+                "SELECT shards.id, shards.rel_dir, shards.recursive, shards.attempts, shards.run_id "
+                "FROM shards WHERE state = ? OR (state = ? AND lease_until < ?) "
+                "ORDER BY shards.id LIMIT 1",
+                (PENDING, LEASED, now),
+            ).fetchone()
+            if row is None:
+                db.execute("COMMIT")
+                return None
+            db.execute(
+                "UPDATE shards SET state = ?, owner = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                (LEASED, owner, now + lease_seconds, row["id"]),
+            )
+            db.execute("COMMIT")
+        return {
+            "id": row["id"],
+            "run_id": row["run_id"],
+            "parts": [part for part in row["rel_dir"].split("/") if part],
+            "recursive": bool(row["recursive"]),
+            "attempt": row["attempts"] + 1,
+        }
+
+    def run(self, run_id):
+        """
+        Return a run's {"root", "mapping_path", "mapping"}.
+        """
+        with self._connect() as db:
+            row = db.execute("SELECT root, mapping_path, mapping FROM runs WHERE id = ?", (run_id,)).fetchone()
+        return {"root": row["root"], "mapping_path": row["mapping_path"], "mapping": json.loads(row["mapping"])}
+
+    def renew(self, shard_id, owner, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """
+        Extend a lease. Returns False if owner no longer holds it.
+        """
+        with self._connect() as db:
+            cursor = db.execute(
+                "UPDATE shards SET lease_until = ? WHERE id = ? AND owner = ? AND state = ?",
+                (time.time() + lease_seconds, shard_id, owner, LEASED),
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, shard_id, owner, moved, failed_files=0, summary=None):
+        """
+        Record a finished shard: done, or with failed_files files that could not be
+        moved (summary describes them) partial, or failed if none was moved.
+        Returns False if the lease had been lost meanwhile.
+        """
+        state = DONE if not failed_files else PARTIAL if moved else FAILED
+        with self._connect() as db:
+            cursor = db.execute(
+                "UPDATE shards SET state = ?, moved = ?, failed_files = ?, error = ? "
+                "WHERE id = ? AND owner = ? AND state = ?",
+                (state, moved, failed_files, summary, shard_id, owner, LEASED),
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, shard_id, owner, error, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """
+        Record a failed attempt: the shard is retried until max_attempts, then marked failed.
+        """
+        with self._connect() as db:
+            db.execute(
+                "UPDATE shards SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                "owner = NULL, lease_until = NULL, error = ? WHERE id = ? AND owner = ? AND state = ?",
+                (max_attempts, FAILED, PENDING, error, shard_id, owner, LEASED),
+            )
+
+    def status(self, run_id=None):
+        """
+        Return {"runs", "shards": {state: count}, "moved", "failed_files",
+        "errors": [(rel_dir, state, error)]} (errors of failed and partial shards).
+        """
+        where, args = ("WHERE run_id = ?", (run_id,)) if run_id else ("", ())
+        with self._connect() as db:
+            counts = {row["state"]: row["n"] for row in db.execute(
+                f"SELECT state, COUNT(*) AS n FROM shards {where} GROUP BY state", args)}
+            moved, failed_files = db.execute(
+                f"SELECT COALESCE(SUM(moved), 0), COALESCE(SUM(failed_files), 0) FROM shards {where}", args
+            ).fetchone()
+            errors = [(row["rel_dir"] or ".", row["state"], row["error"]) for row in db.execute(
+                f"SELECT rel_dir, state, error FROM shards {where} {'AND' if where else 'WHERE'} state IN (?, ?) "
+                "ORDER BY id", args + (PARTIAL, FAILED))]
+            runs = db.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+        return {"runs": runs, "shards": counts, "moved": moved, "failed_files": failed_files, "errors": errors}
+
+
+class _Connection:
+    """
+    Context manager that closes a sqlite3 connection (sqlite3's own only commits).
+    """
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and self.db.in_transaction:
+            self.db.execute("ROLLBACK")
+        self.db.close()
+
+
+def publish_audit(queue, mapping_path, root_dir, shard_depth=DEFAULT_SHARD_DEPTH):
+    """
+    Split root_dir into shards and publish them with the mapping. Returns (run id, shard count).
+    """
+    data, matcher = sorter.load_compiled_mapping(mapping_path)
+    # The same scan filter as a local audit, content-rule destinations included.
+    scan_filter = sorter.FileMapping(mapping_path, compiled=(data, matcher)).scan_filter
+    shards = plan_shards(root_dir, scan_filter, shard_depth)
+    return queue.publish(os.path.abspath(root_dir), os.path.abspath(mapping_path), data, shards), len(shards)
+
+
+class ShardWorker:
+    """
+    Claims and audits shards until the queue has none left (or stop() is called).
+    on_shard, if given, is called as on_shard(shard, moved_or_None, error_or_None);
+    shard["report"] is then the retry.RunReport of the files the shard could not move.
+    """
+    def __init__(self, queue, owner=None, lease_seconds=DEFAULT_LEASE_SECONDS,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS, throttle=None, on_shard=None):
+        self.queue = queue
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.throttle = throttle
+        self.on_shard = on_shard
+        self._sorters = {}  # run id -> (root, FileSorter)
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self, follow=False):
+        """
+        Work until no shard is claimable. With follow=True, keep polling while other
+        workers still hold leases, to take over any that expire. Returns the number
+        of shards completed.
+        """
+        completed = 0
+        while not self._stop.is_set():
+            shard = self.queue.claim(self.owner, self.lease_seconds, self.max_attempts)
+            if shard is None:
+                if follow and self.queue.status()["shards"].get(LEASED):
+                    self._stop.wait(FOLLOW_POLL_SECONDS)
+                    continue
+                return completed
+            if self._process(shard):
+                completed += 1
+        return completed
+
+    def _sorter(self, run_id):
+        """
+        Return (root, FileSorter) for a run, built once per worker.
+        """
+        entry = self._sorters.get(run_id)
+        if entry is None:
+            run = self.queue.run(run_id)
+            rules, _ = sorter.split_directives(run["mapping"])
+            mapping = sorter.FileMapping(run["mapping_path"], compiled=(run["mapping"], RuleMatcher(rules)))
+            sorter_obj = sorter.FileSorter(run["mapping_path"], throttle=self.throttle, mapping=mapping)
+            entry = self._sorters[run_id] = (run["root"], sorter_obj)
+        return entry
+
+    def _process(self, shard):
+        heartbeat_stop = threading.Event()
+
+        def heartbeat():
+            while not heartbeat_stop.wait(self.lease_seconds / 3):
+                if not self.queue.renew(shard["id"], self.owner, self.lease_seconds):
+                    return
+
+        beat = threading.Thread(target=heartbeat, name="ShardLease", daemon=True)
+        beat.start()
+        moved, error = None, None
+        report = shard["report"] = RunReport()
+        try:
+            root_dir, sorter_obj = self._sorter(shard["run_id"])
+            # The sorter is reused for the run's shards; each shard reports on its own.
+            sorter_obj.report = report
+            moved = sorter_obj.audit_shard(root_dir, shard["parts"], shard["recursive"])
+        except Exception as e:
+            error = e
+        finally:
+            heartbeat_stop.set()
+            beat.join()
+        if error is not None:
+            self.queue.fail(shard["id"], self.owner, str(error), self.max_attempts)
+        summary = report.summary(limit=MAX_SUMMARY_FAILURES) if report.failed else None
+        completed = error is None and self.queue.complete(shard["id"], self.owner, moved, report.failed, summary)
+        if self.on_shard:
+            self.on_shard(shard, moved, error)
+        return completed
@@ -1,69 +1,940 @@
+import errno
 import os
 import shutil
+import stat
 import fnmatch
+import hashlib
+import heapq
 import json
+import pickle
+import sys
+import tempfile
+import threading
+from collections import Counter
+
+from src.content_rules import ContentSniffer, content_cache_path, rules_from_directives
+from src.destination_templates import compile_templates, destination_glob
+from src.dir_handles import DEFAULT_CAPACITY, SUPPORTED as DIR_FD_SUPPORTED, DirHandleCache
+from src.empty_dirs import EmptyDirPruner
+from src.mapping_overrides import OVERRIDE_FILE, OverrideCache
+from src.retry import DEFAULT_MAX_ATTEMPTS, RetryQueue, RunReport
+from src.rule_matcher import RuleMatcher
+
+ENGINES = ("standard", "async")
+
+# Mapping keys starting with this prefix are directives (options), not patterns.
+DIRECTIVE_PREFIX = "$"
+SCAN_KEY = "$scan"
+
+# Per-rule hit counts from real runs are kept next to the mapping as <name>.hits.
+HITS_SUFFIX = ".hits"
+_hits_lock = threading.Lock()  # serializes the read-merge-write of .hits files
+
+# Precompiled matcher tables are cached next to the mapping as <name>.compiled,
+# tagged with the hash of the JSON they were built from.
+COMPILED_SUFFIX = ".compiled"
+COMPILED_FORMAT = 1
+
+# Each mapping's folder structure is kept next to it in <name>_template.
+TEMPLATE_SUFFIX = "_template"
+
+# Move plans spill to temporary files beyond this many (estimated) bytes of moves.
+DEFAULT_PLAN_MEMORY = 64 * 1024 * 1024
+PLAN_RECORD_OVERHEAD = 160  # approximate bytes per planned move besides its strings
+PLAN_READ_SIZE = 1024 * 1024
+
+# Outcomes of ScanFilter.check for a directory.
+SCAN_SKIP = "skip"          # pruned: never listed
+SCAN_TRAVERSE = "traverse"  # listed only to reach included subtrees below it
+SCAN_AUDIT = "audit"        # listed and its files classified
+
+
+def create_sorter(mapping_path, engine=None, **options):
+    """
+    Build a sorter for the named engine.
+
+    "standard" (the default) returns a FileSorter; "async" returns an
+    AsyncFileSorter, which overlaps metadata operations for high-latency
+    network shares. Both expose sort_current_directory / deep_audit_and_sort.
+    """
+    if engine == "async":
+        from src.async_sorter import AsyncFileSorter
+        return AsyncFileSorter(mapping_path, **options)
+    if engine not in (None, "standard"):
+        raise ValueError(f"Unknown sorting engine: {engine}")
+    return FileSorter(mapping_path, **options)
+
+
+def _rename(src, dst, **dir_fds):
+    """
+    os.rename, replacing an existing target on Windows as it does elsewhere.
+    """
+    try:
+        os.rename(src, dst, **dir_fds)
+    except FileExistsError:
+        if os.name != "nt":
+            raise
+        os.replace(src, dst, **dir_fds)
+
+
+def scan_dir(path):
+    """
+    List a directory, returning (names of subdirectories to descend into, os.DirEntry
+    of each other entry). Like os.walk, symlinked directories are not followed. The
+    entries carry their stat result for templates and content rules (free on Windows,
+    one call per file elsewhere, and only when it is needed).
+    """
+    subdirs, files = [], []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                if not entry.is_symlink():
+                    subdirs.append(entry.name)
+            else:
+                files.append(entry)
+    return subdirs, files
+
+
+def move_file(src_path, target_path, throttle=None):
+    """
+    Move a file, charging the throttle one operation for the rename and the
+    file size in bytes if the move has to fall back to copying.
+    Only a cross-device rename falls back to copying; any other error (a busy or
+    locked file, no permission) is raised, so the caller can retry or report it.
+    """
+    if throttle is not None:
+        throttle.op()
+    try:
+        _rename(src_path, target_path)
+        return
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    if throttle is not None:
+        throttle.op(os.path.getsize(src_path))
+    shutil.move(src_path, target_path)
+
+
+def move_file_at(handles, src_dir, name, dest_dir, target_name=None, throttle=None):
+    """
+    Move src_dir/name to dest_dir/target_name. With a DirHandleCache (where the
+    platform supports it) the rename is relative to cached directory handles, so
+    only the two file names are looked up; otherwise this is move_file on the
+    full paths. As there, only a move across devices is copied; other errors are raised.
+    """
+    target_name = target_name or name
+    if handles is not None and DIR_FD_SUPPORTED:
+        if throttle is not None:
+            throttle.op()
+        try:
+            with handles.open(src_dir) as src_fd, handles.open(dest_dir) as dest_fd:
+                os.rename(name, target_name, src_dir_fd=src_fd, dst_dir_fd=dest_fd)
+            return
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+        src_path = os.path.join(src_dir, name)
+        if throttle is not None:
+            throttle.op(os.path.getsize(src_path))
+        shutil.move(src_path, os.path.join(dest_dir, target_name))
+        return
+    move_file(os.path.join(src_dir, name), os.path.join(dest_dir, target_name), throttle)
+
+
+def hits_path(mapping_path):
+    """
+    Return the path of the hit statistics file for a mapping.
+    """
+    return os.path.splitext(mapping_path)[0] + HITS_SUFFIX
+
+
+def load_hit_counts(mapping_path):
+    """
+    Load recorded per-pattern hit counts for a mapping ({} if none).
+    """
+    try:
+        with open(hits_path(mapping_path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def compiled_path(mapping_path):
+    """
+    Return the path of the precompiled sidecar for a mapping.
+    """
+    return os.path.splitext(mapping_path)[0] + COMPILED_SUFFIX
+
+
+def template_dir(mapping_path):
+    """
+    Return the path of a mapping's template folder tree.
+    """
+    return os.path.splitext(mapping_path)[0] + TEMPLATE_SUFFIX
+
+
+def write_atomic(path, data):
+    """
+    Write bytes to path via a temporary file and rename, so readers never see
+    a partly written file.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except OSError:
+            mode = 0o644  # mkstemp creates the file owner-only
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class _DataUnpickler(pickle.Unpickler):
+    """
+    Unpickler for sidecars: plain data only, never imports or calls anything.
+    """
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError(f"Unexpected object in compiled mapping: {module}.{name}")
+
+
+def _source_key(raw):
+    # Tables hold os.path.normcase()d patterns, so they are only valid on the same OS
+    # family, and fnmatch.translate() output, which changes between Python versions.
+    version = "%d.%d" % sys.version_info[:2]
+    return f"{os.name}:{version}:{hashlib.sha256(raw).hexdigest()}"
+
+
+def write_compiled_mapping(mapping_path, data=None):
+    """
+    Compile a mapping file and atomically write its sidecar.
+    Returns (mapping contents, RuleMatcher).
+    """
+    with open(mapping_path, 'rb') as f:
+        raw = f.read()
+    return _write_compiled(mapping_path, raw, json.loads(raw) if data is None else data)
+
+
+def _write_compiled(mapping_path, raw, data):
+    matcher = RuleMatcher(split_directives(data)[0])
+    payload = {
+        "format": COMPILED_FORMAT,
+        "source": _source_key(raw),
+        "mapping": data,
+        "tables": matcher.tables(),
+    }
+    write_atomic(compiled_path(mapping_path), pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL))
+    return data, matcher
+
+
+def load_compiled_mapping(mapping_path):
+    """
+    Load a mapping file and its RuleMatcher. The sidecar is used when it was built
+    from the current JSON; otherwise the mapping is compiled and the sidecar
+    refreshed (best effort). Returns (mapping contents, RuleMatcher).
+    """
+    with open(mapping_path, 'rb') as f:
+        raw = f.read()
+    source = _source_key(raw)
+    try:
+        with open(compiled_path(mapping_path), 'rb') as f:
+            payload = _DataUnpickler(f).load()
+        if payload["format"] == COMPILED_FORMAT and payload["source"] == source:
+            return payload["mapping"], RuleMatcher.from_tables(payload["tables"])
+    except (OSError, EOFError, ValueError, KeyError, IndexError, TypeError, AttributeError,
+            pickle.UnpicklingError):
+        pass  # unreadable or foreign sidecar: rebuild it
+    data = json.loads(raw)
+    try:
+        return _write_compiled(mapping_path, raw, data)
+    except OSError:
+        return data, RuleMatcher(split_directives(data)[0])
+
+
+def split_directives(data):
+    """
+    Split mapping file contents into (rules, directives).
+    """
+    rules, directives = {}, {}
+    for key, value in data.items():
+        if key.startswith(DIRECTIVE_PREFIX):
+            directives[key] = value
+        else:
+            rules[key] = value
+    return rules, directives
+
+
+def _split_rel_path(path):
+    """
+    Split a relative path (either separator) into its components.
+    """
+    return [part for part in path.replace("\\", "/").split("/") if part and part != "."]
+
+
+class ScanFilter:
+    """
+    Decides which directories a deep audit lists, from the mapping's "$scan" directive:
+
+        "$scan": {
+            "include": ["Archive/*"],          # audit only these subtrees (relative globs)
+            "include_destinations": true,      # ...plus every mapping destination
+            "exclude": [".git", "node_modules"],  # never list these (name or relative path)
+            "fast_path_in_place": true         # skip files already in their destination
+        }
+
+    Files directly in the root are always audited.
+    """
+    def __init__(self, include=None, exclude=None, fast_path_in_place=True):
+        self.include = [_split_rel_path(p) for p in include or []]
+        self.include = [p for p in self.include if p]
+        self.exclude = [p.replace("\\", "/").strip("/") for p in exclude or []]
+        self.fast_path_in_place = fast_path_in_place
+
+    @classmethod
+    def from_options(cls, options, destinations=()):
+        include = list(options.get("include", []))
+        if options.get("include_destinations"):
+            for dest in destinations:
+                if _split_rel_path(dest):
+                    include.append(destination_glob(dest))
+        return cls(
+            include=include,
+            exclude=options.get("exclude", []),
+            fast_path_in_place=options.get("fast_path_in_place", True),
+        )
+
+    def check(self, parts):
+        """
+        Classify a directory, given its path components relative to the root,
+        as SCAN_SKIP, SCAN_TRAVERSE or SCAN_AUDIT.
+        """
+        if not parts:
+            return SCAN_AUDIT
+        rel_path = "/".join(parts)
+        for pattern in self.exclude:
+            if fnmatch.fnmatch(parts[-1], pattern) or fnmatch.fnmatch(rel_path, pattern):
+                return SCAN_SKIP
+        if not self.include:
+            return SCAN_AUDIT
+        traverse = False
+        for pattern in self.include:
+            depth = min(len(parts), len(pattern))
+            if all(fnmatch.fnmatch(parts[i], pattern[i]) for i in range(depth)):
+                if len(parts) >= len(pattern):
+                    return SCAN_AUDIT
+                traverse = True
+        return SCAN_TRAVERSE if traverse else SCAN_SKIP
+
+
+def _unique_name(filename, taken):
+    """
+    Return filename, or "name (n).ext" with the lowest n not in taken (normcased names).
+    """
+    if os.path.normcase(filename) not in taken:
+        return filename
+    stem, ext = os.path.splitext(filename)
+    n = 1
+    while os.path.normcase(f"{stem} ({n}){ext}") in taken:
+        n += 1
+    return f"{stem} ({n}){ext}"
+
+
+class MovePlan:
+    """
+    Moves from one or more source folders into a shared destination root,
+    grouped by destination directory.
+
+    Files are added while the sources are listed; directories() gives each
+    destination once so it can be created up front, and batches() yields the
+    moves one destination directory at a time, resolving each with a single
+    listing of it: a name already taken there, or by another source earlier in
+    the plan, gets a " (n)" suffix instead of replacing the existing file.
+
+    The plan holds at most about memory_budget bytes of moves. Beyond that the
+    moves gathered so far are written, sorted by destination, to a temporary run
+    file (in spill_dir, default the system temp folder) in a compact encoding, and
+    batches() merges the runs back in destination order. Memory then stays
+    bounded by the budget plus the largest single destination's batch.
+    """
+    def __init__(self, dest_root, memory_budget=DEFAULT_PLAN_MEMORY, spill_dir=None):
+        self.dest_root = dest_root
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self.groups = {}  # destination directory -> [(src_path, filename)], not yet spilled
+        self._directories = set()
+        self._count = 0
+        self._size = 0  # estimated bytes held by groups
+        self._runs = []  # spilled run files, oldest first
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, src_path, dest_folder, filename):
+        dest_dir = os.path.normpath(os.path.join(self.dest_root, dest_folder))
+        group = self.groups.get(dest_dir)
+        if group is None:
+            group = self.groups[dest_dir] = []
+            self._directories.add(dest_dir)
+        group.append((src_path, filename))
+        self._count += 1
+        self._size += PLAN_RECORD_OVERHEAD + len(src_path) + len(filename)
+        if self.memory_budget is not None and self._size > self.memory_budget:
+            self._spill()
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def spilled_runs(self):
+        return len(self._runs)
+
+    def directories(self):
+        return sorted(self._directories)
+
+    def _spill(self):
+        run = tempfile.TemporaryFile(prefix="filesorter-plan-", dir=self.spill_dir)
+        try:
+            for dest_dir in sorted(self.groups):
+                run.write(_encode_group(dest_dir, self.groups[dest_dir]))
+        except BaseException:
+            run.close()
+            raise
+        self._runs.append(run)
+        self.groups = {}
+        self._size = 0
+
+    def grouped(self):
+        """
+        Yield (destination directory, [(src_path, filename)]) in directories() order,
+        each directory once, with its moves in the order they were added.
+        """
+        # heapq.merge keeps equal keys in input order: older runs first, memory last.
+        sources = [_read_run(run) for run in self._runs]
+        sources.append((dest_dir, self.groups[dest_dir]) for dest_dir in sorted(self.groups))
+        current, moves = None, []
+        for dest_dir, group in heapq.merge(*sources, key=lambda item: item[0]):
+            if dest_dir != current:
+                if current is not None:
+                    yield current, moves
+                current, moves = dest_dir, []
+            moves.extend(group)
+        if current is not None:
+            yield current, moves
+
+    def resolve(self, dest_dir, moves, handles=None):
+        """
+        Return [(src_path, target_path)] for one destination directory (which must
+        exist), given its moves from grouped().
+        """
+        listing = handles.listdir(dest_dir) if handles is not None else os.listdir(dest_dir)
+        taken = {os.path.normcase(name) for name in listing}
+        here = os.path.normcase(os.path.abspath(dest_dir))
+        resolved = []
+        for src_path, filename in moves:
+            if os.path.normcase(os.path.dirname(os.path.abspath(src_path))) == here:
+                continue  # already in place
+            name = _unique_name(filename, taken)
+            taken.add(os.path.normcase(name))
+            resolved.append((src_path, os.path.join(dest_dir, name)))
+        return resolved
+
+    def batches(self, handles=None):
+        """
+        Yield (destination directory, [(src_path, target_path)]) in directories() order.
+        """
+        for dest_dir, moves in self.grouped():
+            yield dest_dir, self.resolve(dest_dir, moves, handles)
+
+    def close(self):
+        """
+        Delete the spilled run files.
+        """
+        for run in self._runs:
+            run.close()
+        self._runs = []
+
+
+def _encode_group(dest_dir, moves):
+    """
+    Encode one destination's moves for a run file: NUL-terminated fields, the
+    destination and move count once, then source path and file name per move
+    (an empty name when it equals the source's base name, as it nearly always does).
+    """
+    fields = [os.fsencode(dest_dir), str(len(moves)).encode("ascii")]
+    for src_path, filename in moves:
+        fields.append(os.fsencode(src_path))
+        fields.append(b"" if filename == os.path.basename(src_path) else os.fsencode(filename))
+    fields.append(b"")
+    return b"\0".join(fields)
+
+
+def _read_fields(f):
+    pending = b""
+    while True:
+        chunk = f.read(PLAN_READ_SIZE)
+        if not chunk:
+            return
+        fields = (pending + chunk).split(b"\0")
+        pending = fields.pop()
+        yield from fields
+
+
+def _read_run(f):
+    """
+    Yield (destination directory, [(src_path, filename)]) from a run file.
+    """
+    f.seek(0)
+    fields = _read_fields(f)
+    for dest_dir in fields:
+        dest_dir = os.fsdecode(dest_dir)
+        moves = []
+        for _ in range(int(next(fields))):
+            src_path = os.fsdecode(next(fields))
+            filename = next(fields)
+            moves.append((src_path, os.fsdecode(filename) if filename else os.path.basename(src_path)))
+        yield dest_dir, moves
+
 
 class FileMapping:
     """
     Handles loading and validating file mapping from JSON.
+    Matching uses a RuleMatcher, loaded from the mapping's precompiled sidecar when current.
+    compiled, if given, is an already loaded (mapping contents, RuleMatcher) pair to reuse.
+    Files no pattern matches can be placed by "$content" rules (see content_rules).
+    Destinations may be templates such as "Images/{mtime:%Y}" (see destination_templates).
     """
-    def __init__(self, mapping_path):
-        self.mapping = self.load_mapping(mapping_path)
+    def __init__(self, mapping_path, record_hits=False, compiled=None):
+        self.mapping_path = mapping_path
+        data, self.matcher = compiled or load_compiled_mapping(mapping_path)
+        self.mapping, self.directives = split_directives(data)
+        self.hits = Counter() if record_hits else None
+        self.sniffer = None
+        content_rules = rules_from_directives(self.directives)
+        if content_rules:
+            self.sniffer = ContentSniffer(content_rules, content_cache_path(mapping_path))
+        destinations = list(self.mapping.values()) + (self.sniffer.destinations if self.sniffer else [])
+        self.templates = compile_templates(destinations)
+        self.scan_filter = ScanFilter.from_options(self.directives.get(SCAN_KEY, {}), destinations)
+        self._normalized_destinations = {}
 
     @staticmethod
     def load_mapping(mapping_path):
         """
         Load mapping from a JSON file.
         """
-        with open(mapping_path, 'r') as f:
+        with open(mapping_path, 'r', encoding='utf-8') as f:
             return json.load(f)
 
-    def get_destination(self, filename):
+    def match(self, filename, count=True):
+        """
+        Return the destination of the first pattern matching filename, unexpanded, or None.
+        With count=False the match is not recorded in the rule hit statistics.
+        """
+        if filename == OVERRIDE_FILE:
+            return None
+        index = self.matcher.match(filename)
+        if index is None:
+            return None
+        pattern = self.matcher.patterns[index]
+        if count and self.hits is not None:
+            self.hits[pattern] += 1
+        return self.mapping[pattern]
+
+    def get_destination(self, filename, st=None):
         """
         Return the destination folder for a given filename based on mapping.
+        st, the file's stat result, is required if the destination uses {mtime}.
         """
-        for pattern, folder in self.mapping.items():
-            if fnmatch.fnmatch(filename, pattern):
-                return folder
-        return None
+        dest = self.match(filename)
+        if dest is None or dest not in self.templates:
+            return dest
+        return self.templates[dest].expand(filename, st)
+
+    def needs_stat(self, dest, templates=None):
+        """
+        Return True if resolve() needs the file's metadata for a match() result.
+        """
+        if dest is None:
+            return self.sniffer is not None
+        template = (self.templates if templates is None else templates).get(dest)
+        return template is not None and template.needs_stat
+
+    def content_destination(self, path, st=None):
+        """
+        Return the destination from the "$content" rules for a file, or None.
+        Meant for files get_destination() did not place; st is an optional stat result.
+        """
+        if self.sniffer is None:
+            return None
+        return self.sniffer.destination(path, st)
+
+    def resolve(self, filename, path, dest, entry=None, templates=None):
+        """
+        Finish a match() result: fall back to the content rules if it is None, and
+        expand a template. The file is stat'ed at most once, and only if needed;
+        entry is its os.DirEntry from the listing, if the caller has one.
+        templates defaults to the mapping's (see mapping_overrides.MappingScope).
+        Override files (mapping_overrides.OVERRIDE_FILE) are never moved.
+        """
+        if filename == OVERRIDE_FILE:
+            return None
+        st = None
+        if dest is None:
+            if self.sniffer is None:
+                return None
+            st = entry.stat() if entry is not None else os.stat(path)
+            dest = self.sniffer.destination(path, st)
+            if dest is None:
+                return None
+        template = (self.templates if templates is None else templates).get(dest)
+        if template is None:
+            return dest
+        if st is None and template.needs_stat:
+            st = entry.stat() if entry is not None else os.stat(path)
+        return template.expand(filename, st)
+
+    def destination_for(self, filename, path, entry=None):
+        """
+        Return the destination for a file: by name, else by content, with templates expanded.
+        """
+        return self.resolve(filename, path, self.match(filename), entry)
+
+    def save_run_state(self):
+        """
+        Persist what a run learned: rule hit counts and the content-sniffing cache.
+        """
+        self.save_hit_counts()
+        if self.sniffer is not None:
+            self.sniffer.save()
+
+    def save_hit_counts(self):
+        """
+        Merge hits recorded since the last save into the mapping's .hits file.
+        """
+        if not self.hits:
+            return
+        # Concurrent runs (daemon jobs, the scheduler) merge one at a time, and the
+        # file is replaced atomically, so a reader never sees it half written.
+        with _hits_lock:
+            saved = Counter(self.hits)
+            totals = Counter(load_hit_counts(self.mapping_path))
+            totals.update(saved)
+            try:
+                write_atomic(hits_path(self.mapping_path), json.dumps(dict(totals)).encode("utf-8"))
+            except OSError:
+                return
+            # Keep hits recorded while saving for the next save.
+            self.hits.subtract(saved)
+            for pattern in [pattern for pattern, count in self.hits.items() if count <= 0]:
+                del self.hits[pattern]
+
+    def normalized_destination(self, folder):
+        """
+        Return the normalized relative path of a destination folder (cached).
+        """
+        norm = self._normalized_destinations.get(folder)
+        if norm is None:
+            norm = self._normalized_destinations[folder] = os.path.normpath(folder)
+        return norm
+
+class _SortRun:
+    """
+    State shared by one FileSorter run: its directory handles, the destination
+    folders already created, and retry queues for lookups (listings and
+    classification) and for moves, so that moves() counts only files moved.
+    """
+    def __init__(self, sorter, handles, pruner=None):
+        self.handles = handles
+        self.created = set()
+        self.lookups = sorter._retry_queue()
+        self.moves = sorter._retry_queue()
+        self.pruner = pruner
+
+    def drain(self):
+        """
+        Finish every pending retry and return the number of files moved.
+        """
+        # A lookup that succeeds on a retry queues more moves, so lookups go first.
+        self.lookups.drain()
+        self.moves.drain()
+        return self.moves.completed
+
 
 class FileSorter:
     """
     Main class for sorting files based on mapping.
+
+    A file operation that fails does not stop a run: transient errors are retried
+    with backoff and other failures are recorded in self.report, a RunReport that
+    accumulates over this sorter's runs (see retry).
     """
-    def __init__(self, mapping_path):
-        self.mapping = FileMapping(mapping_path)
+    def __init__(self, mapping_path, throttle=None, record_hits=False, handle_cache_size=DEFAULT_CAPACITY,
+                 mapping=None, plan_memory=DEFAULT_PLAN_MEMORY, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                 overrides=None):
+        self.mapping = mapping or FileMapping(mapping_path, record_hits=record_hits)
+        self.overrides = overrides or OverrideCache(self.mapping)
+        self.throttle = throttle
+        self.handle_cache_size = handle_cache_size
+        self.plan_memory = plan_memory
+        self.max_attempts = max_attempts
+        self.report = RunReport()
+
+    def _op(self):
+        if self.throttle is not None:
+            self.throttle.op()
 
-    def _sort_files(self, src_dir, dest_dir):
+    def _retry_queue(self):
+        return RetryQueue(self.report, self.max_attempts)
+
+    def _move(self, handles, created, src_dir, name, dest_dir, target_name=None, pruner=None):
+        """
+        Move one file, creating dest_dir first unless it is in created. The unit
+        that is retried after a transient error.
+        """
+        if dest_dir not in created:
+            self._op()
+            os.makedirs(dest_dir, exist_ok=True)
+            created.add(dest_dir)
+        move_file_at(handles, src_dir, name, dest_dir, target_name, self.throttle)
+        if pruner is not None:
+            pruner.moved(src_dir, dest_dir)
+
+    def _sort_files(self, src_dir, dest_dir, handles):
         """
         Sort files from src_dir into dest_dir based on mapping.
         """
-        for filename in os.listdir(src_dir):
-            src_path = os.path.join(src_dir, filename)
-            if os.path.isfile(src_path):
-                dest_folder = self.mapping.get_destination(filename)
-                if dest_folder:
-                    dest_path = os.path.join(dest_dir, dest_folder)
-                    os.makedirs(dest_path, exist_ok=True)
-                    shutil.move(src_path, os.path.join(dest_path, filename))
+        run = _SortRun(self, handles)
+        run.lookups.call("list", src_dir, self._sort_listing, run, src_dir, dest_dir)
+        run.drain()
+
+    def _sort_listing(self, run, src_dir, dest_dir):
+        """
+        List src_dir and move its files into dest_dir. Retried as a whole if the
+        listing fails.
+        """
+        self._op()
+        for entry in run.handles.list_files(src_dir):
+            run.lookups.call("classify", entry.path, self._sort_file, run, src_dir, entry,
+                             dest_dir, self.mapping.match(entry.name))
+
+    def _sort_file(self, run, src_dir, entry, dest_dir, dest):
+        """
+        Finish classifying one file (dest is its match() result) and move it.
+        Retried if the file cannot be stat'ed or read.
+        """
+        dest_folder = self.mapping.resolve(entry.name, entry.path, dest, entry)
+        if dest_folder:
+            run.moves.call("move", entry.path, self._move, run.handles, run.created,
+                           src_dir, entry.name, os.path.join(dest_dir, dest_folder))
 
     def sort_current_directory(self, directory):
         """
         Sort files in the given directory.
         """
-        self._sort_files(directory, directory)
+        try:
+            with DirHandleCache(self.handle_cache_size) as handles:
+                self._sort_files(directory, directory, handles)
+        finally:
+            self.mapping.save_run_state()
+
+    def sort_into(self, source_dirs, dest_root):
+        """
+        Sort the files directly in several folders into one destination root.
+        Every destination directory is created once, before any file moves, and
+        moves run grouped by destination directory. The plan is kept within
+        plan_memory bytes (see MovePlan). Returns the number of files moved.
+        """
+        try:
+            with DirHandleCache(self.handle_cache_size) as handles, MovePlan(dest_root, self.plan_memory) as plan:
+                run = _SortRun(self, handles)
+                for src_dir in source_dirs:
+                    run.lookups.call("list", src_dir, self._plan_listing, run, plan, src_dir)
+                # Every file is in the plan before any destination is listed.
+                run.lookups.drain()
+                for dest_dir in plan.directories():
+                    self._op()
+                    try:
+                        os.makedirs(dest_dir, exist_ok=True)
+                        run.created.add(dest_dir)
+                    except OSError:
+                        pass  # retried, and reported if need be, with its first move
+                for dest_dir, moves in plan.grouped():
+                    run.lookups.call("list", dest_dir, self._move_group, run, plan, dest_dir, moves)
+                return run.drain()
+        finally:
+            self.mapping.save_run_state()
+
+    def _plan_listing(self, run, plan, src_dir):
+        """
+        List src_dir and add its files to plan. Retried as a whole if the listing fails.
+        """
+        self._op()
+        for entry in run.handles.list_files(src_dir):
+            run.lookups.call("classify", entry.path, self._plan_file, plan, entry,
+                             self.mapping.match(entry.name))
 
-    def deep_audit_and_sort(self, root_dir):
+    def _plan_file(self, plan, entry, dest):
+        """
+        Finish classifying one file (dest is its match() result) and add it to plan.
+        """
+        dest_folder = self.mapping.resolve(entry.name, entry.path, dest, entry)
+        if dest_folder:
+            plan.add(entry.path, dest_folder, entry.name)
+
+    def _move_group(self, run, plan, dest_dir, moves):
+        """
+        Resolve one destination directory's moves against its listing and move them.
+        Retried as a whole if the listing fails.
+        """
+        self._op()
+        for src_path, target_path in plan.resolve(dest_dir, moves, run.handles):
+            run.moves.call("move", src_path, self._move, run.handles, run.created, os.path.dirname(src_path),
+                           os.path.basename(src_path), dest_dir, os.path.basename(target_path))
+
+    def link_into(self, source_dirs, view_root, deep=False):
+        """
+        Build or refresh a link view: view_root gets the mapping's category tree made
+        of hard links (or symlinks) to the files in source_dirs, which are not moved.
+        See link_view.LinkView. Returns {"linked", "symlinked", "kept", "removed"};
+        links that could not be made are recorded in self.report.
+        """
+        from src.link_view import LinkView
+        try:
+            return LinkView(self.mapping, view_root, self.throttle, self.report).sync(source_dirs, deep=deep)
+        finally:
+            self.mapping.save_run_state()
+
+    def _override_error(self, path, error):
+        """
+        Record an invalid override file; its folder keeps the inherited rules.
+        """
+        self.report.add_failure("override", path, error)
+
+    def _walk_audit(self, root_dir, start=(), recursive=True, pruner=None, inherited=None, unreadable=None):
+        """
+        Walk root_dir (or the folder at the relative path components start below it),
+        pruning excluded subtrees before they are listed. With recursive=False only
+        that one folder is listed. Each listing's size is reported to pruner, if given.
+        Yields (dirpath, normalized relative dir, file entries, scope) for directories to
+        audit, where scope is the FileMapping or the MappingScope of the nearest
+        override file above (see mapping_overrides). inherited is the scope in effect
+        above start, if the caller knows it. If start cannot be listed, OSError is
+        raised; a folder below it that cannot be is passed to
+        unreadable(parts, inherited scope, error), or recorded as a failure.
+        """
+        scan = self.mapping.scan_filter
+        top = os.path.join(root_dir, *start)
+        if inherited is None:
+            inherited = self.overrides.scope_at(root_dir, start, self._override_error)
+        # Depth first, in listing order, like a top-down os.walk.
+        stack = [(top, list(start), inherited)]
+        while stack:
+            dirpath, parts, inherited = stack.pop()
+            try:
+                subdirs, files = scan_dir(dirpath)
+            except OSError as e:
+                if dirpath == top:
+                    raise
+                if unreadable is None:
+                    self.report.add_failure("list", dirpath, e)
+                else:
+                    unreadable(parts, inherited, e)
+                continue
+            # Charged after the listing, which delays the walk's next one.
+            self._op()
+            if pruner is not None:
+                pruner.listed(dirpath, len(subdirs) + len(files))
+            rel_dir = os.path.normpath(os.path.join(*parts)) if parts else "."
+            scope = self.overrides.scope_for(inherited, dirpath, rel_dir, [entry.name for entry in files],
+                                             self._override_error)
+            if recursive:
+                children = []
+                for name in subdirs:
+                    child = parts + [name]
+                    if scan.check(child) != SCAN_SKIP:
+                        children.append((os.path.join(dirpath, name), child, scope))
+                stack.extend(reversed(children))
+            if scan.check(parts) == SCAN_AUDIT:
+                yield dirpath, rel_dir, files, scope
+
+    def deep_audit_and_sort(self, root_dir, prune_empty=False):
         """
         Recursively move misplaced files to their correct folders.
+        With prune_empty, folders the audit emptied are removed afterwards (see
+        empty_dirs). Returns the number of folders removed.
+        """
+        try:
+            pruner = EmptyDirPruner.for_mapping(self.mapping, root_dir, self.throttle) if prune_empty else None
+            with DirHandleCache(self.handle_cache_size) as handles:
+                self._deep_audit(root_dir, handles, pruner=pruner)
+            if pruner is None:
+                return 0
+            # Override files found during the walk add destinations to keep.
+            pruner.protect_destinations(self.overrides.destinations())
+            return pruner.prune()
+        finally:
+            self.mapping.save_run_state()
+
+    def audit_shard(self, root_dir, start, recursive=True):
+        """
+        Deep-audit one part of root_dir: the folder at the relative path components
+        start, with or without its subfolders. Misplaced files still move to their
+        destination under root_dir. Returns the number of files moved.
+        """
+        with DirHandleCache(self.handle_cache_size) as handles:
+            return self._deep_audit(root_dir, handles, start, recursive)
+
+    def _deep_audit(self, root_dir, handles, start=(), recursive=True, pruner=None):
+        run = _SortRun(self, handles, pruner)
+        run.lookups.call("list", os.path.join(root_dir, *start), self._audit_tree, run, root_dir, list(start),
+                         None, recursive)
+        return run.drain()
+
+    def _audit_tree(self, run, root_dir, start, inherited, recursive):
+        """
+        Audit the folder at start (relative path components) and, if recursive,
+        the folders below it; inherited is the scope above it, or None. Retried as
+        a whole if start cannot be listed. A subfolder that cannot be listed is
+        retried the same way, with its own subtree.
+        """
+        def unreadable(parts, scope, error):
+            run.lookups.reattempt("list", os.path.join(root_dir, *parts), error, self._audit_tree, run,
+                                  root_dir, parts, scope, recursive)
+
+        fast_path = self.mapping.scan_filter.fast_path_in_place
+        for dirpath, rel_dir, files, scope in self._walk_audit(root_dir, start, recursive, run.pruner,
+                                                               inherited, unreadable):
+            here = os.path.abspath(dirpath)
+            for entry in files:
+                dest = scope.match(entry.name)
+                if fast_path and dest is not None and dest not in scope.templates \
+                        and self.mapping.normalized_destination(dest) == rel_dir:
+                    continue
+                run.lookups.call("classify", entry.path, self._audit_file, run, root_dir, dirpath, here, entry,
+                                 scope, dest)
+
+    def _audit_file(self, run, root_dir, dirpath, here, entry, scope, dest):
+        """
+        Finish classifying one audited file (dest is its match() result) and move it
+        if it is misplaced. Retried if the file cannot be stat'ed or read.
         """
-        for dirpath, _, filenames in os.walk(root_dir):
-            for filename in filenames:
-                correct_folder = self.mapping.get_destination(filename)
-                if correct_folder:
-                    correct_path = os.path.join(root_dir, correct_folder)
-                    os.makedirs(correct_path, exist_ok=True)
-                    current_path = os.path.join(dirpath, filename)
-                    target_path = os.path.join(correct_path, filename)
-                    if os.path.abspath(current_path) != os.path.abspath(target_path):
-                        shutil.move(current_path, target_path)
\ No newline at end of file
+        correct_folder = scope.resolve(entry.name, entry.path, dest, entry)
+        if not correct_folder:
+            return
+        correct_path = os.path.join(root_dir, correct_folder)
+        if here != os.path.abspath(correct_path):
+            run.moves.call("move", entry.path, self._move, run.handles, run.created,
+                           dirpath, entry.name, correct_path, None, run.pruner)
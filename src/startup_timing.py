@@ -0,0 +1,121 @@
+"""
+Startup timing report for FileSorter.
+
+Enabled with the --debug-startup command-line flag or the FILESORTER_DEBUG_STARTUP
+environment variable (both work for the PyInstaller build, where "python -X
+importtime" is not available). The report lists startup phases (imports, window
+creation, first paint, mapping discovery) and an -X importtime style breakdown
+of every module imported after the timer was installed:
+
+    import time: self [us] | cumulative | imported package
+
+It is written to stderr and to startup_timing.log next to settings.json.
+"""
+
+import builtins
+import importlib.util
+import os
+import sys
+import time
+
+DEBUG_FLAG = "--debug-startup"
+DEBUG_ENV = "FILESORTER_DEBUG_STARTUP"
+LOG_FILE = os.path.join(os.path.dirname(__file__), "startup_timing.log")
+
+
+class StartupTimer:
+    """
+    Records startup phases and per-module import times.
+    """
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = []
+        self.imports = []  # (depth, module, self_us, cumulative_us) in completion order
+        self._stack = []
+        self._original_import = None
+        self._reported = False
+
+    def install(self):
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def uninstall(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def mark(self, phase):
+        """
+        Record that a startup phase has been reached.
+        """
+        self.phases.append((phase, time.perf_counter() - self.start))
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        target = name
+        if level:
+            package = (globals or {}).get("__package__") or ""
+            try:
+                target = importlib.util.resolve_name("." * level + name, package)
+            except (ImportError, ValueError):
+                target = name
+        if target in sys.modules:
+            # "from package import submodule" loads the submodule without
+            # another __import__ call, so time it here.
+            module = sys.modules[target]
+            missing = [
+                f for f in fromlist or ()
+                if f != "*" and hasattr(module, "__path__") and not hasattr(module, f)
+            ]
+            if not missing:
+                return self._original_import(name, globals, locals, fromlist, level)
+            target = ", ".join(f"{target}.{f}" for f in missing)
+        self._stack.append(0.0)
+        began = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            cumulative = time.perf_counter() - began
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += cumulative
+            self.imports.append((len(self._stack), target, (cumulative - children) * 1e6, cumulative * 1e6))
+
+    def report_lines(self):
+        lines = ["FileSorter startup timing", ""]
+        previous = 0.0
+        for phase, elapsed in self.phases:
+            lines.append(f"{elapsed * 1000:9.1f} ms  (+{(elapsed - previous) * 1000:7.1f} ms)  {phase}")
+            previous = elapsed
+        lines += ["", "import time: self [us] | cumulative | imported package"]
+        for depth, module, self_us, cumulative_us in self.imports:
+            lines.append(f"import time: {self_us:9.0f} | {cumulative_us:10.0f} | {'  ' * depth}{module}")
+        return lines
+
+    def report(self):
+        """
+        Write the report once to stderr and the log file.
+        """
+        if self._reported:
+            return
+        self._reported = True
+        self.uninstall()
+        text = "\n".join(self.report_lines()) + "\n"
+        if sys.stderr:
+            sys.stderr.write(text)
+        try:
+            with open(LOG_FILE, "w", encoding="utf-8") as f:
+                f.write(text)
+        except OSError:
+            pass
+
+
+def enable_if_requested(argv=None):
+    """
+    Return an installed StartupTimer if startup debugging was requested, else None.
+    """
+    argv = sys.argv if argv is None else argv
+    if DEBUG_FLAG not in argv and not os.environ.get(DEBUG_ENV):
+        return None
+    timer = StartupTimer()
+    timer.install()
+    return timer
@@ -0,0 +1,131 @@
+"""
+Parallel folder-structure cloning for FileSorter templates.
+
+StructureCopy recreates the folder tree of a source directory (folders only, no
+files) under a destination root, as TemplateTree does for dropped folders.
+
+- Each depth level is listed with os.scandir across a pool of worker threads.
+- Folders are created level by level (so parents always exist) with one os.mkdir
+  each, in batches spread over the same pool. Creating one level overlaps with
+  listing the next.
+- max_depth, include and exclude (fnmatch globs on folder names) limit what is
+  cloned. include picks the top-level folders to copy, each with its whole
+  subtree; exclude applies at every depth. A folder that is filtered out is
+  skipped with its whole subtree.
+- folders that cannot be listed are skipped and collected in skipped.
+- cancel() stops the copy between batches; folders already created are kept.
+- created / discovered counters can be polled from another thread for progress.
+"""
+
+import fnmatch
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _list_subdirs(path):
+    """
+    Return the names of the real (non-symlink) subdirectories of path. Raises OSError.
+    """
+    with os.scandir(path) as it:
+        return [entry.name for entry in it if entry.is_dir(follow_symlinks=False)]
+
+
+class StructureCopy:
+    """
+    Clone the folder structure of src into dst_root/<basename of src>.
+    """
+    def __init__(self, src, dst_root, max_depth=None, include=None, exclude=None, workers=8, batch_size=256):
+        self.src = os.path.normpath(src)
+        self.dst_root = dst_root
+        self.target = os.path.join(dst_root, os.path.basename(self.src))
+        self.max_depth = max_depth
+        self.include = list(include or [])
+        self.exclude = list(exclude or [])
+        self.workers = workers
+        self.batch_size = batch_size
+        self.created = 0
+        self.discovered = 0
+        self.skipped = []  # (source folder, error message) for folders that could not be listed
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _wanted(self, rel_path, name):
+        """
+        Return True if the folder name below rel_path ("" for the top level) is copied.
+        """
+        if any(fnmatch.fnmatch(name, pattern) for pattern in self.exclude):
+            return False
+        if rel_path or not self.include:
+            return True
+        return any(fnmatch.fnmatch(name, pattern) for pattern in self.include)
+
+    def _list(self, rel_path):
+        if self.cancelled:
+            return rel_path, []
+        path = os.path.join(self.src, rel_path) if rel_path else self.src
+        try:
+            return rel_path, _list_subdirs(path)
+        except OSError as e:
+            with self._lock:
+                self.skipped.append((path, e.strerror or str(e)))
+            return rel_path, []
+
+    def _create_batch(self, rel_paths):
+        created = 0
+        for rel_path in rel_paths:
+            if self.cancelled:
+                break
+            try:
+                os.mkdir(os.path.join(self.target, rel_path))
+            except FileExistsError:
+                pass
+            created += 1
+        with self._lock:
+            self.created += created
+
+    def run(self):
+        """
+        Copy the structure. Returns the number of folders created or ensured.
+        Raises OSError if a folder cannot be created.
+        """
+        os.makedirs(self.target, exist_ok=True)
+        with self._lock:
+            self.created += 1
+        level = [""]
+        depth = 0
+        pending = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            try:
+                while level and not self.cancelled:
+                    if self.max_depth is not None and depth >= self.max_depth:
+                        break
+                    next_level = []
+                    for rel_path, names in executor.map(self._list, level):
+                        for name in names:
+                            if self._wanted(rel_path, name):
+                                next_level.append(os.path.join(rel_path, name) if rel_path else name)
+                    with self._lock:
+                        self.discovered += len(next_level)
+                    # The previous level's folders must exist before creating their children.
+                    for future in pending:
+                        future.result()
+                    pending = [
+                        executor.submit(self._create_batch, next_level[i:i + self.batch_size])
+                        for i in range(0, len(next_level), self.batch_size)
+                    ]
+                    level = next_level
+                    depth += 1
+                for future in pending:
+                    future.result()
+            except BaseException:
+                self.cancel()
+                raise
+        return self.created
@@ -0,0 +1,187 @@
+"""
+I/O rate limiting and priority control for sort runs.
+
+IOThrottle combines two token buckets (metadata operations per second and bytes
+per second) with an optional "background priority" mode. Sorters call op() before
+each listing, stat, makedirs or move. All limits can be changed with configure()
+while a run is in progress; the new values apply to the next operation.
+
+Background priority is applied lazily, by the threads doing the work:
+- Windows: THREAD_MODE_BACKGROUND_BEGIN for the thread (lower CPU and I/O priority)
+- Linux: the thread's nice value (setpriority on its thread id) plus the idle I/O
+  scheduling class via ioprio_set
+- Other POSIX: there is no per-thread priority, so os.nice() lowers the whole
+  process once, however many threads enter background mode
+Leaving background mode restores I/O priority; raising the nice value back may
+not be permitted for unprivileged users, in which case CPU priority stays low
+(and is not lowered again when background mode is re-entered).
+"""
+
+import ctypes
+import os
+import platform
+import sys
+import threading
+import time
+
+OPS_PER_SECOND_KEY = "ops_per_second"
+BYTES_PER_SECOND_KEY = "bytes_per_second"
+BACKGROUND_KEY = "background_priority"
+
+BACKGROUND_NICE = 10
+MAX_WAIT = 0.25  # seconds; bounds how long a waiter can miss a live rate change
+
+_THREAD_MODE_BACKGROUND_BEGIN = 0x00010000
+_THREAD_MODE_BACKGROUND_END = 0x00020000
+
+_IOPRIO_SET_SYSCALL = {"x86_64": 251, "amd64": 251, "i386": 289, "i686": 289, "aarch64": 30, "arm64": 30}
+_IOPRIO_WHO_PROCESS = 1
+_IOPRIO_CLASS_SHIFT = 13
+_IOPRIO_CLASS_NONE = 0
+_IOPRIO_CLASS_IDLE = 3
+
+_UNCHANGED = object()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. A rate of None (or 0) means unlimited.
+    """
+    def __init__(self, rate=None):
+        self._lock = threading.Lock()
+        self._tokens = 0.0
+        self.set_rate(rate)
+
+    def set_rate(self, rate):
+        with self._lock:
+            self.rate = float(rate) if rate and rate > 0 else None
+            # Allow up to one second of burst.
+            self.capacity = self.rate or 0.0
+            self._tokens = min(self._tokens, self.capacity)
+            self._stamp = time.monotonic()
+
+    def acquire(self, amount=1):
+        """
+        Block until amount tokens are available. Requests larger than the bucket
+        are admitted once it is full, leaving it in debt.
+        """
+        while True:
+            with self._lock:
+                if self.rate is None:
+                    return
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                needed = min(amount, self.capacity)
+                if self._tokens >= needed:
+                    self._tokens -= amount
+                    return
+                wait = (needed - self._tokens) / self.rate
+            time.sleep(min(wait, MAX_WAIT))
+
+
+def _set_ioprio(ioclass, data=0):
+    """
+    Set the calling thread's I/O scheduling class on Linux. Returns True on success.
+    """
+    number = _IOPRIO_SET_SYSCALL.get(platform.machine().lower())
+    if number is None or not sys.platform.startswith("linux"):
+        return False
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        return libc.syscall(number, _IOPRIO_WHO_PROCESS, 0, (ioclass << _IOPRIO_CLASS_SHIFT) | data) == 0
+    except (OSError, AttributeError):
+        return False
+
+
+class _ProcessPriority:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.nice_base = None
+
+
+_thread_priority = threading.local()  # Linux: each thread's own nice value
+_process_priority = _ProcessPriority()  # elsewhere: the process-wide one
+
+
+def _lower_cpu_priority(state, enabled, who):
+    """
+    Raise the nice value of who (a Linux thread id, or 0 for the process) by
+    BACKGROUND_NICE, or restore it. state.nice_base is the value it was lowered
+    from, or None; lowering twice or restoring an unlowered priority does nothing.
+    """
+    base = getattr(state, "nice_base", None)
+    try:
+        if enabled and base is None:
+            base = os.getpriority(os.PRIO_PROCESS, who)
+            os.setpriority(os.PRIO_PROCESS, who, base + BACKGROUND_NICE)
+            state.nice_base = base
+        elif not enabled and base is not None:
+            os.setpriority(os.PRIO_PROCESS, who, base)
+            state.nice_base = None
+    except (OSError, AttributeError):
+        pass  # e.g. an unprivileged user may not raise priority back
+
+
+def set_thread_background(enabled):
+    """
+    Lower (or restore) CPU and I/O priority for the calling thread, best effort.
+    Outside Windows and Linux this applies to the whole process (see above).
+    """
+    if sys.platform == "win32":
+        kernel32 = ctypes.windll.kernel32
+        mode = _THREAD_MODE_BACKGROUND_BEGIN if enabled else _THREAD_MODE_BACKGROUND_END
+        kernel32.SetThreadPriority(kernel32.GetCurrentThread(), mode)
+        return
+    if sys.platform.startswith("linux"):
+        # Linux keeps a nice value per thread, addressed by its thread id.
+        _lower_cpu_priority(_thread_priority, enabled, threading.get_native_id())
+        _set_ioprio(_IOPRIO_CLASS_IDLE if enabled else _IOPRIO_CLASS_NONE)
+        return
+    with _process_priority.lock:
+        _lower_cpu_priority(_process_priority, enabled, 0)
+
+
+class IOThrottle:
+    """
+    Rate limiter and priority switch shared by a sort run's worker threads.
+    """
+    def __init__(self, ops_per_second=None, bytes_per_second=None, background=False):
+        self.ops = TokenBucket(ops_per_second)
+        self.bytes = TokenBucket(bytes_per_second)
+        self.background = background
+        self._local = threading.local()
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            ops_per_second=settings.get(OPS_PER_SECOND_KEY),
+            bytes_per_second=settings.get(BYTES_PER_SECOND_KEY),
+            background=settings.get(BACKGROUND_KEY, False),
+        )
+
+    def configure(self, ops_per_second=_UNCHANGED, bytes_per_second=_UNCHANGED, background=_UNCHANGED):
+        """
+        Change limits or priority mode, including while a run is in progress.
+        """
+        if ops_per_second is not _UNCHANGED:
+            self.ops.set_rate(ops_per_second)
+        if bytes_per_second is not _UNCHANGED:
+            self.bytes.set_rate(bytes_per_second)
+        if background is not _UNCHANGED:
+            self.background = bool(background)
+
+    def op(self, nbytes=0):
+        """
+        Account for one metadata operation (and nbytes of data), waiting as needed.
+        """
+        self._apply_priority()
+        self.ops.acquire(1)
+        if nbytes:
+            self.bytes.acquire(nbytes)
+
+    def _apply_priority(self):
+        applied = getattr(self._local, "background", False)
+        if applied != self.background:
+            set_thread_background(self.background)
+            self._local.background = self.background
@@ -1,16 +1,156 @@
 import os
 import json
-import tkinter as tk
-from tkinter import messagebox
+import queue
+import threading
+
+from src import content_rules
+from src import sorter
+
+# tkinter is imported inside the GUI helpers below, so the CLI, daemon and
+# scheduler can use this module on machines without Tk.
+
+
+SETTINGS_FILE = os.path.join(os.path.dirname(__file__), "settings.json")
+MAPPINGS_DIR = os.path.join(os.path.dirname(__file__), "mappings")
+ENGINE_KEY = "engine"
+RECORD_HITS_KEY = "record_rule_hits"
+USE_DAEMON_KEY = "use_daemon"  # GUI sorts run in the local daemon when one is running
+PLAN_MEMORY_KEY = "plan_memory_mb"  # move plans larger than this spill to temporary files
+
+# JSON files with more top-level entries than this are written without indentation.
+COMPACT_JSON_THRESHOLD = 2000
+SETTINGS_SAVE_DELAY = 0.5  # seconds; settings changes within this window are written once
+
+
+def load_settings():
+    """
+    Load application settings, returning an empty dict if missing or unreadable.
+    """
+    if os.path.exists(SETTINGS_FILE):
+        try:
+            with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return {}
+    return {}
+
+
+def save_settings(settings):
+    """
+    Write application settings atomically, ignoring write failures.
+    """
+    _write_settings_text(json.dumps(settings))
+
+
+def _write_settings_text(text):
+    try:
+        sorter.write_atomic(SETTINGS_FILE, text.encode("utf-8"))
+    except Exception:
+        pass
+
+
+class SettingsWriter:
+    """
+    Debounced settings writer for the GUI.
+
+    save() snapshots the settings and returns immediately; the latest snapshot
+    is written atomically on a background thread once no further save() has
+    arrived for `delay` seconds. flush() writes any pending snapshot right away
+    (call it before exiting).
+    """
+    def __init__(self, delay=SETTINGS_SAVE_DELAY):
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # Keeps an older snapshot from landing after a newer one
+        self._pending = None
+        self._timer = None
+
+    def save(self, settings):
+        snapshot = json.dumps(settings)
+        with self._lock:
+            self._pending = snapshot
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        with self._write_lock:
+            with self._lock:
+                snapshot, self._pending = self._pending, None
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if snapshot is not None:
+                _write_settings_text(snapshot)
+
+
+def plan_memory(settings):
+    """
+    Return the move-plan memory budget in bytes from settings.
+    """
+    megabytes = settings.get(PLAN_MEMORY_KEY)
+    return int(megabytes * 1024 * 1024) if megabytes else sorter.DEFAULT_PLAN_MEMORY
+
+
+def resolve_mapping_path(mapping):
+    """
+    Resolve a mapping path or name, falling back to the mappings folder.
+    """
+    if os.path.isfile(mapping):
+        return mapping
+    for candidate in (mapping, mapping + ".json"):
+        path = os.path.join(MAPPINGS_DIR, candidate)
+        if os.path.isfile(path):
+            return path
+    raise FileNotFoundError(f"Mapping file not found: {mapping}")
 
 
 def show_error(message):
     """
     Display an error message dialog.
     """
+    from tkinter import messagebox
     messagebox.showerror("Error", message)
 
 
+def run_in_background(widget, func, on_done=None, on_error=None, poll_ms=50):
+    """
+    Run func() on a worker thread and deliver its result to on_done (or the
+    exception to on_error) on the Tk main thread, polling with widget.after().
+    The worker never touches Tk; if the widget is destroyed first, the result is dropped.
+    """
+    import tkinter as tk
+    results = queue.Queue()
+
+    def worker():
+        try:
+            results.put((True, func()))
+        except Exception as e:
+            results.put((False, e))
+
+    def poll():
+        try:
+            ok, value = results.get_nowait()
+        except queue.Empty:
+            try:
+                widget.after(poll_ms, poll)
+            except tk.TclError:
+                pass
+            return
+        if ok and on_done:
+            on_done(value)
+        elif not ok:
+            if on_error:
+                on_error(value)
+            else:
+                show_error(str(value))
+
+    threading.Thread(target=worker, daemon=True).start()
+    widget.after(poll_ms, poll)
+
+
 class MappingUtils:
     @staticmethod
     def load_json_file(path):
@@ -19,19 +159,44 @@ class MappingUtils:
 
     @staticmethod
     def save_json_file(path, data):
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4)
+        """
+        Write JSON atomically (temporary file + rename), so a crash mid-save
+        leaves the previous file intact. Large files are written compactly.
+        """
+        if isinstance(data, dict) and len(data) > COMPACT_JSON_THRESHOLD:
+            text = json.dumps(data, separators=(",", ":"))
+        else:
+            text = json.dumps(data, indent=4)
+        sorter.write_atomic(path, text.encode("utf-8"))
 
     @staticmethod
     def validate_mapping(mapping):
-        # Basic validation: mapping should be a dict of str:str
+        # Basic validation: mapping should be a dict of str:str, plus "$" directives
         if not isinstance(mapping, dict):
             return False
-        for k, v in mapping.items():
+        rules, directives = sorter.split_directives(mapping)
+        for k, v in rules.items():
             if not isinstance(k, str) or not isinstance(v, str):
                 return False
+        for v in directives.values():
+            if not isinstance(v, dict):
+                return False
+        try:
+            content_rules.parse_content_rules(content_rules.rules_from_directives(directives))
+        except ValueError:
+            return False
         return True
 
+    @staticmethod
+    def split_directives(mapping):
+        return sorter.split_directives(mapping)
+
+    @staticmethod
+    def merge_directives(rules, directives):
+        merged = dict(directives)
+        merged.update(rules)
+        return merged
+
     @staticmethod
     def load_mapping(path):
         return MappingUtils.load_json_file(path)
@@ -39,6 +204,10 @@ class MappingUtils:
     @staticmethod
     def save_mapping(path, mapping):
         MappingUtils.save_json_file(path, mapping)
+        try:
+            sorter.write_compiled_mapping(path, mapping)
+        except OSError:
+            pass  # A stale sidecar is ignored: it no longer matches the JSON's hash
 
     @staticmethod
     def is_valid_mapping_file(path):
@@ -79,6 +248,7 @@ class ToolTip:
     def show_tip(self, event=None):
         if self.tipwindow or not self.text:
             return
+        import tkinter as tk
         x = self.widget.winfo_pointerx() + 20
         y = self.widget.winfo_pointery() + 10
         self.tipwindow = tw = tk.Toplevel(self.widget)
@@ -0,0 +1,15 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def write_mapping(tmp_path):
+    """
+    Return a function that writes a mapping dict to a JSON file and returns its path.
+    """
+    def write(data, name="mapping.json"):
+        path = tmp_path / name
+        path.write_text(json.dumps(data), encoding="utf-8")
+        return str(path)
+    return write
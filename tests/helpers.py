@@ -0,0 +1,26 @@
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_files(folder, names):
+    """
+    Create empty files (relative paths, "/"-separated) below folder.
+    """
+    for name in names:
+        path = os.path.join(folder, *name.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w"):
+            pass
+
+
+def tree(folder):
+    """
+    Return the sorted "/"-separated relative paths of every file below folder.
+    """
+    found = []
+    for dirpath, _, filenames in os.walk(folder):
+        rel_dir = os.path.relpath(dirpath, folder)
+        for name in filenames:
+            found.append(name if rel_dir == "." else f"{rel_dir.replace(os.sep, '/')}/{name}")
+    return sorted(found)
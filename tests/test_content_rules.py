@@ -0,0 +1,68 @@
+import os
+import stat
+
+import pytest
+
+from src import sorter
+from src import utils
+from src.content_rules import ContentSniffer, rules_from_directives
+
+PNG = b"\x89PNG\r\n\x1a\n"
+
+
+@pytest.mark.parametrize("content", [[{"type": "pdf", "destination": "PDF"}], {"rules": {"type": "pdf"}}, "pdf"])
+def test_malformed_content_directive_is_a_validation_error(write_mapping, content):
+    data = {"*.txt": "Text", "$content": content}
+    assert not utils.MappingUtils.validate_mapping(data)
+    with pytest.raises(ValueError, match=r"\$content"):
+        sorter.FileMapping(write_mapping(data))
+
+
+def test_bad_content_rule_fails_validation():
+    assert not utils.MappingUtils.validate_mapping({"$content": {"rules": [{"type": "nope", "destination": "X"}]}})
+    assert utils.MappingUtils.validate_mapping({"$content": {"rules": [{"type": "png", "destination": "Images"}]}})
+    assert rules_from_directives({}) == []
+
+
+def test_unmatched_files_are_sorted_by_content(tmp_path, write_mapping):
+    mapping_path = write_mapping({
+        "*.txt": "Text",
+        "$content": {"rules": [{"type": "png", "destination": "Images"}]},
+    })
+    folder = tmp_path / "inbox"
+    folder.mkdir()
+    (folder / "photo").write_bytes(PNG + b"rest")
+    (folder / "notes.txt").write_bytes(PNG)
+    (folder / "other").write_bytes(b"plain")
+    sorter.FileSorter(mapping_path).sort_current_directory(str(folder))
+    assert (folder / "Images" / "photo").exists()
+    assert (folder / "Text" / "notes.txt").exists()  # name rules come first
+    assert (folder / "other").exists()
+
+
+def test_sniffer_cache_avoids_rereading(tmp_path):
+    path = tmp_path / "photo"
+    path.write_bytes(PNG)
+    cache = str(tmp_path / "cache.content")
+    sniffer = ContentSniffer([{"type": "png", "destination": "Images"}], cache)
+    assert sniffer.destination(str(path)) == "Images"
+    sniffer.save()
+    again = ContentSniffer([{"type": "png", "destination": "Images"}], cache)
+    assert again.destination(str(path)) == "Images"
+    assert again.reads == 0
+
+
+def test_stat_without_inode_is_not_used_as_cache_key(tmp_path):
+    sniffer = ContentSniffer([{"type": "png", "destination": "Images"}])
+    png, other = tmp_path / "a", tmp_path / "b"
+    png.write_bytes(PNG + b"data")
+    other.write_bytes(b"plain text..")
+    os.utime(other, ns=(png.stat().st_atime_ns, png.stat().st_mtime_ns))
+
+    def without_inode(path):
+        # What os.DirEntry.stat() gives on Windows: same fields, st_ino 0.
+        fields = list(os.stat(path))
+        fields[stat.ST_INO] = 0
+        return os.stat_result(fields)
+    assert sniffer.destination(str(png), without_inode(png)) == "Images"
+    assert sniffer.destination(str(other), without_inode(other)) is None
@@ -0,0 +1,30 @@
+import json
+import os
+
+from src import daemon
+from tests.helpers import make_files, tree
+
+
+def _daemon():
+    return daemon.SortDaemon(max_jobs=2, settings_loader=lambda: {"record_rule_hits": False})
+
+
+def test_jobs_share_warm_mapping_state_until_the_mapping_changes(tmp_path, write_mapping):
+    mapping_path = write_mapping({"*.txt": "Text"})
+    sort_daemon = _daemon()
+    for name in ("one", "two"):
+        make_files(tmp_path / name, ["a.txt", "b.pdf"])
+        job_id = sort_daemon.submit({"action": "sort", "mapping": mapping_path, "folders": [str(tmp_path / name)]})
+        job = sort_daemon.job(job_id, wait=30)
+        assert job["status"] == "completed"
+        assert job["result"]["failed"] == 0
+        assert tree(tmp_path / name) == ["Text/a.txt", "b.pdf"]
+    first = sort_daemon.mappings.run_state(mapping_path, False)
+    assert sort_daemon.mappings.run_state(mapping_path, False) == first
+
+    with open(mapping_path, "w", encoding="utf-8") as f:
+        json.dump({"*.txt": "Notes", "*.pdf": "PDF"}, f)
+    os.utime(mapping_path, ns=(0, 0))
+    mapping, overrides = sort_daemon.mappings.run_state(mapping_path, False)
+    assert mapping is not first[0] and overrides is not first[1]
+    assert mapping.mapping == {"*.txt": "Notes", "*.pdf": "PDF"}
@@ -0,0 +1,96 @@
+import os
+import shutil
+
+import pytest
+
+from src import sorter
+from tests.helpers import make_files, tree
+
+MAPPING = {
+    "*.txt": "Text",
+    "*.tar.gz": "Archives",
+    "report*.pdf": "Reports",
+    "*.pdf": "PDF",
+    "*.jpg": "Images/{ext}",
+    "$scan": {"exclude": ["skip"]},
+}
+
+FILES = [
+    "a.txt", "b.pdf", "report-1.pdf", "c.tar.gz", "d.jpg", "e.unknown",
+    "sub/f.txt", "sub/deeper/g.pdf", "sub/deeper/report-2.pdf", "sub/h.jpg",
+    "skip/i.txt", "Text/j.txt", "PDF/k.txt",
+]
+
+
+def _run_both(tmp_path, write_mapping, action):
+    """
+    Run action(sorter, folder) with each engine on its own copy of FILES; return
+    {engine: (tree, result, failures)}.
+    """
+    mapping_path = write_mapping(MAPPING)
+    template = tmp_path / "template"
+    make_files(str(template), FILES)
+    results = {}
+    for engine in sorter.ENGINES:
+        folder = tmp_path / engine
+        shutil.copytree(template, folder)
+        sorter_obj = sorter.create_sorter(mapping_path, engine=engine)
+        result = action(sorter_obj, folder)
+        results[engine] = (tree(str(folder)), result, sorter_obj.report.failed)
+    return results
+
+
+def test_engines_agree_on_sort_current_directory(tmp_path, write_mapping):
+    results = _run_both(tmp_path, write_mapping, lambda s, folder: s.sort_current_directory(str(folder)))
+    assert results["standard"] == results["async"]
+    assert "Text/a.txt" in results["standard"][0] and "sub/f.txt" in results["standard"][0]
+
+
+def test_engines_agree_on_deep_audit(tmp_path, write_mapping):
+    results = _run_both(tmp_path, write_mapping,
+                        lambda s, folder: s.deep_audit_and_sort(str(folder), prune_empty=True))
+    assert results["standard"] == results["async"]
+    assert "skip/i.txt" in results["standard"][0] and "Reports/report-2.pdf" in results["standard"][0]
+
+
+def test_engines_agree_on_sort_into(tmp_path, write_mapping):
+    def sort_into(sorter_obj, folder):
+        (folder / "sub" / "a.txt").write_text("clash")
+        return sorter_obj.sort_into([str(folder), str(folder / "sub")], str(folder / "out"))
+    results = _run_both(tmp_path, write_mapping, sort_into)
+    assert results["standard"] == results["async"]
+    assert {"out/Text/a.txt", "out/Text/a (1).txt"} <= set(results["standard"][0])
+
+
+@pytest.mark.parametrize("engine", sorter.ENGINES)
+def test_engines_leave_a_sorted_tree_alone(tmp_path, write_mapping, engine):
+    root = tmp_path / "root"
+    make_files(str(root), ["Text/a.txt", "PDF/b.pdf", "Images/jpg/c.jpg"])
+    sorter_obj = sorter.create_sorter(write_mapping(MAPPING), engine=engine)
+    sorter_obj.deep_audit_and_sort(str(root))
+    assert tree(str(root)) == ["Images/jpg/c.jpg", "PDF/b.pdf", "Text/a.txt"]
+
+
+@pytest.mark.parametrize("engine", sorter.ENGINES)
+@pytest.mark.parametrize("method", ["sort_current_directory", "sort_into", "deep_audit_and_sort"])
+def test_mtime_templates_use_the_listing_stat(tmp_path, monkeypatch, write_mapping, engine, method):
+    root = tmp_path / "root"
+    names = ["a.jpg", "b.jpg", "c.txt"]
+    make_files(str(root), names)
+    mapping_path = write_mapping({"*.jpg": "Images/{mtime:%Y}", "*.txt": "Text"})
+    sorter_obj = sorter.create_sorter(mapping_path, engine=engine)
+    real = os.stat
+    stats = []
+
+    def counting_stat(path, *args, **kwargs):
+        if os.path.basename(str(path)) in names:
+            stats.append(path)
+        return real(path, *args, **kwargs)
+    monkeypatch.setattr(os, "stat", counting_stat)
+    if method == "sort_into":
+        sorter_obj.sort_into([str(root)], str(root))
+    else:
+        getattr(sorter_obj, method)(str(root))
+    monkeypatch.undo()
+    assert stats == []
+    assert len([path for path in tree(str(root)) if path.startswith("Images/")]) == 2
@@ -0,0 +1,39 @@
+import threading
+
+from src import sorter
+
+
+def test_concurrent_hit_count_saves_keep_every_hit(write_mapping):
+    mapping_path = write_mapping({"*.txt": "Text", "*.pdf": "PDF"})
+    mappings = [sorter.FileMapping(mapping_path, record_hits=True) for _ in range(8)]
+
+    def run(mapping):
+        for _ in range(25):
+            mapping.match("a.txt")
+            mapping.match("b.pdf")
+            mapping.match("c.pdf")
+            mapping.save_hit_counts()
+
+    threads = [threading.Thread(target=run, args=(mapping,)) for mapping in mappings]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorter.load_hit_counts(mapping_path) == {"*.txt": 200, "*.pdf": 400}
+    assert all(not mapping.hits for mapping in mappings)
+
+
+def test_hits_file_is_replaced_not_rewritten_in_place(write_mapping, monkeypatch):
+    mapping_path = write_mapping({"*.txt": "Text"})
+    mapping = sorter.FileMapping(mapping_path, record_hits=True)
+    mapping.match("a.txt")
+    mapping.save_hit_counts()
+
+    def fail(path, data):
+        raise OSError("disk full")
+    monkeypatch.setattr(sorter, "write_atomic", fail)
+    mapping.match("b.txt")
+    mapping.save_hit_counts()
+    # A failed save leaves the previous totals intact and keeps the new hits for later.
+    assert sorter.load_hit_counts(mapping_path) == {"*.txt": 1}
+    assert mapping.hits == {"*.txt": 1}
@@ -0,0 +1,66 @@
+import errno
+import os
+
+from src import sorter
+from tests.helpers import make_files, tree
+
+
+def test_sync_links_and_resyncs_incrementally(tmp_path, write_mapping):
+    mapping_path = write_mapping({"*.txt": "Text", "*.pdf": "PDF"})
+    src = tmp_path / "src"
+    make_files(src, ["a.txt", "b.pdf", "c.bin"])
+    sorter_obj = sorter.FileSorter(mapping_path)
+    view = tmp_path / "view"
+    stats = sorter_obj.link_into([str(src)], str(view))
+    assert stats == {"linked": 2, "symlinked": 0, "kept": 0, "removed": 0}
+    assert tree(view) == [".filesorter-view", "PDF/b.pdf", "Text/a.txt"]
+    os.remove(src / "b.pdf")
+    stats = sorter_obj.link_into([str(src)], str(view))
+    assert stats == {"linked": 0, "symlinked": 0, "kept": 1, "removed": 1}
+    assert tree(view) == [".filesorter-view", "Text/a.txt"]
+    assert tree(src) == ["a.txt", "c.bin"]
+
+
+def test_link_runs_do_not_count_rule_hits(tmp_path, write_mapping):
+    mapping_path = write_mapping({"*.txt": "Text"})
+    make_files(tmp_path / "src", ["a.txt"])
+    sorter_obj = sorter.FileSorter(mapping_path, record_hits=True)
+    sorter_obj.link_into([str(tmp_path / "src")], str(tmp_path / "view"))
+    assert sorter.load_hit_counts(mapping_path) == {}
+
+
+def test_link_failures_are_reported_and_the_sync_goes_on(tmp_path, write_mapping, monkeypatch):
+    mapping_path = write_mapping({"*.txt": "Text"})
+    make_files(tmp_path / "src", ["a.txt", "bad.txt", "c.txt"])
+
+    def fail_for_bad(real):
+        def call(src, dst, *args, **kwargs):
+            if os.path.basename(dst) == "bad.txt":
+                raise PermissionError(errno.EACCES, "Permission denied", dst)
+            return real(src, dst, *args, **kwargs)
+        return call
+    monkeypatch.setattr(os, "link", fail_for_bad(os.link))
+    monkeypatch.setattr(os, "symlink", fail_for_bad(os.symlink))
+    sorter_obj = sorter.FileSorter(mapping_path)
+    stats = sorter_obj.link_into([str(tmp_path / "src")], str(tmp_path / "view"))
+    assert stats["linked"] == 2
+    assert tree(tmp_path / "view") == [".filesorter-view", "Text/a.txt", "Text/c.txt"]
+    assert sorter_obj.report.failed == 1
+    assert sorter_obj.report.failures[0][:2] == ("link", str(tmp_path / "src" / "bad.txt"))
+
+
+def test_unreadable_source_folder_is_reported(tmp_path, write_mapping, monkeypatch):
+    mapping_path = write_mapping({"*.txt": "Text"})
+    make_files(tmp_path / "src", ["a.txt", "locked/b.txt"])
+    locked = str(tmp_path / "src" / "locked")
+    real_scandir = os.scandir
+
+    def scandir(path):
+        if path == locked:
+            raise PermissionError(errno.EACCES, "Permission denied", path)
+        return real_scandir(path)
+    monkeypatch.setattr(os, "scandir", scandir)
+    sorter_obj = sorter.FileSorter(mapping_path)
+    stats = sorter_obj.link_into([str(tmp_path / "src")], str(tmp_path / "view"), deep=True)
+    assert stats["linked"] == 1
+    assert [failure[:2] for failure in sorter_obj.report.failures] == [("list", locked)]
@@ -0,0 +1,61 @@
+import json
+import os
+
+import pytest
+
+from src import sorter
+from src.mapping_overrides import OVERRIDE_FILE, OverrideCache
+from src.preview import MappingPreview
+from tests.helpers import make_files, tree
+
+
+def _write_override(folder, data):
+    folder.mkdir(parents=True, exist_ok=True)
+    (folder / OVERRIDE_FILE).write_text(json.dumps(data), encoding="utf-8")
+
+
+def test_override_scopes_are_cached_and_bounded(tmp_path, write_mapping):
+    mapping = sorter.FileMapping(write_mapping({"*.txt": "Text"}))
+    cache = OverrideCache(mapping, max_scopes=2)
+    for name in ("a", "b", "c"):
+        _write_override(tmp_path / name, {"*.pdf": "PDF"})
+    scope_a = cache.scope_for(mapping, str(tmp_path / "a"), "a")
+    assert cache.scope_for(mapping, str(tmp_path / "a"), "a") is scope_a
+    cache.scope_for(mapping, str(tmp_path / "b"), "b")
+    cache.scope_for(mapping, str(tmp_path / "c"), "c")
+    assert len(cache._scopes) == 2
+    # "a" was least recently used, so it is rebuilt.
+    assert cache.scope_for(mapping, str(tmp_path / "a"), "a") is not scope_a
+    assert scope_a.rules["*.pdf"].replace("\\", "/") == "a/PDF"
+    assert scope_a.rules["*.txt"] == "Text"
+
+
+@pytest.mark.parametrize("engine", sorter.ENGINES)
+def test_invalid_override_is_reported_and_inherits(tmp_path, write_mapping, engine):
+    root = tmp_path / "root"
+    make_files(str(root), ["good/a.pdf", "bad/b.pdf", "bad/c.txt"])
+    _write_override(root / "good", {"*.pdf": "Specs"})
+    (root / "bad" / OVERRIDE_FILE).write_text("{not json", encoding="utf-8")
+    sorter_obj = sorter.create_sorter(write_mapping({"*.pdf": "PDF", "*.txt": "Text"}), engine=engine)
+    sorter_obj.deep_audit_and_sort(str(root))
+    assert tree(str(root)) == sorted([
+        "PDF/b.pdf", "Text/c.txt", "bad/" + OVERRIDE_FILE, "good/" + OVERRIDE_FILE, "good/Specs/a.pdf",
+    ])
+    assert [(op, path) for op, path, _ in sorter_obj.report.failures] == [
+        ("override", os.path.join(str(root), "bad", OVERRIDE_FILE)),
+    ]
+
+
+def test_deep_preview_applies_overrides(tmp_path, write_mapping):
+    root = tmp_path / "root"
+    make_files(str(root), ["good/a.pdf", "bad/b.pdf", "c.pdf"])
+    _write_override(root / "good", {"*.pdf": "Specs"})
+    (root / "bad" / OVERRIDE_FILE).write_text("[]", encoding="utf-8")
+    preview = MappingPreview.from_mapping_file(write_mapping({"*.pdf": "PDF"}), str(root), deep=True).start()
+    preview.wait()
+    snapshot = preview.snapshot()
+    assert {dest.replace("\\", "/"): files for dest, (files, _) in snapshot["destinations"].items()} == {
+        "PDF": 2, "good/Specs": 1,
+    }
+    assert snapshot["unmatched"] == 0
+    assert [path for path, _ in snapshot["override_errors"]] == [os.path.join(str(root), "bad", OVERRIDE_FILE)]
@@ -0,0 +1,70 @@
+import errno
+import os
+
+import pytest
+
+from src import sorter
+from src.dir_handles import DirHandleCache
+
+
+def _failing_rename(code):
+    def rename(*args, **kwargs):
+        raise OSError(code, os.strerror(code))
+    return rename
+
+
+@pytest.mark.parametrize("code", [errno.EBUSY, errno.EACCES])
+def test_move_file_raises_rename_errors_instead_of_copying(tmp_path, monkeypatch, code):
+    src = tmp_path / "a.txt"
+    src.write_text("data")
+    monkeypatch.setattr(os, "rename", _failing_rename(code))
+    with pytest.raises(OSError) as info:
+        sorter.move_file(str(src), str(tmp_path / "b.txt"))
+    assert info.value.errno == code
+    assert src.exists() and not (tmp_path / "b.txt").exists()
+
+
+def test_move_file_copies_across_devices(tmp_path, monkeypatch):
+    src = tmp_path / "a.txt"
+    src.write_text("data")
+    monkeypatch.setattr(os, "rename", _failing_rename(errno.EXDEV))
+    sorter.move_file(str(src), str(tmp_path / "b.txt"))
+    assert not src.exists() and (tmp_path / "b.txt").read_text() == "data"
+
+
+@pytest.mark.parametrize("code", [errno.EBUSY, errno.EACCES])
+def test_move_file_at_raises_rename_errors_instead_of_copying(tmp_path, monkeypatch, code):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "dest").mkdir()
+    (tmp_path / "src" / "a.txt").write_text("data")
+    monkeypatch.setattr(os, "rename", _failing_rename(code))
+    with DirHandleCache() as handles, pytest.raises(OSError) as info:
+        sorter.move_file_at(handles, str(tmp_path / "src"), "a.txt", str(tmp_path / "dest"))
+    assert info.value.errno == code
+    assert (tmp_path / "src" / "a.txt").exists() and not (tmp_path / "dest" / "a.txt").exists()
+
+
+def test_move_file_at_copies_across_devices(tmp_path, monkeypatch):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "dest").mkdir()
+    (tmp_path / "src" / "a.txt").write_text("data")
+    monkeypatch.setattr(os, "rename", _failing_rename(errno.EXDEV))
+    with DirHandleCache() as handles:
+        sorter.move_file_at(handles, str(tmp_path / "src"), "a.txt", str(tmp_path / "dest"), "b.txt")
+    assert (tmp_path / "dest" / "b.txt").read_text() == "data"
+    assert not (tmp_path / "src" / "a.txt").exists()
+
+
+@pytest.mark.parametrize("engine", sorter.ENGINES)
+@pytest.mark.parametrize("code", [errno.EBUSY, errno.EACCES])
+def test_rename_errors_are_reported_not_copied(tmp_path, monkeypatch, write_mapping, engine, code):
+    mapping_path = write_mapping({"*.txt": "Text"})
+    folder = tmp_path / "inbox"
+    folder.mkdir()
+    (folder / "a.txt").write_text("data")
+    monkeypatch.setattr(os, "rename", _failing_rename(code))
+    sorter_obj = sorter.create_sorter(mapping_path, engine=engine, max_attempts=1)
+    sorter_obj.sort_current_directory(str(folder))
+    assert (folder / "a.txt").exists() and not (folder / "Text" / "a.txt").exists()
+    assert sorter_obj.report.failed == 1
+    assert sorter_obj.report.failures[0][:2] == ("move", str(folder / "a.txt"))
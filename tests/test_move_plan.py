@@ -0,0 +1,50 @@
+import os
+import random
+
+import pytest
+
+from src import sorter
+from src.sorter import MovePlan
+from tests.helpers import make_files, tree
+
+
+def _fill(plan, moves):
+    for src_path, dest_folder, filename in moves:
+        plan.add(src_path, dest_folder, filename)
+
+
+def _random_moves(root, count=500):
+    rng = random.Random(42)
+    moves = []
+    for number in range(count):
+        folder = rng.choice(["Text", "PDF", "Images/2024", "Images/2025", "Archives", "Ünïcode"])
+        filename = rng.choice(["a", "b", "report", "photo"]) + rng.choice([".txt", ".pdf", ".jpg"])
+        moves.append((os.path.join(root, f"src{number % 7}", filename), folder, filename))
+    return moves
+
+
+def test_spilled_plan_groups_like_an_unlimited_one(tmp_path):
+    moves = _random_moves(str(tmp_path))
+    with MovePlan(str(tmp_path / "out"), None) as plain, MovePlan(str(tmp_path / "out"), 2000) as spilled:
+        _fill(plain, moves)
+        _fill(spilled, moves)
+        assert plain.spilled_runs == 0 and spilled.spilled_runs > 1
+        assert len(spilled) == len(plain) == len(moves)
+        assert spilled.directories() == plain.directories()
+        assert list(spilled.grouped()) == list(plain.grouped())
+
+
+@pytest.mark.parametrize("engine", sorter.ENGINES)
+def test_sort_into_with_a_small_plan_budget(tmp_path, write_mapping, engine):
+    names = [f"{name}{number}.{ext}" for number in range(40) for name, ext in (("a", "txt"), ("b", "pdf"))]
+    mapping_path = write_mapping({"*.txt": "Text", "*.pdf": "PDF"})
+    trees = []
+    for budget in (None, 500):
+        root = tmp_path / f"run-{budget}"
+        make_files(str(root / "one"), names)
+        make_files(str(root / "two"), names)
+        sorter_obj = sorter.create_sorter(mapping_path, engine=engine, plan_memory=budget)
+        assert sorter_obj.sort_into([str(root / "one"), str(root / "two")], str(root / "out")) == 2 * len(names)
+        trees.append(tree(str(root)))
+    assert trees[0] == trees[1]
+    assert "out/Text/a0 (1).txt" in trees[0]
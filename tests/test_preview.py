@@ -0,0 +1,28 @@
+import pytest
+
+from src.preview import MappingPreview
+from tests.helpers import make_files
+
+
+def _snapshot(mapping_path, folder, **options):
+    preview = MappingPreview.from_mapping_file(mapping_path, str(folder), **options).start()
+    preview.wait()
+    return preview.snapshot()
+
+
+@pytest.mark.parametrize("fast_path", [True, False])
+def test_files_in_their_destination_are_not_moves(tmp_path, write_mapping, fast_path):
+    make_files(str(tmp_path / "root"), ["Text/a.txt", "Text/b.txt", "c.txt", "Other/d.txt"])
+    mapping_path = write_mapping({"*.txt": "Text", "$scan": {"fast_path_in_place": fast_path}})
+    snapshot = _snapshot(mapping_path, tmp_path / "root", deep=True)
+    assert snapshot["in_place"] == 2
+    assert {dest: files for dest, (files, _) in snapshot["destinations"].items()} == {"Text": 2}
+
+
+def test_sample_limit_marks_totals_as_truncated(tmp_path, write_mapping):
+    make_files(str(tmp_path / "root"), [f"{number}.txt" for number in range(10)])
+    mapping_path = write_mapping({"*.txt": "Text"})
+    sampled = _snapshot(mapping_path, tmp_path / "root", sample_limit=4)
+    assert sampled["truncated"] and sampled["scanned"] == 4
+    full = _snapshot(mapping_path, tmp_path / "root", sample_limit=None)
+    assert not full["truncated"] and full["destinations"]["Text"][0] == 10
@@ -0,0 +1,104 @@
+import errno
+import os
+
+import pytest
+
+from src import async_sorter, content_rules, retry, sorter
+from tests.helpers import make_files, tree
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(retry, "backoff_delay", lambda *args, **kwargs: 0)
+    monkeypatch.setattr(async_sorter, "backoff_delay", lambda *args, **kwargs: 0)
+
+
+def _flaky_scandir(monkeypatch, fails, path=None):
+    """
+    Make os.scandir fail with EBUSY the first fails times (for path only, if given).
+    """
+    real = os.scandir
+    calls = []
+
+    def scandir(target="."):
+        if (path is None or target == path) and len(calls) < fails:
+            calls.append(target)
+            raise OSError(errno.EBUSY, os.strerror(errno.EBUSY), target)
+        return real(target)
+    monkeypatch.setattr(os, "scandir", scandir)
+    return calls
+
+
+@pytest.mark.parametrize("engine", sorter.ENGINES)
+def test_transient_listing_error_is_retried(tmp_path, monkeypatch, write_mapping, engine):
+    make_files(str(tmp_path / "inbox"), ["a.txt", "b.pdf"])
+    sorter_obj = sorter.create_sorter(write_mapping({"*.txt": "Text", "*.pdf": "PDF"}), engine=engine)
+    calls = _flaky_scandir(monkeypatch, 1)
+    sorter_obj.sort_current_directory(str(tmp_path / "inbox"))
+    assert calls
+    assert tree(str(tmp_path / "inbox")) == ["PDF/b.pdf", "Text/a.txt"]
+    assert (sorter_obj.report.failed, sorter_obj.report.retried, sorter_obj.report.recovered) == (0, 1, 1)
+
+
+@pytest.mark.parametrize("engine", sorter.ENGINES)
+def test_transient_subfolder_listing_error_keeps_the_subtree(tmp_path, monkeypatch, write_mapping, engine):
+    root = tmp_path / "root"
+    make_files(str(root), ["x/a.txt", "x/y/b.txt", "c.txt"])
+    sorter_obj = sorter.create_sorter(write_mapping({"*.txt": "Text"}), engine=engine)
+    _flaky_scandir(monkeypatch, 2, str(root / "x"))
+    sorter_obj.deep_audit_and_sort(str(root))
+    assert tree(str(root)) == ["Text/a.txt", "Text/b.txt", "Text/c.txt"]
+    assert sorter_obj.report.failed == 0 and sorter_obj.report.retried == 2
+
+
+@pytest.mark.parametrize("engine", sorter.ENGINES)
+def test_listing_error_is_reported_after_the_last_attempt(tmp_path, monkeypatch, write_mapping, engine):
+    root = tmp_path / "root"
+    make_files(str(root), ["x/a.txt", "c.txt"])
+    sorter_obj = sorter.create_sorter(write_mapping({"*.txt": "Text"}), engine=engine, max_attempts=3)
+    calls = _flaky_scandir(monkeypatch, 10, str(root / "x"))
+    sorter_obj.deep_audit_and_sort(str(root))
+    assert len(calls) == 3
+    monkeypatch.undo()
+    assert tree(str(root)) == ["Text/c.txt", "x/a.txt"]
+    assert [failure[:2] for failure in sorter_obj.report.failures] == [("list", str(root / "x"))]
+
+
+@pytest.mark.parametrize("engine", sorter.ENGINES)
+def test_transient_content_read_is_retried(tmp_path, monkeypatch, write_mapping, engine):
+    make_files(str(tmp_path / "inbox"), ["scan"])
+    (tmp_path / "inbox" / "scan").write_bytes(b"%PDF-1.7")
+    mapping_path = write_mapping({
+        "*.txt": "Text",
+        "$content": {"rules": [{"magic": "25504446", "destination": "PDF"}]},
+    })
+    sorter_obj = sorter.create_sorter(mapping_path, engine=engine)
+    real = content_rules.read_header
+    calls = []
+
+    def read_header(path, size):
+        if not calls:
+            calls.append(path)
+            raise TimeoutError(errno.ETIMEDOUT, "timed out")
+        return real(path, size)
+    monkeypatch.setattr(content_rules, "read_header", read_header)
+    sorter_obj.sort_current_directory(str(tmp_path / "inbox"))
+    assert calls
+    assert tree(str(tmp_path / "inbox")) == ["PDF/scan"]
+    assert sorter_obj.report.failed == 0 and sorter_obj.report.recovered == 1
+
+
+@pytest.mark.parametrize("engine", sorter.ENGINES)
+def test_repeated_failures_are_reported_once(tmp_path, monkeypatch, write_mapping, engine):
+    make_files(str(tmp_path / "inbox"), ["a.txt", "b.txt"])
+
+    def rename(*args, **kwargs):
+        raise OSError(errno.EACCES, os.strerror(errno.EACCES))
+    monkeypatch.setattr(os, "rename", rename)
+    sorter_obj = sorter.create_sorter(write_mapping({"*.txt": "Text"}), engine=engine)
+    sorter_obj.sort_current_directory(str(tmp_path / "inbox"))
+    sorter_obj.deep_audit_and_sort(str(tmp_path / "inbox"))
+    assert sorter_obj.report.failed == 2
+    assert sorted(path for _, path, _ in sorter_obj.report.failures) == [
+        str(tmp_path / "inbox" / "a.txt"), str(tmp_path / "inbox" / "b.txt"),
+    ]
@@ -0,0 +1,67 @@
+import fnmatch
+import random
+import sys
+
+from src import sorter
+from src.rule_matcher import RuleMatcher
+
+PATTERNS = [
+    "README", "*.txt", "*.tar.gz", "*.gz", "report*.pdf", "*.pdf", "IMG_????.jpg", "*.JPG",
+    "[abc]*.log", "*.log", "notes.txt", "*backup*", "*.min.js", "*.js", "data_[0-9]*.csv", "*",
+]
+NAMES = [
+    "README", "readme", "a.txt", "notes.txt", "x.tar.gz", "y.gz", "report-1.pdf", "other.pdf",
+    "IMG_0001.jpg", "IMG_01.jpg", "photo.JPG", "a1.log", "z.log", "my_backup.zip", "app.min.js",
+    "app.js", "data_7.csv", "data_x.csv", "no_extension", ".hidden", "archive.tar.gz.part",
+]
+
+
+def _first_match(patterns, name):
+    for index, pattern in enumerate(patterns):
+        if fnmatch.fnmatch(name, pattern):
+            return index
+    return None
+
+
+def test_rule_matcher_matches_plain_first_match():
+    for patterns in (PATTERNS, PATTERNS[:-1], list(reversed(PATTERNS))):
+        matcher = RuleMatcher(patterns)
+        cached = RuleMatcher.from_tables(matcher.tables())
+        for name in NAMES:
+            expected = _first_match(patterns, name)
+            assert matcher.match(name) == expected, (patterns, name)
+            assert cached.match(name) == expected, (patterns, name)
+
+
+def test_rule_matcher_matches_plain_first_match_on_random_rules():
+    rng = random.Random(1234)
+    pieces = ["a", "b", ".txt", ".gz", ".tar", "*", "?", "[ab]", "x", "."]
+    for _ in range(200):
+        patterns = ["".join(rng.choice(pieces) for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 12))]
+        matcher = RuleMatcher(patterns)
+        for _ in range(30):
+            name = "".join(rng.choice(["a", "b", "x", ".", "txt", "gz", "tar"]) for _ in range(rng.randint(1, 6)))
+            assert matcher.match(name) == _first_match(patterns, name), (patterns, name)
+
+
+def test_cached_regex_from_another_python_is_rebuilt():
+    tables = RuleMatcher(PATTERNS).tables()
+    tables["regex_source"] = "(?P<r0>(?>unsupported"
+    cached = RuleMatcher.from_tables(tables)
+    for name in NAMES:
+        assert cached.match(name) == _first_match(PATTERNS, name)
+
+
+def test_sidecar_is_rebuilt_for_another_python_or_when_unreadable(write_mapping, monkeypatch):
+    mapping_path = write_mapping({"*.txt": "Text", "a*": "A"})
+    sorter.write_compiled_mapping(mapping_path)
+    with open(sorter.compiled_path(mapping_path), "rb") as f:
+        written = f.read()
+    monkeypatch.setattr(sys, "version_info", (3, 99, 0, "final", 0))
+    data, matcher = sorter.load_compiled_mapping(mapping_path)
+    assert data == {"*.txt": "Text", "a*": "A"} and matcher.match("ab.txt") == 0
+    with open(sorter.compiled_path(mapping_path), "rb") as f:
+        assert f.read() != written
+    with open(sorter.compiled_path(mapping_path), "wb") as f:
+        f.write(written[:20])
+    assert sorter.load_compiled_mapping(mapping_path)[1].match("ab") == 1
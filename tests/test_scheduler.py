@@ -0,0 +1,51 @@
+import json
+import subprocess
+import sys
+
+from src import scheduler
+
+
+def _write_running(path, owner_pid):
+    job = {"id": "j1", "profile": "Inbox", "trigger": "manual", "enqueued_at": 1.0,
+           "started_at": 2.0, "owner_pid": owner_pid}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"queue": [], "running": job, "history": [], "last_finished": {}}, f)
+
+
+def test_queues_sharing_a_file_see_each_others_state(tmp_path):
+    path = str(tmp_path / "jobs.json")
+    first, second = scheduler.JobQueue(path), scheduler.JobQueue(path)
+    assert first.enqueue("Inbox")
+    assert not second.enqueue("Inbox")
+    job = second.claim()
+    assert job["profile"] == "Inbox"
+    # The running job blocks the other queue, and a new trigger coalesces into it.
+    assert first.claim() is None
+    assert not first.enqueue("Inbox")
+    assert first.enqueue("Photos")
+    second.finish(job, "ok")
+    assert [entry["profile"] for entry in first.history()] == ["Inbox"]
+    assert first.last_finished("Inbox") is not None
+    assert first.claim()["profile"] == "Photos"
+
+
+def test_job_of_a_live_process_is_not_run_again(tmp_path):
+    path = str(tmp_path / "jobs.json")
+    other = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        _write_running(path, other.pid)
+        queue = scheduler.JobQueue(path)
+        assert queue.claim() is None
+        assert not queue.enqueue("Inbox")
+    finally:
+        other.kill()
+        other.wait()
+
+
+def test_job_of_an_exited_process_is_requeued(tmp_path):
+    path = str(tmp_path / "jobs.json")
+    gone = subprocess.Popen([sys.executable, "-c", "pass"])
+    gone.wait()
+    _write_running(path, gone.pid)
+    job = scheduler.JobQueue(path).claim()
+    assert job["id"] == "j1" and job["started_at"] != 2.0
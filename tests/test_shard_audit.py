@@ -0,0 +1,72 @@
+import errno
+import os
+import sqlite3
+
+from src import shard_audit
+from tests.helpers import make_files, tree
+
+
+def _publish(tmp_path, mapping_path, root, depth=1):
+    queue = shard_audit.WorkQueue(str(tmp_path / "queue.db"))
+    run_id, count = shard_audit.publish_audit(queue, mapping_path, str(root), shard_depth=depth)
+    return queue, run_id, count
+
+
+def test_worker_audits_every_shard(tmp_path, write_mapping):
+    mapping_path = write_mapping({"*.txt": "Text", "*.pdf": "PDF"})
+    root = tmp_path / "root"
+    make_files(root, ["a.txt", "x/b.pdf", "x/deep/c.txt", "y/d.pdf"])
+    queue, run_id, count = _publish(tmp_path, mapping_path, root)
+    assert count == 3  # the root's own files, x with its subtree, y with its subtree
+    assert shard_audit.ShardWorker(queue).run() == 3
+    assert tree(root) == ["PDF/b.pdf", "PDF/d.pdf", "Text/a.txt", "Text/c.txt"]
+    status = queue.status(run_id)
+    assert status["shards"] == {shard_audit.DONE: 3}
+    assert status["moved"] == 4 and status["failed_files"] == 0 and status["errors"] == []
+
+
+def test_files_that_cannot_be_moved_mark_the_shard(tmp_path, write_mapping, monkeypatch):
+    mapping_path = write_mapping({"*.txt": "Text"})
+    root = tmp_path / "root"
+    make_files(root, ["x/ok.txt", "x/locked.txt", "y/locked.txt"])
+    queue, run_id, _ = _publish(tmp_path, mapping_path, root)
+    real_rename = os.rename
+
+    def rename(src, dst, **kwargs):
+        if "locked" in str(src):
+            raise PermissionError(errno.EACCES, "Permission denied", src)
+        return real_rename(src, dst, **kwargs)
+    monkeypatch.setattr(os, "rename", rename)
+    seen = []
+    worker = shard_audit.ShardWorker(queue, on_shard=lambda shard, moved, error: seen.append(shard["report"].failed))
+    worker.run()
+    status = queue.status(run_id)
+    assert status["shards"] == {shard_audit.DONE: 1, shard_audit.PARTIAL: 1, shard_audit.FAILED: 1}
+    assert status["moved"] == 1 and status["failed_files"] == 2
+    assert [(rel_dir, state) for rel_dir, state, _ in status["errors"]] == [
+        ("x", shard_audit.PARTIAL), ("y", shard_audit.FAILED)
+    ]
+    assert "locked.txt" in status["errors"][0][2]
+    assert sorted(seen) == [0, 1, 1]
+
+
+def test_publish_scan_filter_includes_content_rule_destinations(tmp_path, write_mapping):
+    mapping_path = write_mapping({
+        "*.txt": "Text",
+        "$scan": {"include": ["Inbox"], "include_destinations": True},
+        "$content": {"rules": [{"type": "pdf", "destination": "Scans"}]},
+    })
+    root = tmp_path / "root"
+    make_files(root, ["Inbox/a.txt", "Scans/b.bin", "Text/c.txt", "Other/d.txt"])
+    queue, run_id, _ = _publish(tmp_path, mapping_path, root)
+    with sqlite3.connect(str(tmp_path / "queue.db")) as db:
+        rel_dirs = sorted(row[0] for row in db.execute("SELECT rel_dir FROM shards"))
+    assert rel_dirs == ["", "Inbox", "Scans", "Text"]
+
+
+def test_queue_from_an_older_schema_gains_the_new_columns(tmp_path):
+    path = str(tmp_path / "old.db")
+    with sqlite3.connect(path) as db:
+        db.executescript(shard_audit._SCHEMA.replace("    failed_files INTEGER,\n", ""))
+    queue = shard_audit.WorkQueue(path)
+    assert queue.status()["failed_files"] == 0
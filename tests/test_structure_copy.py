@@ -0,0 +1,48 @@
+import os
+
+from src import structure_copy
+from src.structure_copy import StructureCopy
+
+
+def _folders(root):
+    found = []
+    for dirpath, dirnames, _ in os.walk(root):
+        for name in dirnames:
+            found.append(os.path.relpath(os.path.join(dirpath, name), root).replace(os.sep, "/"))
+    return sorted(found)
+
+
+def _make_dirs(root, paths):
+    for path in paths:
+        os.makedirs(os.path.join(root, *path.split("/")))
+
+
+def test_include_selects_top_level_folders_with_their_subtrees(tmp_path):
+    src = tmp_path / "Drop"
+    _make_dirs(src, ["Projects/2024/Q1", "Projects/.git/objects", "Other/Projects"])
+    copy = StructureCopy(str(src), str(tmp_path / "out"), include=["Projects"], exclude=[".git"])
+    copy.run()
+    assert _folders(tmp_path / "out" / "Drop") == ["Projects", "Projects/2024", "Projects/2024/Q1"]
+
+
+def test_max_depth(tmp_path):
+    src = tmp_path / "Drop"
+    _make_dirs(src, ["a/b/c"])
+    StructureCopy(str(src), str(tmp_path / "out"), max_depth=2).run()
+    assert _folders(tmp_path / "out" / "Drop") == ["a", "a/b"]
+
+
+def test_unreadable_folders_are_reported(tmp_path, monkeypatch):
+    src = tmp_path / "Drop"
+    _make_dirs(src, ["ok/sub", "locked/sub"])
+    real = structure_copy._list_subdirs
+
+    def list_subdirs(path):
+        if os.path.basename(path) == "locked":
+            raise PermissionError(13, "Permission denied", path)
+        return real(path)
+    monkeypatch.setattr(structure_copy, "_list_subdirs", list_subdirs)
+    copy = StructureCopy(str(src), str(tmp_path / "out"))
+    copy.run()
+    assert _folders(tmp_path / "out" / "Drop") == ["locked", "ok", "ok/sub"]
+    assert copy.skipped == [(str(src / "locked"), "Permission denied")]
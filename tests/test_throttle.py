@@ -0,0 +1,72 @@
+import os
+import sys
+import threading
+
+import pytest
+
+from src import scheduler
+from src import throttle
+
+
+def test_token_bucket_unlimited_and_rate_change():
+    bucket = throttle.TokenBucket()
+    for _ in range(1000):
+        bucket.acquire()
+    bucket.set_rate(5)
+    assert bucket.rate == 5.0 and bucket.capacity == 5.0
+    bucket.set_rate(0)
+    assert bucket.rate is None
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="per-thread nice values are Linux-only")
+def test_background_priority_is_per_thread_and_not_stacked():
+    seen = {}
+
+    def worker():
+        tid = threading.get_native_id()
+        base = os.getpriority(os.PRIO_PROCESS, tid)
+        throttle.set_thread_background(True)
+        throttle.set_thread_background(True)
+        seen["lowered"] = os.getpriority(os.PRIO_PROCESS, tid) - base
+        seen["process"] = os.getpriority(os.PRIO_PROCESS, os.getpid())
+        throttle.set_thread_background(False)
+        seen["restored"] = os.getpriority(os.PRIO_PROCESS, tid) - base
+
+    before = os.getpriority(os.PRIO_PROCESS, os.getpid())
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+    assert seen["lowered"] == throttle.BACKGROUND_NICE
+    assert seen["process"] == before
+    # Restoring needs privileges; when it is refused the thread simply stays low.
+    assert seen["restored"] in (0, throttle.BACKGROUND_NICE)
+
+
+def test_failed_restore_does_not_lower_again(monkeypatch):
+    calls = []
+    state = type("State", (), {"nice_base": None})()
+    monkeypatch.setattr(os, "getpriority", lambda which, who: 0)
+
+    def setpriority(which, who, value):
+        if value < 10:
+            raise PermissionError("not permitted")
+        calls.append(value)
+    monkeypatch.setattr(os, "setpriority", setpriority)
+    throttle._lower_cpu_priority(state, True, 0)
+    throttle._lower_cpu_priority(state, False, 0)
+    throttle._lower_cpu_priority(state, True, 0)
+    assert calls == [throttle.BACKGROUND_NICE]
+
+
+def test_scheduler_runs_use_the_shared_throttle(tmp_path):
+    shared = throttle.IOThrottle(ops_per_second=3)
+    received = []
+    sched = scheduler.SortScheduler(
+        queue=scheduler.JobQueue(str(tmp_path / "jobs.json")),
+        settings_loader=lambda: {scheduler.PROFILES_KEY: {"p": {"mapping": "m.json"}}},
+        runner=lambda profile, io_throttle=None, **options: received.append(io_throttle),
+        io_throttle=shared,
+    )
+    sched.trigger("p")
+    assert sched.run_next()["status"] == "ok"
+    assert received == [shared]
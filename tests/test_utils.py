@@ -0,0 +1,14 @@
+import subprocess
+import sys
+
+from tests.helpers import ROOT
+
+
+def test_headless_modules_import_without_tkinter():
+    # A None entry in sys.modules makes "import tkinter" fail, as on a server without Tk.
+    code = (
+        "import sys; sys.modules['tkinter'] = None\n"
+        "from src import cli, daemon, scheduler, shard_audit, utils\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr